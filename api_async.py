@@ -0,0 +1,178 @@
+# api_async.py
+# Rotas de consulta externa (/api/cnpj e /api/cep) em ASGI, para multiplexar
+# muitas consultas em um worker só.
+#
+# Nas rotas Flask (WSGI) cada consulta à ReceitaWS/BrasilAPI/ViaCEP prende uma
+# thread do gunicorn enquanto espera o provedor; com provedores lentos o worker
+# fica sem threads. Aqui as duas rotas são corrotinas: a espera pelo provedor é
+# um `await` no httpx e o mesmo event loop atende centenas de consultas ao
+# mesmo tempo. As demais rotas seguem no Flask, montado como WSGI no mesmo app
+# (uvicorn.middleware.wsgi.WSGIMiddleware, que roda o Flask em um pool de threads).
+#
+#   uvicorn api_async:app --workers 4
+#
+# Mesma sessão de login do Flask (cookie assinado com a SECRET_KEY), mesmo cache
+# de CNPJ, mesma tabela de CEPs e mesmos clientes HTTP (disjuntor e métricas
+# compartilhados com /http/metricas). Sem sessão válida a requisição é repassada
+# ao Flask, que responde como antes (redireciona para o login).
+
+import asyncio
+import json
+import re
+from http.cookies import SimpleCookie
+
+import requests
+
+import app as aplicacao_flask
+from consulta_cep import criar_busca_viacep_async, normalizar_cep
+from consulta_cnpj import (ErroConsultaCNPJ, Provedor, criar_busca_cnpj_async, normalizar_brasilapi,
+                           normalizar_receitaws)
+from http_cliente import ClienteHTTPAsync
+
+try:
+    from uvicorn.middleware.wsgi import WSGIMiddleware
+except ImportError:  # sem uvicorn, só as rotas assíncronas respondem
+    WSGIMiddleware = None
+
+flask_app = aplicacao_flask.app
+# Consultas do app Flask (os mesmos serviços das rotas síncronas), obtidas na primeira requisição
+consulta_cnpj = consulta_cep = None
+
+_clientes_async = {}
+
+
+def cliente_async(nome):
+    """ClienteHTTPAsync do provedor `nome`, sobre o ClienteHTTP (config, disjuntor, métricas) do app."""
+    cliente = _clientes_async.get(nome)
+    if cliente is None:
+        cliente = _clientes_async[nome] = ClienteHTTPAsync(aplicacao_flask.cliente_http(nome),
+                                                           tamanho_pool=flask_app.config['HTTP_CONEXOES_ASYNC'])
+    return cliente
+
+
+def _configurar():
+    """Liga as versões assíncronas das buscas nas consultas do app (na primeira requisição)."""
+    global consulta_cnpj, consulta_cep
+    with flask_app.app_context():
+        if consulta_cnpj is None:
+            consulta_cnpj = aplicacao_flask.servico('consulta_cnpj')
+        if consulta_cep is None:
+            consulta_cep = aplicacao_flask.servico('consulta_cep')
+        if consulta_cnpj.buscar_async is None:
+            config = flask_app.config
+            consulta_cnpj.buscar_async = criar_busca_cnpj_async([
+                Provedor('receitaws', config['RECEITAWS_URL'], cliente_async('receitaws'), normalizar_receitaws),
+                Provedor('brasilapi', config['BRASILAPI_URL'], cliente_async('brasilapi'), normalizar_brasilapi),
+            ])
+        if consulta_cep.buscar_async is None:
+            consulta_cep.buscar_async = criar_busca_viacep_async(flask_app.config['VIACEP_URL'], cliente_async('viacep'))
+
+
+def usuario_autenticado(cabecalhos):
+    """True se o cookie de sessão do Flask é válido e tem um usuário logado."""
+    if flask_app.config.get('LOGIN_DISABLED'):
+        return True
+    cookie = SimpleCookie()
+    try:
+        cookie.load(cabecalhos.get(b'cookie', b'').decode('latin-1'))
+    except Exception:
+        return False
+    valor = cookie.get(flask_app.config['SESSION_COOKIE_NAME'])
+    if valor is None:
+        return False
+    serializador = flask_app.session_interface.get_signing_serializer(flask_app)
+    try:
+        sessao = serializador.loads(valor.value, max_age=int(flask_app.permanent_session_lifetime.total_seconds()))
+    except Exception:
+        return False
+    return bool(sessao.get('_user_id'))
+
+
+async def _responder(send, status, dados, cabecalhos=()):
+    corpo = json.dumps(dados, ensure_ascii=False).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(corpo)).encode()),
+                    *((nome.encode(), valor.encode()) for nome, valor in cabecalhos)],
+    })
+    await send({'type': 'http.response.body', 'body': corpo})
+
+
+async def rota_cnpj(cnpj, send):
+    """Mesmo contrato da rota Flask buscar_cnpj (corpo, status e X-Cache)."""
+    cnpj_limpo = re.sub(r'[^0-9]', '', cnpj)
+    try:
+        resultado = await consulta_cnpj.consultar_async(cnpj_limpo)
+    except ErroConsultaCNPJ as e:
+        return await _responder(send, e.status_http, {'status': 'ERROR', 'message': str(e)})
+    except Exception as e:
+        return await _responder(send, 500, {'status': 'ERROR', 'message': str(e)})
+    x_cache = {'cache': 'HIT', 'stale': 'STALE'}.get(resultado.origem, 'MISS')
+    await _responder(send, resultado.status_http, resultado.dados, [('X-Cache', x_cache)])
+
+
+def _no_contexto(funcao, *args):
+    """Executa `funcao(db.session, *args)` em um contexto do app."""
+    with flask_app.app_context():
+        return funcao(aplicacao_flask.db.session, *args)
+
+
+async def _no_banco(funcao, *args):
+    # SQLAlchemy é síncrono: o acesso ao banco vai para uma thread, o event loop segue livre
+    return await asyncio.to_thread(_no_contexto, funcao, *args)
+
+
+async def rota_cep(cep, send):
+    """Mesmo contrato da rota Flask buscar_cep."""
+    cep_limpo = normalizar_cep(cep)
+    if cep_limpo is None:
+        return await _responder(send, 400, {'erro': True, 'message': 'CEP deve ter 8 dígitos.'})
+    try:
+        resultado = await consulta_cep.consultar_async(cep_limpo, _no_banco)
+    except requests.exceptions.RequestException as e:
+        return await _responder(send, 502, {'erro': True, 'message': f'Erro ao consultar a ViaCEP: {e}'})
+    if resultado.dados is None:
+        return await _responder(send, 404, {'erro': True, 'message': 'CEP não encontrado.'})
+    await _responder(send, 200, resultado.dados, [('X-Cache', 'HIT' if resultado.origem == 'local' else 'MISS')])
+
+
+ROTAS = (
+    (re.compile(r'^/api/cnpj/([^/]+)$'), rota_cnpj),
+    (re.compile(r'^/api/cep/([^/]+)$'), rota_cep),
+)
+
+
+class AppAsync:
+    """App ASGI: rotas de consulta assíncronas; o resto (e quem não está logado) vai para `wsgi`."""
+
+    def __init__(self, wsgi=None):
+        self.wsgi = wsgi
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        if scope['type'] == 'http' and scope['method'] in ('GET', 'HEAD'):
+            for padrao, rota in ROTAS:
+                encontrado = padrao.match(scope['path'])
+                if encontrado and usuario_autenticado(dict(scope['headers'])):
+                    _configurar()
+                    return await rota(encontrado.group(1), send)
+        if self.wsgi is None:
+            return await _responder(send, 404, {'erro': True, 'message': 'Não encontrado.'})
+        return await self.wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            mensagem = await receive()
+            if mensagem['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif mensagem['type'] == 'lifespan.shutdown':
+                for cliente in list(_clientes_async.values()):
+                    await cliente.fechar()
+                _clientes_async.clear()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+app = AppAsync(WSGIMiddleware(flask_app) if WSGIMiddleware is not None else None)
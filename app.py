@@ -1,32 +1,25 @@
 import os
-import io
-from io import BytesIO
 import re
-import requests
+import threading
+import click
 from decimal import Decimal
 from datetime import datetime, timedelta
-import sqlite3
-from sqlalchemy import func # Importante estar no topo do arquivo
-from flask import Flask, render_template, request, redirect, url_for, send_file, flash, session, jsonify, make_response
-from flask_sqlalchemy import SQLAlchemy
-from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.orm import validates
+from flask import Blueprint, Flask, current_app, render_template, request, redirect, url_for, send_file, flash, jsonify
+from flask_login import UserMixin, login_user, login_required, logout_user, current_user
+from werkzeug.security import check_password_hash
 from flask_wtf import FlaskForm
-from flask_migrate import Migrate # Certifique-se de que está importado
-from wtforms import StringField, DateField, DecimalField, SelectField, SubmitField, EmailField, PasswordField, TextAreaField
+from wtforms import StringField, DateField, SelectField, SubmitField, EmailField, PasswordField, TextAreaField
 from wtforms.validators import DataRequired, Length, Regexp, Optional, Email, EqualTo, ValidationError
-from models import Contrato # Ajuste conforme o nome da classe no seu models.py
-# ReportLab e PIL
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib.units import inch, cm
-from PIL import Image as PIL_Image
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
-from reportlab.platypus import Paragraph, Spacer, Image
-from reportlab.lib.fonts import addMapping
-from reportlab.platypus import SimpleDocTemplate # Necessário para a segunda função PDF (que foi removida)
-from logging.config import fileConfig
+from extensions import db, login_manager, migrate
+# Os módulos de PDF (ReportLab/PIL) e de consultas externas (requests) são importados
+# só quando uma rota ou serviço precisa deles (ver SERVIÇOS DO APP abaixo)
+from busca import aplicar_busca, criar_indice_busca, registrar_indice_busca
+from paginacao import CursorInvalido, contagem_aproximada, paginar_por_cursor
+from estatisticas import filtrar_periodo, calcular_dashboard, montar_contexto_dashboard, buscar_alertas_vencimento, buscar_top_recentes
+from cache import CacheDashboard, CacheUsuarios, criar_cache, registrar_invalidacao
+from senhas import VerificacaoOcupada, VerificadorSenhas, gerar_hash, precisa_rehash
+from resumos import registrar_manutencao_resumos, reconstruir_resumos, resumos_precisam_reconstrucao, ler_resumos
 
 # --- FUNÇÃO AUXILIAR PARA LIMPAR CNPJ ---
 def clean_cnpj(cnpj_str):
@@ -36,9 +29,6 @@ def clean_cnpj(cnpj_str):
     # Usa regex para manter apenas dígitos (0-9)
     return re.sub(r'\D', '', cnpj_str)
 
-# Definição do Rodapé
-RODAPE_TEXTO = "Rua: GIOVANNI DI BALDUCCIO, 402 - VILA MORAES, SAO PAULO - São Paulo - SP - CEP: 04170-000 | Tel: 11999441135"
-
 # --- FUNÇÕES DE UTILIDADE ---
 
 def clean_currency(value_str):
@@ -66,18 +56,60 @@ def format_currency_br(value):
 project_dir = os.path.dirname(os.path.abspath(__file__))
 database_file = "sqlite:///{}".format(os.path.join(project_dir, "database.db"))
 
-app = Flask(__name__)
-app.config['SECRET_KEY'] = 'sua-chave-secreta-forte'
-app.config['SQLALCHEMY_DATABASE_URI'] = database_file
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db = SQLAlchemy(app)
-login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = 'login'
-login_manager.login_message_category = 'info'
-login_manager.login_message = "Por favor, faça login para acessar esta página."
-# --- A LINHA CRÍTICA QUE ESTAVA FALTANDO ---
-migrate = Migrate(app, db) # <-
+def configurar(app):
+    """Configuração padrão do app (valores das variáveis de ambiente, quando definidas)."""
+    app.config['SECRET_KEY'] = 'sua-chave-secreta-forte'
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_file
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Cache do dashboard: 'memoria' (por processo) ou 'sqlite' (arquivo compartilhado entre os workers)
+    app.config['DASHBOARD_CACHE_BACKEND'] = os.environ.get('DASHBOARD_CACHE_BACKEND', 'memoria')
+    app.config['DASHBOARD_CACHE_CAMINHO'] = os.environ.get('DASHBOARD_CACHE_CAMINHO', os.path.join(project_dir, 'instance', 'cache_dashboard.sqlite'))
+    app.config['DASHBOARD_CACHE_TTL'] = int(os.environ.get('DASHBOARD_CACHE_TTL', 300))
+    app.config['DASHBOARD_CACHE_MAX_ITENS'] = int(os.environ.get('DASHBOARD_CACHE_MAX_ITENS', 128))
+    # Cache do user_loader (usuário logado por id): por processo, invalidado a cada escrita em usuários
+    app.config['USER_CACHE_TTL'] = int(os.environ.get('USER_CACHE_TTL', 60))
+    app.config['USER_CACHE_MAX_ITENS'] = int(os.environ.get('USER_CACHE_MAX_ITENS', 1024))
+    # Hash de senha (formato do Werkzeug: 'scrypt', 'scrypt:16384:8:1', 'pbkdf2:sha256:600000'...).
+    # Hashes com outros parâmetros são refeitos no próximo login bem-sucedido.
+    app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+    # Verificação de senha no login: 0 = na thread da requisição; N = pool de N threads,
+    # com até LOGIN_VERIFICACAO_MAX_FILA esperando (acima disso o login pede para tentar de novo)
+    app.config['LOGIN_VERIFICACAO_WORKERS'] = int(os.environ.get('LOGIN_VERIFICACAO_WORKERS', 0))
+    app.config['LOGIN_VERIFICACAO_MAX_FILA'] = int(os.environ.get('LOGIN_VERIFICACAO_MAX_FILA', 16))
+    app.config['LOGIN_VERIFICACAO_ESPERA'] = float(os.environ.get('LOGIN_VERIFICACAO_ESPERA', 5))
+    # Cache em disco dos PDFs de contrato renderizados
+    app.config['PDF_CACHE_DIR'] = os.environ.get('PDF_CACHE_DIR', os.path.join(project_dir, 'instance', 'pdf_cache'))
+    app.config['PDF_CACHE_MAX_BYTES'] = int(os.environ.get('PDF_CACHE_MAX_BYTES', 200 * 1024 * 1024))
+    # Exportação em lote (ZIP): processos de renderização (vazio = todos os núcleos, 0 = no próprio processo)
+    app.config['PDF_EXPORT_WORKERS'] = int(os.environ['PDF_EXPORT_WORKERS']) if os.environ.get('PDF_EXPORT_WORKERS') else None
+    app.config['PDF_EXPORT_MAX_CONTRATOS'] = int(os.environ.get('PDF_EXPORT_MAX_CONTRATOS', 1000))
+    # Renderização do download individual: pool de processos com fila limitada (vazio = todos os núcleos, 0 = no próprio processo)
+    app.config['PDF_RENDER_WORKERS'] = int(os.environ['PDF_RENDER_WORKERS']) if os.environ.get('PDF_RENDER_WORKERS') else None
+    app.config['PDF_RENDER_MAX_FILA'] = int(os.environ.get('PDF_RENDER_MAX_FILA', 32))
+    app.config['PDF_RENDER_TIMEOUT'] = int(os.environ.get('PDF_RENDER_TIMEOUT', 30))
+    app.config['PDF_RENDER_ESPERA'] = float(os.environ.get('PDF_RENDER_ESPERA', 10))
+    # Consulta de CNPJ (/api/cnpj): ReceitaWS com cache persistente (TTL, cache negativo e stale-while-revalidate)
+    app.config['RECEITAWS_URL'] = os.environ.get('RECEITAWS_URL', 'https://receitaws.com.br/v1/cnpj/{cnpj}')
+    app.config['BRASILAPI_URL'] = os.environ.get('BRASILAPI_URL', 'https://brasilapi.com.br/api/cnpj/v1/{cnpj}')
+    # Consulta de CEP (/api/cep): tabela local cep_endereco; ViaCEP só em falta
+    app.config['VIACEP_URL'] = os.environ.get('VIACEP_URL', 'https://viacep.com.br/ws/{cep}/json/')
+    # Cliente HTTP de saída (http_cliente): timeouts, retentativas e disjuntor por provedor
+    app.config['HTTP_TIMEOUT_CONEXAO'] = float(os.environ.get('HTTP_TIMEOUT_CONEXAO', 3.05))
+    app.config['HTTP_TIMEOUT_LEITURA'] = float(os.environ.get('HTTP_TIMEOUT_LEITURA', 5))
+    app.config['HTTP_TENTATIVAS'] = int(os.environ.get('HTTP_TENTATIVAS', 2))
+    app.config['HTTP_DISJUNTOR_FALHAS'] = int(os.environ.get('HTTP_DISJUNTOR_FALHAS', 5))
+    app.config['HTTP_DISJUNTOR_SEGUNDOS'] = int(os.environ.get('HTTP_DISJUNTOR_SEGUNDOS', 30))
+    # Conexões simultâneas por provedor nas rotas assíncronas (api_async)
+    app.config['HTTP_CONEXOES_ASYNC'] = int(os.environ.get('HTTP_CONEXOES_ASYNC', 20))
+    app.config['CNPJ_CACHE_BACKEND'] = os.environ.get('CNPJ_CACHE_BACKEND', 'sqlite')
+    app.config['CNPJ_CACHE_CAMINHO'] = os.environ.get('CNPJ_CACHE_CAMINHO', os.path.join(project_dir, 'instance', 'cache_cnpj.sqlite'))
+    app.config['CNPJ_CACHE_MAX_ITENS'] = int(os.environ.get('CNPJ_CACHE_MAX_ITENS', 10000))
+    app.config['CNPJ_CACHE_TTL'] = int(os.environ.get('CNPJ_CACHE_TTL', 7 * 24 * 3600))
+    app.config['CNPJ_CACHE_TTL_NEGATIVO'] = int(os.environ.get('CNPJ_CACHE_TTL_NEGATIVO', 3600))
+    app.config['CNPJ_CACHE_STALE'] = int(os.environ.get('CNPJ_CACHE_STALE', 30 * 24 * 3600))
+    # Coalescência das consultas externas entre workers: 'local' (só entre threads) ou 'arquivo' (fcntl.flock)
+    app.config['COALESCENCIA_BACKEND'] = os.environ.get('COALESCENCIA_BACKEND', 'local')
+    app.config['COALESCENCIA_DIR'] = os.environ.get('COALESCENCIA_DIR', os.path.join(project_dir, 'instance', 'travas'))
 
 
 # --- MODELOS DO BANCO DE DADOS ---
@@ -89,22 +121,32 @@ class User(UserMixin, db.Model):
     password_hash = db.Column(db.String(256), nullable=False) # CORREÇÃO: Removida a duplicação
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = gerar_hash(password, current_app.config['PASSWORD_HASH_METHOD'])
 
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
+registrar_invalidacao(db.session, User, lambda: servico('cache_usuarios').invalidar())
+
 @login_manager.user_loader
 def load_user(user_id):
     try:
-        return User.query.get(int(user_id))
+        # Só vai ao banco na primeira requisição do usuário (por processo) ou depois do TTL
+        return servico('cache_usuarios').obter(int(user_id), lambda id_usuario: db.session.get(User, id_usuario))
     except ValueError:
         return None
 
 class ContratCond(db.Model):
+    # Índice composto usado pela paginação por cursor (ordem data_criacao DESC, id DESC)
+    __table_args__ = (
+        db.Index('ix_contrat_cond_data_criacao_id', 'data_criacao', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     nome = db.Column(db.String(100), nullable=False)
     cnpj = db.Column(db.String(20), unique=True, nullable=False)
+    # CNPJ apenas com dígitos (sem máscara), indexado para busca exata/prefixo e checagem de unicidade
+    cnpj_digits = db.Column(db.String(14), nullable=True, index=True)
     endereco = db.Column(db.String(200), nullable=False)
     cep = db.Column(db.String(10), nullable=False)
     estado = db.Column(db.String(50), nullable=False)
@@ -120,9 +162,47 @@ class ContratCond(db.Model):
     clausulas_adicionais = db.Column(db.Text, nullable=True) 
     data_criacao = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
+    @validates('cnpj')
+    def _atualiza_cnpj_digits(self, key, value):
+        # Mantém cnpj_digits sincronizado em toda escrita do CNPJ (cadastro, edição, etc.)
+        self.cnpj_digits = clean_cnpj(value)
+        return value
+
     def __repr__(self):
         return f'<ContratCond {self.nome}>'
 
+# Índice de busca textual (FTS5 no SQLite / GIN no PostgreSQL) criado junto com a tabela
+registrar_indice_busca(ContratCond.__table__)
+
+
+class ResumoContratos(db.Model):
+    """Resumo (rollup) do dashboard: quantidade e soma de valores por dimensão/chave."""
+    __tablename__ = 'resumo_contratos'
+    # 'tipo_indice', 'abrangencia', 'estado' ou 'mes' (AAAA-MM de data_criacao)
+    dimensao = db.Column(db.String(20), primary_key=True)
+    # Valor da dimensão ('' quando não informado)
+    chave = db.Column(db.String(200), primary_key=True)
+    quantidade = db.Column(db.Integer, nullable=False, default=0)
+    valor_total = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+
+# Mantém o resumo atualizado a cada cadastro, edição ou exclusão de contrato
+registrar_manutencao_resumos(db.session, ContratCond, ResumoContratos)
+
+
+class CepEndereco(db.Model):
+    """Base local de CEPs (pré-carregada com 'flask carregar-ceps' e completada pela ViaCEP)."""
+    __tablename__ = 'cep_endereco'
+    cep = db.Column(db.String(8), primary_key=True)  # só dígitos
+    logradouro = db.Column(db.String(200))
+    bairro = db.Column(db.String(100))
+    localidade = db.Column(db.String(100))
+    uf = db.Column(db.String(2))
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+# --- CACHE DO DASHBOARD ---
+# Qualquer escrita em contratos invalida o cache (em todos os workers, no backend compartilhado)
+registrar_invalidacao(db.session, ContratCond, lambda: servico('cache_dashboard').invalidar())
+
 
 # --- FORMULÁRIOS (FLASK-WTF) ---
 
@@ -193,9 +273,9 @@ class ContratoForm(FlaskForm):
 
     # Validador de CNPJ (garante unicidade, exceto no contrato atual durante edição)
     def validate_cnpj(self, cnpj):
-        cleaned_cnpj = cnpj.data
-        # Usa ContratCond, o modelo correto
-        query = ContratCond.query.filter_by(cnpj=cleaned_cnpj) 
+        cleaned_cnpj = clean_cnpj(cnpj.data)
+        # Usa ContratCond, o modelo correto (busca pelo índice de cnpj_digits, com ou sem máscara)
+        query = ContratCond.query.filter_by(cnpj_digits=cleaned_cnpj) 
         
         if self.contrato_id is not None:
             # Exclui o contrato atual da checagem para permitir a edição
@@ -211,54 +291,180 @@ class SearchForm(FlaskForm):
     termo = StringField('Pesquisar', validators=[Optional(), Length(max=100)])
     submit = SubmitField('Buscar')
 
-# --- INICIALIZAÇÃO DO BANCO E CRIAÇÃO DE USUÁRIO ---
+# --- SERVIÇOS DO APP ---
+# Criados no primeiro uso (servico('nome')) com a configuração do app atual. Assim
+# os módulos pesados (ReportLab/PIL dos PDFs, requests das consultas externas) só
+# são importados quando uma rota precisa deles, e não na subida de cada worker.
+# Para substituir um serviço (testes, benchmarks) basta atribuir ao nome no módulo.
+
+cache_usuarios = cache_dashboard = verificador_senhas = None
+coalescedor_consultas = consulta_cnpj = consulta_cep = None
+cache_pdf = servico_pdf = None
+
+_fabricas_servicos = {}
+_trava_servicos = threading.RLock()  # uma fábrica pode pedir outro serviço
+
+
+def fabrica_servico(nome):
+    """Registra a função decorada, `funcao(app)`, como a fábrica do serviço `nome`."""
+    def registrar(funcao):
+        _fabricas_servicos[nome] = funcao
+        return funcao
+    return registrar
+
+
+def servico(nome):
+    """Serviço `nome` (criado na primeira chamada, com a configuração do current_app)."""
+    valor = globals()[nome]
+    if valor is None:
+        with _trava_servicos:
+            valor = globals()[nome]
+            if valor is None:
+                valor = globals()[nome] = _fabricas_servicos[nome](current_app)
+    return valor
+
+
+@fabrica_servico('cache_usuarios')
+def criar_cache_usuarios(app):
+    return CacheUsuarios(
+        criar_cache('memoria', max_itens=app.config['USER_CACHE_MAX_ITENS'], ttl_padrao=app.config['USER_CACHE_TTL']),
+        User,
+        ttl=app.config['USER_CACHE_TTL'],
+    )
 
-with app.app_context():
-    try:
-        db.create_all()
-        print("Tabelas criadas com sucesso (se não existirem).")
-        # Cria usuário admin (se não existir)
-        if not User.query.filter_by(username='admin').first():
-            admin_user = User(username='admin', email='admin@example.com') # Adicionei um email
-            admin_user.set_password('admin')
-            db.session.add(admin_user)
-            db.session.commit()
-            print("Usuário 'admin' (senha: 'admin') criado.")
-    except Exception as e:
-        print(f"Erro ao criar tabelas ou usuário admin: {e}")
+
+@fabrica_servico('cache_dashboard')
+def criar_cache_dashboard(app):
+    return CacheDashboard(
+        criar_cache(app.config['DASHBOARD_CACHE_BACKEND'],
+                    caminho=app.config['DASHBOARD_CACHE_CAMINHO'],
+                    max_itens=app.config['DASHBOARD_CACHE_MAX_ITENS'],
+                    ttl_padrao=app.config['DASHBOARD_CACHE_TTL']),
+        ttl=app.config['DASHBOARD_CACHE_TTL'],
+    )
+
+
+@fabrica_servico('verificador_senhas')
+def criar_verificador_senhas(app):
+    return VerificadorSenhas(
+        workers=app.config['LOGIN_VERIFICACAO_WORKERS'],
+        max_fila=app.config['LOGIN_VERIFICACAO_MAX_FILA'],
+        espera=app.config['LOGIN_VERIFICACAO_ESPERA'],
+    )
+
+
+def cliente_http(nome):
+    """Cliente HTTP compartilhado do provedor `nome`, com a configuração HTTP_* do app."""
+    from http_cliente import obter_cliente
+    config = current_app.config
+    return obter_cliente(
+        nome,
+        timeout_conexao=config['HTTP_TIMEOUT_CONEXAO'],
+        timeout_leitura=config['HTTP_TIMEOUT_LEITURA'],
+        tentativas=config['HTTP_TENTATIVAS'],
+        limite_falhas=config['HTTP_DISJUNTOR_FALHAS'],
+        tempo_aberto=config['HTTP_DISJUNTOR_SEGUNDOS'],
+    )
+
+
+# Consultas simultâneas à mesma chave (CNPJ/CEP) compartilham uma única chamada ao provedor
+@fabrica_servico('coalescedor_consultas')
+def criar_coalescedor_consultas(app):
+    from coalescencia import Coalescedor, criar_trava
+    return Coalescedor(criar_trava(app.config['COALESCENCIA_BACKEND'], app.config['COALESCENCIA_DIR']))
+
+
+@fabrica_servico('consulta_cnpj')
+def criar_consulta_cnpj(app):
+    from consulta_cnpj import ConsultaCNPJ, Provedor, criar_busca_cnpj, normalizar_brasilapi, normalizar_receitaws
+    return ConsultaCNPJ(
+        criar_cache(app.config['CNPJ_CACHE_BACKEND'], app.config['CNPJ_CACHE_CAMINHO'],
+                    max_itens=app.config['CNPJ_CACHE_MAX_ITENS'], ttl_padrao=app.config['CNPJ_CACHE_TTL']),
+        # ReceitaWS primeiro; se ela estiver fora, lenta ou limitando, a BrasilAPI responde
+        criar_busca_cnpj([
+            Provedor('receitaws', app.config['RECEITAWS_URL'], cliente_http('receitaws'), normalizar_receitaws),
+            Provedor('brasilapi', app.config['BRASILAPI_URL'], cliente_http('brasilapi'), normalizar_brasilapi),
+        ]),
+        ttl=app.config['CNPJ_CACHE_TTL'],
+        ttl_negativo=app.config['CNPJ_CACHE_TTL_NEGATIVO'],
+        janela_stale=app.config['CNPJ_CACHE_STALE'],
+        coalescedor=servico('coalescedor_consultas'),
+    )
+
+
+@fabrica_servico('consulta_cep')
+def criar_consulta_cep(app):
+    from consulta_cep import ConsultaCEP, criar_busca_viacep
+    return ConsultaCEP(
+        CepEndereco,
+        criar_busca_viacep(app.config['VIACEP_URL'], cliente_http('viacep')),
+        cache_negativo=criar_cache('memoria', max_itens=1024),
+        coalescedor=servico('coalescedor_consultas'),
+    )
+
+
+@fabrica_servico('cache_pdf')
+def criar_cache_pdf(app):
+    from pdf_cache import CachePDF
+    return CachePDF(app.config['PDF_CACHE_DIR'], max_bytes=app.config['PDF_CACHE_MAX_BYTES'])
+
+
+@fabrica_servico('servico_pdf')
+def criar_servico_pdf(app):
+    from servico_pdf import ServicoRenderizacaoPDF
+    return ServicoRenderizacaoPDF(
+        servico('cache_pdf'),
+        workers=app.config['PDF_RENDER_WORKERS'],
+        max_fila=app.config['PDF_RENDER_MAX_FILA'],
+        timeout=app.config['PDF_RENDER_TIMEOUT'],
+    )
+
+
+# Rotas do app (registradas em create_app; os nomes dos endpoints ficam 'principal.<função>')
+principal = Blueprint('principal', __name__, cli_group=None)
 
 
 # --- ROTAS DE AUTENTICAÇÃO ---
 
-@app.route('/login', methods=['GET', 'POST'])
+
+@principal.route('/login', methods=['GET', 'POST'])
 def login():
     if current_user.is_authenticated:
-        return redirect(url_for('index'))
+        return redirect(url_for('principal.index'))
         
     form = LoginForm()
     if form.validate_on_submit():
         # CORREÇÃO: Busca por 'username'
         user = User.query.filter_by(username=form.username.data).first()
         
-        # CORREÇÃO: Chama 'user.check_password(form.password.data)'
-        if user and user.check_password(form.password.data):
+        try:
+            senha_ok = user is not None and servico('verificador_senhas').verificar(user.password_hash, form.password.data)
+        except VerificacaoOcupada:
+            flash('Muitos acessos ao mesmo tempo. Tente novamente em instantes.', 'warning')
+            return render_template('login.html', form=form), 503, {'Retry-After': '2'}
+
+        if senha_ok:
+            if precisa_rehash(user.password_hash, current_app.config['PASSWORD_HASH_METHOD']):
+                # Hash antigo (outro método/custo): refaz com a configuração atual
+                user.set_password(form.password.data)
+                db.session.commit()
             login_user(user)
             next_page = request.args.get('next')
-            return redirect(next_page or url_for('index'))
+            return redirect(next_page or url_for('principal.index'))
         else:
             flash('Usuário ou senha incorretos.', 'danger')
             
     return render_template('login.html', form=form) # Passa o form para o template
 
 
-@app.route('/logout')
+@principal.route('/logout')
 @login_required
 def logout():
     logout_user()
     flash('Você foi desconectado.', 'info')
-    return redirect(url_for('login'))
+    return redirect(url_for('principal.login'))
 
-@app.route('/register', methods=['GET', 'POST'])
+@principal.route('/register', methods=['GET', 'POST'])
 def register():
     form = RegistrationForm() # Usa o formulário WTForms
     if form.validate_on_submit():
@@ -274,7 +480,7 @@ def register():
             db.session.add(new_user)
             db.session.commit()
             flash('Usuário registrado com sucesso! Faça login.', 'success')
-            return redirect(url_for('login'))
+            return redirect(url_for('principal.login'))
         except Exception as e:
             db.session.rollback()
             flash(f'Erro ao registrar usuário: {e}', 'danger')
@@ -284,7 +490,7 @@ def register():
 
 # --- ROTAS DE CONTRATOS (CRUD e Pesquisa) ---
 
-@app.route('/', methods=['GET', 'POST'])
+@principal.route('/', methods=['GET', 'POST'])
 # @login_required # Mantendo o seu decorator
 def index():
     # 1. INSTANCIAÇÃO DE FORMULÁRIOS E VARIÁVEIS DE ESTADO
@@ -294,7 +500,11 @@ def index():
     search_query = request.args.get('termo', '')
     
     # Parâmetros de Paginação
-    page = request.args.get('page', 1, type=int)
+    # Modo padrão: cursor (keyset) com os tokens 'apos'/'antes'.
+    # Modo por número de página: enviando '?page=N' (OFFSET + COUNT, como antes).
+    page = request.args.get('page', type=int)
+    apos = request.args.get('apos')
+    antes = request.args.get('antes')
     per_page = 10 
 
     # --- LÓGICA POST (Adicionar Contrato) ---
@@ -321,44 +531,40 @@ def index():
             db.session.add(novo_contrato)
             db.session.commit()
             flash('Contrato adicionado com sucesso!', 'success')
-            return redirect(url_for('index'))
+            return redirect(url_for('principal.index'))
         except Exception as e:
             db.session.rollback()
             flash(f'Erro ao adicionar contrato: {e}', 'danger')
-            return redirect(url_for('index'))
+            return redirect(url_for('principal.index'))
             
     # --- LÓGICA GET (Pesquisa e Paginação) ---
     
-    # 1. Inicia a query com a ordenação padrão
-    query = ContratCond.query.order_by(ContratCond.data_criacao.desc())
+    # 1. Inicia a query base
+    query = ContratCond.query
 
-    # 2. Se houver um termo de busca, aplica o filtro
+    # 2. Se houver um termo de busca, aplica o filtro pelo índice textual (ordenado por relevância)
     if search_query:
-        # Padrão de busca para Nome/Endereço (usa o termo bruto)
-        search_pattern = f"%{search_query}%"
-        
-        # Padrão de busca para CNPJ (limpa o termo e busca apenas números)
-        cleaned_search_query = clean_cnpj(search_query)
-        cleaned_search_pattern = f"%{cleaned_search_query}%"
-        
-        # Filtra a query EXISTENTE, aplicando a lógica OR
-        query = query.filter(
-            # Busca em Nome e Endereço (permite busca por partes)
-            (ContratCond.nome.ilike(search_pattern)) | 
-            (ContratCond.endereco.ilike(search_pattern)) |
-            
-            # Busca em CNPJ:
-            # Opção A: Busca usando o termo LIMPO (assume que CNPJ no DB é numérico)
-            (ContratCond.cnpj.ilike(cleaned_search_pattern)) | 
-            # Opção B: Mantém busca com termo BRUTO (caso algum CNPJ esteja mascarado no DB)
-            (ContratCond.cnpj.ilike(search_pattern)) 
-        )
-        
+        query = aplicar_busca(query, ContratCond, search_query, db.session.connection())
+
         # Opcionalmente, se você quiser garantir que o formulário de busca mantenha o valor
         search_form.termo.data = search_query
-        
+    else:
+        query = query.order_by(ContratCond.data_criacao.desc())
+
     # 3. Executa a paginação na query FINAL (filtrada ou não filtrada)
-    contratos = query.paginate(page=page, per_page=per_page, error_out=False)
+    if page is not None:
+        contratos = query.paginate(page=page, per_page=per_page, error_out=False)
+    else:
+        # Total aproximado só faz sentido sem filtro (vem do catálogo/estatísticas, sem COUNT)
+        total_aproximado = None
+        if not search_query:
+            total_aproximado = contagem_aproximada(db.session.connection(), ContratCond.__tablename__)
+        try:
+            contratos = paginar_por_cursor(query, ContratCond, per_page, apos=apos, antes=antes,
+                                           total_aproximado=total_aproximado)
+        except CursorInvalido:
+            flash('Link de paginação inválido. Mostrando a primeira página.', 'warning')
+            return redirect(url_for('principal.index', termo=search_query or None))
 
     # 2. RENDERIZAÇÃO DO TEMPLATE
     return render_template('index.html', 
@@ -370,7 +576,7 @@ def index():
 # ... (O restante do seu código, rotas de edição, exclusão, etc.)
 
 
-@app.route('/contrato/<int:contrato_id>/editar', methods=['GET', 'POST'])
+@principal.route('/contrato/<int:contrato_id>/editar', methods=['GET', 'POST'])
 @login_required
 def editar_contrato(contrato_id):
     # Usa o nome do modelo correto: ContratCond
@@ -400,7 +606,7 @@ def editar_contrato(contrato_id):
             
             db.session.commit()
             flash('Contrato atualizado com sucesso!', 'success')
-            return redirect(url_for('index'))
+            return redirect(url_for('principal.index'))
         except Exception as e:
             db.session.rollback()
             flash(f'Erro ao atualizar contrato: {e}', 'danger')
@@ -425,7 +631,7 @@ def editar_contrato(contrato_id):
             
     return render_template('editar.html', form=form, contrato=contrato)
 
-@app.route('/delete/<int:id>', methods=['POST'])
+@principal.route('/delete/<int:id>', methods=['POST'])
 @login_required
 def delete_contrato(id):
     contrato = ContratCond.query.get_or_404(id)
@@ -436,10 +642,10 @@ def delete_contrato(id):
     except Exception as e:
         db.session.rollback()
         flash(f'Erro ao excluir contrato: {e}', 'danger')
-    return redirect(url_for('index'))
+    return redirect(url_for('principal.index'))
 
 
-@app.route('/clausulas')
+@principal.route('/clausulas')
 @login_required
 def clausulas():
     # As cláusulas foram mantidas no Python, mas o ideal seria em um template ou no DB.
@@ -453,392 +659,275 @@ def clausulas():
 
 # --- ROTAS DE API ---
 
-@app.route("/api/cnpj/<cnpj>")
+@principal.route("/api/cnpj/<cnpj>")
 @login_required # Protege a API
 def buscar_cnpj(cnpj):
+    from consulta_cnpj import ErroConsultaCNPJ
     # Remove caracteres não numéricos do CNPJ antes de buscar
     cnpj_limpo = re.sub(r'[^0-9]', '', cnpj)
     try:
-        # Requer a instalação da biblioteca 'requests'
-        r = requests.get(f"https://receitaws.com.br/v1/cnpj/{cnpj_limpo}")
-        r.raise_for_status() # Lança exceção para códigos de erro HTTP
-        data = r.json()
-        return jsonify(data)
-    except requests.exceptions.HTTPError as he:
-        # Trata erros específicos da API da ReceitaWS
-        return jsonify({"status": "ERROR", "message": f"Erro HTTP ao buscar CNPJ: {he.response.status_code}"}), 400
+        # Cache primeiro; a ReceitaWS só é chamada em falta ou (em segundo plano) quando a resposta venceu
+        resultado = servico('consulta_cnpj').consultar(cnpj_limpo)
+        resposta = jsonify(resultado.dados)
+        resposta.status_code = resultado.status_http
+        resposta.headers['X-Cache'] = {'cache': 'HIT', 'stale': 'STALE'}.get(resultado.origem, 'MISS')
+        return resposta
+    except ErroConsultaCNPJ as e:
+        return jsonify({"status": "ERROR", "message": str(e)}), e.status_http
     except Exception as e:
         return jsonify({"status": "ERROR", "message": str(e)}), 500
 
 
-from sqlalchemy import func # Certifique-se de que o func está importado
+@principal.route("/api/cep/<cep>")
+@login_required
+def buscar_cep(cep):
+    """Endereço do CEP no formato da ViaCEP (logradouro, bairro, localidade, uf)."""
+    import requests
+    from consulta_cep import normalizar_cep
+    cep_limpo = normalizar_cep(cep)
+    if cep_limpo is None:
+        return jsonify({"erro": True, "message": "CEP deve ter 8 dígitos."}), 400
+    try:
+        resultado = servico('consulta_cep').consultar(db.session, cep_limpo)
+    except requests.exceptions.RequestException as e:
+        return jsonify({"erro": True, "message": f"Erro ao consultar a ViaCEP: {e}"}), 502
+    if resultado.dados is None:
+        return jsonify({"erro": True, "message": "CEP não encontrado."}), 404
+    resposta = jsonify(resultado.dados)
+    resposta.headers['X-Cache'] = 'HIT' if resultado.origem == 'local' else 'MISS'
+    return resposta
+
+
+@principal.route('/http/metricas')
+@login_required
+def metricas_http():
+    """Requisições, erros, latência e estado do disjuntor por provedor externo (deste processo)."""
+    from http_cliente import metricas_clientes
+    return jsonify({**metricas_clientes(), 'coalescencia': servico('coalescedor_consultas').metricas()})
+
 
-@app.route('/dashboard')
+@principal.route('/dashboard')
 @login_required
 def dashboard():
     # 1. Obter datas dos filtros
     data_inicio = request.args.get('data_inicio')
     data_fim = request.args.get('data_fim')
 
-    # 2. Criar a query base
-    query = ContratCond.query
+    # 2. Sem filtro: lê o resumo pré-calculado (poucas linhas, independe do volume de contratos).
+    #    Com filtro de datas: um único GROUP BY (COUNT e SUM no banco).
+    #    Em ambos os casos o resultado fica em cache por filtro até a próxima escrita em contratos.
+    def calcular():
+        if not data_inicio and not data_fim:
+            return montar_contexto_dashboard(
+                ler_resumos(db.session, ResumoContratos),
+                alertas_vencimento=buscar_alertas_vencimento(ContratCond),
+                top_5_recentes=buscar_top_recentes(ContratCond),
+            )
+        return calcular_dashboard(db.session, ContratCond, data_inicio, data_fim)
 
-    # 3. Aplicar filtros se as datas existirem
-    if data_inicio:
-        query = query.filter(ContratCond.data_criacao >= data_inicio)
-    if data_fim:
-        query = query.filter(ContratCond.data_criacao <= data_fim)
-
-    # Executa a query para obter a lista de contratos e calcular o financeiro
-    contratos_filtrados = query.all()
-    total_financeiro = sum(c.valor_contrato for c in contratos_filtrados if c.valor_contrato)
-
-    # --- 1. DADOS PARA O GRÁFICO DE REAJUSTE (ROSCA) ---
-    # Ajustado para usar 'tipo_indice' conforme seu modelo
-    stats_reajuste = query.with_entities(
-        ContratCond.tipo_indice, func.count(ContratCond.id)
-    ).group_by(ContratCond.tipo_indice).all()
-    
-    labels_reajuste = [item[0] if item[0] else "Não Informado" for item in stats_reajuste]
-    valores_reajuste = [item[1] for item in stats_reajuste]
-
-    # --- 2. ALERTAS DE VENCIMENTO (PRÓXIMOS 30 DIAS) ---
-    # Ajustado para usar 'termino_contrato' conforme seu modelo
-    hoje = datetime.now()
-    prazo_30 = hoje + timedelta(days=30)
-    alertas_vencimento = ContratCond.query.filter(
-        ContratCond.termino_contrato >= hoje,
-        ContratCond.termino_contrato <= prazo_30
-    ).all()
-
-    # --- PROCESSAMENTO DOS GRÁFICOS ---
-
-    # Gráfico: Produtos
-    stats_produtos = query.with_entities(
-        ContratCond.abrangencia_contrato, 
-        func.count(ContratCond.id)
-    ).group_by(ContratCond.abrangencia_contrato).all()
-    labels_prod = [item[0] if item[0] else "Outros" for item in stats_produtos]
-    valores_prod = [item[1] for item in stats_produtos]
-
-    # Gráfico: Estados
-    stats_regioes = query.with_entities(
-        ContratCond.estado, 
-        func.count(ContratCond.id)
-    ).group_by(ContratCond.estado).all()
-    labels_regiao = [item[0] if item[0] else "N/A" for item in stats_regioes]
-    valores_regiao = [item[1] for item in stats_regioes]
-
-    # Gráfico: Evolução Mensal
-    stats_mensal = query.with_entities(
-        func.strftime('%m/%Y', ContratCond.data_criacao), 
-        func.count(ContratCond.id)
-    ).group_by(func.strftime('%m/%Y', ContratCond.data_criacao)).all()
-    labels_mensal = [item[0] for item in stats_mensal]
-    valores_mensal = [item[1] for item in stats_mensal]
-
-# 4. Busca os 5 contratos mais recentes criados (Mantenha o alinhamento/indentação!)
-    top_5_recentes = ContratCond.query.order_by(ContratCond.data_criacao.desc()).limit(5).all()
-
-    # 5. Retornar TUDO para o template (Adicionando a nova variável na lista)
-    return render_template('dashboard.html', 
-                           labels_prod=labels_prod, valores_prod=valores_prod,
-                           labels_regiao=labels_regiao, valores_regiao=valores_regiao,
-                           labels_mensal=labels_mensal, valores_mensal=valores_mensal,
-                           total_financeiro=total_financeiro,
-                           labels_reajuste=labels_reajuste, valores_reajuste=valores_reajuste,
-                           alertas_vencimento=alertas_vencimento,
-                           top_5_recentes=top_5_recentes) # <--- ESSA LINHA É FUNDAMENTAL
+    contexto = servico('cache_dashboard').obter(data_inicio, data_fim, calcular)
+
+    # 3. Retornar TUDO para o template (mesmas variáveis de sempre)
+    return render_template('dashboard.html', **contexto)
 
 # --- ROTA DE GERAÇÃO DE PDF (Unificada e Corrigida) ---
 
+def dados_contrato_pdf(contrato):
+    """Campos do contrato usados no layout do PDF (dicionário simples, sem ORM)."""
+    from pdf_generator import CAMPOS_CONTRATO_PDF
+    return {campo: getattr(contrato, campo) for campo in CAMPOS_CONTRATO_PDF}
+
+
+def resposta_trabalho_pdf(trabalho, status=200):
+    """JSON com o estado de um trabalho de renderização e as URLs para acompanhá-lo."""
+    dados = trabalho.como_dict()
+    dados['status_url'] = url_for('principal.status_trabalho_pdf', id_trabalho=trabalho.id)
+    if trabalho.status == 'concluido':
+        dados['arquivo_url'] = url_for('principal.arquivo_trabalho_pdf', id_trabalho=trabalho.id)
+    return jsonify(dados), status
+
+
 # Rota mantida com o nome da Parte 2 (a mais completa)
-@app.route('/download_contrato_pdf/<int:id>')
+@principal.route('/download_contrato_pdf/<int:id>')
 @login_required
 def download_contrato_pdf(id):
+    from pdf_cache import chave_cache_pdf
+    from pdf_generator import VERSAO_LAYOUT_CONTRATO, linha_data_contrato
+    from servico_pdf import FilaCheia
     # Usa o modelo correto para buscar o contrato real
     contrato = ContratCond.query.get_or_404(id)
+    # '?assincrono=1': não espera a renderização, devolve 202 com o id do trabalho para consulta
+    assincrono = request.args.get('assincrono', type=int) == 1
 
     try:
-        output = io.BytesIO()
-        
-        # === CONFIGURAÇÃO DE REPORTLAB ===
-        margem_superior = 2 * cm
-        margem_inferior = 2 * cm
-        margem_esquerda = 2 * cm
-        margem_direita = 2 * cm
-        page_width, page_height = letter
-
-        p = canvas.Canvas(output, pagesize=letter)
-        styles = getSampleStyleSheet()
-        
-        # Definição de estilos
-        normal_style = ParagraphStyle(name='Normal', fontName='Helvetica', fontSize=10, leading=14, alignment=TA_LEFT)
-        bold_style = ParagraphStyle(name='BoldStyle', parent=normal_style, fontName='Helvetica-Bold')
-        centered_style = ParagraphStyle(name='Centered', parent=normal_style, alignment=TA_CENTER)
-        
-        # Estilos específicos
-        # MUDANÇA 1: Fonte do cabeçalho mantida em 12pt
-        header_style = ParagraphStyle(name='HeaderInfo', parent=normal_style, fontSize=12, leading=14, spaceAfter=0.1 * cm)
-        # MUDANÇA 2: Espaçamento após o título mantido em 0.5 cm
-        title_style = ParagraphStyle(name='ContractTitle', fontName='Helvetica-Bold', fontSize=15, leading=18, alignment=TA_CENTER, spaceAfter=0.5 * cm)
-        right_aligned_style = ParagraphStyle(name='RightAligned', parent=normal_style, alignment=TA_RIGHT, fontSize=10, spaceAfter=0.5 * cm)
-        clausula_style = ParagraphStyle(name='Clausula', parent=normal_style, fontSize=11, leading=16, spaceAfter=0.5 * cm)
-        signature_label_style = ParagraphStyle(name='SignatureLabel', parent=centered_style, fontSize=10, leading=12)
-        footer_style = ParagraphStyle(name='Footer', parent=normal_style, fontName='Helvetica', fontSize=8, alignment=TA_CENTER)
-        
-        current_y = page_height - margem_superior
-        content_width = page_width - margem_esquerda - margem_direita
-        
-        # --- CABEÇALHO (Logo e Info da Empresa) ---
-        logo_path = os.path.join(os.getcwd(), 'static', 'logo.png')
-        logo_width = 3 * cm
-        logo_height = 1.5 * cm
+        dados = dados_contrato_pdf(contrato)
+        data_emissao = datetime.now()
+
+        # O PDF só muda se mudarem os dados, o layout ou a data impressa: procura no cache primeiro
+        chave = chave_cache_pdf(dados, VERSAO_LAYOUT_CONTRATO, linha_data_contrato(data_emissao))
+        caminho_pdf = servico('cache_pdf').obter(chave)
+        if caminho_pdf is None:
+            # A renderização roda no pool de processos, fora deste worker; espera até o prazo
+            trabalho = servico('servico_pdf').submeter(chave, dados, data_emissao)
+            caminho_pdf = trabalho.aguardar(0 if assincrono else current_app.config['PDF_RENDER_ESPERA'])
+            if caminho_pdf is None:
+                if assincrono:
+                    return resposta_trabalho_pdf(trabalho, 202)
+                flash('O PDF ainda está sendo gerado. Tente novamente em instantes.', 'warning')
+                return redirect(url_for('principal.index'))
 
-        # 1. Tenta desenhar o logo
-        try:
-            p.drawImage(logo_path, margem_esquerda, current_y - logo_height, width=logo_width, height=logo_height)
-        except Exception as e:
-            # Fallback (Desenha o texto M.A. Automação no lugar)
-            fallback_para = Paragraph("M.A. Automação", bold_style)
-            fallback_para.wrapOn(p, logo_width, page_height)
-            fallback_para.drawOn(p, margem_esquerda, current_y - fallback_para.height)
+        filename = f"contrato_{contrato.nome.replace(' ', '_').replace('.', '').replace('/', '')}.pdf"
+        # conditional=True: responde 304 para If-None-Match (ETag = chave) / If-Modified-Since
+        return send_file(caminho_pdf, as_attachment=True, download_name=filename, mimetype='application/pdf',
+                         etag=chave, conditional=True)
+
+    except FilaCheia as e:
+        if assincrono:
+            return jsonify({'erro': str(e)}), 503, {'Retry-After': '5'}
+        flash(str(e), 'warning')
+        return redirect(url_for('principal.index'))
+    except Exception as e:
+        # Aumentei o nível de detalhes para debugging em caso de erro.
+        flash(f'Erro ao gerar o PDF: {e}', 'danger')
+        print(f'Erro ao gerar o PDF: {e}')
+        # print(f"Erro detalhado ao carregar logo: {os.path.join(os.getcwd(), 'static', 'logo.png')}") 
+        return redirect(url_for('principal.index'))
 
-        # 2. Informações da empresa ao lado do logo
-        info_x = margem_esquerda + logo_width + 0.5 * cm
-        info_width = content_width - logo_width - 0.5 * cm
 
-        empresa_para = Paragraph("M.A. Automação", header_style)
-        cnpj_para = Paragraph("CNPJ: 27.857.310/0001-83", header_style)
+@principal.route('/pdf/trabalhos/<id_trabalho>')
+@login_required
+def status_trabalho_pdf(id_trabalho):
+    trabalho = servico('servico_pdf').obter(id_trabalho)
+    if trabalho is None:
+        return jsonify({'erro': 'Trabalho não encontrado.'}), 404
+    return resposta_trabalho_pdf(trabalho)
 
-        # Desenha "M.A. Automação"
-        empresa_para.wrapOn(p, info_width, page_height)
-        empresa_para.drawOn(p, info_x, current_y - empresa_para.height)
-        
-        # Desenha CNPJ
-        cnpj_para.wrapOn(p, info_width, page_height)
-        cnpj_para.drawOn(p, info_x, current_y - empresa_para.height - cnpj_para.height)
-        
-        # Ajusta a altura atual após o cabeçalho (usa o elemento mais alto: o logo)
-        current_y -= logo_height + 0.5 * cm
-        
-        # Linha separadora do cabeçalho
-        p.line(margem_esquerda, current_y, page_width - margem_direita, current_y)
-        current_y -= 0.5 * cm
-
-        # --- TÍTULO DO CONTRATO ---
-        title_para = Paragraph("CONTRATO DE PRESTAÇÃO DE SERVIÇOS", title_style)
-        title_para.wrapOn(p, content_width, page_height)
-        title_x = margem_esquerda + (content_width - title_para.width) / 2
-        title_para.drawOn(p, title_x, current_y - title_para.height)
-        current_y -= title_para.height
-        
-        # Espaçamento entre o título e a data
-        current_y -= 0.5 * cm 
-
-        # --- LOCAL E DATA ---
-        data_atual = datetime.now()
-        meses = {1: 'janeiro', 2: 'fevereiro', 3: 'março', 4: 'abril', 5: 'maio', 6: 'junho', 7: 'julho', 8: 'agosto', 9: 'setembro', 10: 'outubro', 11: 'novembro', 12: 'dezembro'}
-        data_formatada = f"São Paulo, {data_atual.day} de {meses.get(data_atual.month, '')} de {data_atual.year}"
-        local_data_para = Paragraph(data_formatada, right_aligned_style)
-        
-        local_data_para.wrapOn(p, content_width, page_height)
-        local_data_x = page_width - margem_direita - local_data_para.width # Alinha à direita
-        local_data_para.drawOn(p, local_data_x, current_y - local_data_para.height) 
-        current_y -= local_data_para.height 
-        
-        # MUDANÇA 1: Aumenta o espaçamento após a data (entre a data e o bloco de detalhes)
-        current_y -= 1.0 * cm 
 
-        # --- DADOS DO CONTRATO (2 COLUNAS) ---
-        
-        # Definindo colunas e suas larguras
-        col_labels_width = 3.5 * cm
-        col_values_width = 6 * cm
-        
-        col1_x = margem_esquerda
-        col2_x = margem_esquerda + col_labels_width + col_values_width
-        
-        # Definindo os dados em pares de [Chave, Valor]
-        contrato_details_pairs = [
-            # Coluna 1
-            [('Nome:', contrato.nome), ('CNPJ:', contrato.cnpj), ('Telefone:', contrato.telefone), ('Email:', contrato.email), ('Valor do Contrato:', format_currency_br(contrato.valor_contrato)), ('Início do Contrato:', contrato.inicio_contrato.strftime('%d de %B de %Y') if contrato.inicio_contrato else 'Não definido')],
-            # Coluna 2
-            [('Término do Contrato:', contrato.termino_contrato.strftime('%d de %B de %Y') if contrato.termino_contrato else 'Não definido'), ('Abrangência do Contrato:', contrato.abrangencia_contrato), ('Tipo de Índice de Reajuste:', contrato.tipo_indice), ('Endereço Completo:', f"{contrato.endereco}, {contrato.cep}, {contrato.estado}")]
-        ]
-
-        # Ajuste vertical para o layout de duas colunas
-        start_y = current_y
-
-        # Processa Coluna 1 (primeiro elemento de cada par)
-        col1_y = start_y
-        for label, value in contrato_details_pairs[0]:
-            label_para = Paragraph(f"<b>{label}</b>", normal_style)
-            value_para = Paragraph(str(value), normal_style)
-            
-            # Desenha Label (esquerda)
-            label_para.wrapOn(p, col_labels_width, page_height)
-            label_para.drawOn(p, col1_x, col1_y - label_para.height)
-            
-            # Desenha Valor (direita da Coluna 1)
-            value_para.wrapOn(p, col_values_width, page_height)
-            value_para.drawOn(p, col1_x + col_labels_width, col1_y - value_para.height)
-            
-            # Atualiza Y
-            col1_y -= max(label_para.height, value_para.height) + 0.2 * cm
-            
-        # Processa Coluna 2 (segundo elemento de cada par)
-        col2_y = start_y
-        for label, value in contrato_details_pairs[1]:
-            label_para = Paragraph(f"<b>{label}</b>", normal_style)
-            value_para = Paragraph(str(value), normal_style)
-            
-            # Desenha Label (esquerda)
-            label_para.wrapOn(p, col_labels_width, page_height)
-            label_para.drawOn(p, col2_x, col2_y - label_para.height)
-            
-            # Desenha Valor (direita da Coluna 2)
-            value_para.wrapOn(p, col_values_width, page_height)
-            value_para.drawOn(p, col2_x + col_labels_width, col2_y - value_para.height)
-            
-            # Atualiza Y
-            col2_y -= max(label_para.height, value_para.height) + 0.2 * cm
-
-        # O novo Y atual deve ser o menor entre col1_y e col2_y
-        current_y = min(col1_y, col2_y) - 0.5 * cm 
-
-        # --- CLÁUSULA PRIMEIRA ---
-        # Título da Cláusula
-        clausula_title_para = Paragraph("<u>CLÁUSULA PRIMEIRA - DO OBJETO</u>", bold_style)
-        clausula_title_para.wrapOn(p, content_width, page_height)
-        clausula_title_para.drawOn(p, margem_esquerda, current_y - clausula_title_para.height)
-        current_y -= clausula_title_para.height + 0.2 * cm
-
-        # Texto da Cláusula (Adaptado para contrato)
-        clausula_objeto_text = f"""
-        Pelo presente instrumento, as partes acima qualificadas, de comum acordo, 
-        ajustam a prestação dos serviços de {contrato.abrangencia_contrato or ' [ÁREA DE SERVIÇO] '}, 
-        mediante as especificações e condições estabelecidas neste documento, com início em 
-        {contrato.inicio_contrato.strftime('%d/%m/%Y') if contrato.inicio_contrato else ' [DATA INICIAL] '} 
-        e término em 
-        {contrato.termino_contrato.strftime('%d/%m/%Y') if contrato.termino_contrato else ' [DATA FINAL] '}, 
-        com o valor total de {format_currency_br(contrato.valor_contrato)}.
-        """
-        clausula_para = Paragraph(clausula_objeto_text, clausula_style)
-        clausula_para.wrapOn(p, content_width, page_height)
-        clausula_para.drawOn(p, margem_esquerda, current_y - clausula_para.height)
-        current_y -= clausula_para.height + 0.5 * cm
-        
-        # Cláusulas Adicionais (Se houverem)
-        if contrato.clausulas_adicionais:
-            clausula_adicional_title = Paragraph("<u>CLÁUSULAS ADICIONAIS</u>", bold_style)
-            clausula_adicional_title.wrapOn(p, content_width, page_height)
-            clausula_adicional_title.drawOn(p, margem_esquerda, current_y - clausula_adicional_title.height)
-            current_y -= clausula_adicional_title.height + 0.2 * cm
-            
-            clausulas_adicionais_para = Paragraph(contrato.clausulas_adicionais, clausula_style)
-            clausulas_adicionais_para.wrapOn(p, content_width, page_height)
-            clausulas_adicionais_para.drawOn(p, margem_esquerda, current_y - clausulas_adicionais_para.height)
-            current_y -= clausulas_adicionais_para.height + 0.5 * cm
-            
-            # Se houverem cláusulas adicionais, adiciona um espaço maior antes do aceite
-            space_after_clausulas = 2.0 * cm 
-        else:
-            # Caso contrário, um espaço menor
-            space_after_clausulas = 1.5 * cm
+@principal.route('/pdf/trabalhos/<id_trabalho>/arquivo')
+@login_required
+def arquivo_trabalho_pdf(id_trabalho):
+    trabalho = servico('servico_pdf').obter(id_trabalho)
+    if trabalho is None:
+        return jsonify({'erro': 'Trabalho não encontrado.'}), 404
+    if trabalho.status != 'concluido':
+        return resposta_trabalho_pdf(trabalho, 202 if trabalho.status == 'pendente' else 500)
+    caminho_pdf = servico('cache_pdf').obter(trabalho.chave)
+    if caminho_pdf is None:
+        # Já saiu do cache: um novo download gera de novo
+        return jsonify({'erro': 'O PDF expirou do cache. Faça o download novamente.'}), 410
+    return send_file(caminho_pdf, as_attachment=True, download_name=f"contrato_{trabalho.id}.pdf",
+                     mimetype='application/pdf', etag=trabalho.chave, conditional=True)
+
+
+@principal.route('/pdf/metricas')
+@login_required
+def metricas_pdf():
+    """Fila e tempos de renderização do serviço de PDF (deste processo)."""
+    return jsonify(servico('servico_pdf').metricas())
 
-        # --- TEXTO DE ACEITE (Li e concordo...) ---
-        
-        # Define o ponto mínimo onde a frase de aceite deve começar (3 cm acima da linha de assinatura, deixando 1cm para a frase e 0.5cm de margem)
-        y_line_position_signature = margem_inferior + 3 * cm
-        y_assinaturas_min = y_line_position_signature + 1.5 * cm # 1.5 cm acima da linha de assinatura
 
-        # MUDANÇA 2: Calcula a posição Y da frase de aceite
-        # Posição calculada com base no fim da última cláusula + espaçamento
-        y_calculated_for_aceite = current_y - space_after_clausulas 
-        
-        # Usa a posição calculada, mas garante que não seja menor que o mínimo
-        final_y_aceite = max(y_calculated_for_aceite, y_assinaturas_min)
-             
-        # Texto e Estilo
-        aceite_text = "Li e concordo com os termos do contrato."
-        aceite_style = ParagraphStyle(name='Aceite', parent=centered_style, fontName='Helvetica', fontSize=10, leading=12)
-
-        aceite_para = Paragraph(aceite_text, aceite_style)
-        aceite_para.wrapOn(p, content_width, page_height)
-
-        # Desenha o texto de aceite no Y ajustado
-        aceite_x = margem_esquerda + (content_width - aceite_para.width) / 2
-        aceite_para.drawOn(p, aceite_x, final_y_aceite - aceite_para.height)
-        
-        # Atualiza current_y para a próxima seção
-        current_y = final_y_aceite - aceite_para.height - 0.5 * cm
+@principal.route('/exportar_contratos_pdf')
+@login_required
+def exportar_contratos_pdf():
+    """ZIP com os PDFs dos contratos filtrados, transmitido conforme os PDFs ficam prontos.
 
-        # --- ASSINATURAS (Posicionamento Fixo) ---
-        
-        signature_line_length = 6 * cm 
-        
-        # Assinatura Empresa (Esquerda)
-        x_empresa_center = margem_esquerda + (content_width / 4)
-        x_empresa_line_start = x_empresa_center - (signature_line_length / 2)
-        
-        p.line(x_empresa_line_start, y_line_position_signature, x_empresa_line_start + signature_line_length, y_line_position_signature)
-        
-        empresa_label_para = Paragraph("Assinatura Empresa (M.A. Automação)", signature_label_style)
-        empresa_label_para.wrapOn(p, signature_line_length, page_height)
-        empresa_label_y = y_line_position_signature - empresa_label_para.height - 0.2 * cm
-        empresa_label_para.drawOn(p, x_empresa_line_start, empresa_label_y)
-
-        # Assinatura Contratante (Direita)
-        x_contratante_center = margem_esquerda + (content_width * 3 / 4)
-        x_contratante_line_start = x_contratante_center - (signature_line_length / 2)
-        
-        p.line(x_contratante_line_start, y_line_position_signature, x_contratante_line_start + signature_line_length, y_line_position_signature)
-        
-        contratante_nome_para = Paragraph(contrato.nome.upper(), signature_label_style)
-        contratante_nome_para.wrapOn(p, signature_line_length, page_height)
-        contratante_nome_y = y_line_position_signature - contratante_nome_para.height - 0.2 * cm
-        contratante_nome_para.drawOn(p, x_contratante_line_start, contratante_nome_y)
+    Filtros: 'termo' (mesma busca da listagem) e/ou 'data_inicio'/'data_fim' (mesmo período do dashboard).
+    """
+    from exportacao_pdf import gerar_zip_pdfs, nome_arquivo_pdf
+    termo = request.args.get('termo', '')
+    data_inicio = request.args.get('data_inicio')
+    data_fim = request.args.get('data_fim')
+
+    query = ContratCond.query
+    if termo:
+        query = aplicar_busca(query, ContratCond, termo, db.session.connection())
+    else:
+        query = query.order_by(ContratCond.data_criacao.desc(), ContratCond.id.desc())
+    query = filtrar_periodo(query, ContratCond, data_inicio, data_fim)
+
+    limite = current_app.config['PDF_EXPORT_MAX_CONTRATOS']
+    contratos = query.limit(limite + 1).all()
+    if not contratos:
+        flash('Nenhum contrato encontrado para exportar.', 'warning')
+        return redirect(url_for('principal.index', termo=termo or None))
+    if len(contratos) > limite:
+        flash(f'A exportação é limitada a {limite} contratos. Refine o filtro.', 'warning')
+        return redirect(url_for('principal.index', termo=termo or None))
+
+    # Só dicionários simples seguem para o gerador: a sessão não é usada durante o streaming
+    itens = [(nome_arquivo_pdf(contrato.id, contrato.nome), dados_contrato_pdf(contrato)) for contrato in contratos]
+    corpo = gerar_zip_pdfs(itens, datetime.now(), cache_pdf=servico('cache_pdf'),
+                           workers=current_app.config['PDF_EXPORT_WORKERS'])
+    nome_zip = f"contratos_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+    return current_app.response_class(corpo, mimetype='application/zip',
+                              headers={'Content-Disposition': f'attachment; filename={nome_zip}'})
+
+    # --- FUNÇÕES DE UTILIDADE (Continuação) ---
+# ... (sua função format_currency_br está aqui)
 
-        contratante_label_para = Paragraph("Assinatura Contratante", signature_label_style)
-        contratante_label_para.wrapOn(p, signature_line_length, page_height)
-        contratante_label_y = contratante_nome_y - contratante_label_para.height - 0.2 * cm 
-        contratante_label_para.drawOn(p, x_contratante_line_start, contratante_label_y)
+# --- COMANDOS DE LINHA DE COMANDO (flask <comando>) ---
+
+@principal.cli.command('criar-banco')
+def criar_banco_command():
+    """Cria as tabelas que faltam, o índice de busca, o resumo do dashboard e o usuário admin."""
+    db.create_all()
+    # Garante o índice textual também em bancos criados antes dele existir
+    with db.engine.begin() as conexao:
+        criar_indice_busca(conexao)
+    # Popula o resumo do dashboard em bancos que já tinham contratos
+    if resumos_precisam_reconstrucao(db.session, ContratCond, ResumoContratos):
+        reconstruir_resumos(db.session, ContratCond, ResumoContratos)
+    print("Tabelas criadas com sucesso (se não existirem).")
+    # Cria usuário admin (se não existir)
+    if not User.query.filter_by(username='admin').first():
+        admin_user = User(username='admin', email='admin@example.com')
+        admin_user.set_password('admin')
+        db.session.add(admin_user)
+        db.session.commit()
+        print("Usuário 'admin' (senha: 'admin') criado.")
 
-        # --- RODAPÉ (Fixo) ---
-        footer_para = Paragraph(RODAPE_TEXTO, footer_style)
-        footer_para.wrapOn(p, content_width, page_height)
-        footer_x_center = margem_esquerda + (content_width - footer_para.width) / 2 
-        footer_para.drawOn(p, footer_x_center, margem_inferior - (0.5 * cm) ) 
+@principal.cli.command('reconstruir-resumos')
+def reconstruir_resumos_command():
+    """Recalcula a tabela de resumo do dashboard a partir dos contratos."""
+    linhas = reconstruir_resumos(db.session, ContratCond, ResumoContratos)
+    print(f"Resumo do dashboard reconstruído ({linhas} linhas).")
 
-        # === FIM DA LÓGICA DO PDF ===
+@principal.cli.command('carregar-ceps')
+@click.argument('arquivo', type=click.Path(exists=True, dir_okay=False))
+def carregar_ceps_command(arquivo):
+    """Pré-carrega a base local de CEPs a partir de um CSV (cep,logradouro,bairro,localidade,uf)."""
+    from consulta_cep import carregar_ceps, ler_arquivo_ceps
+    total = carregar_ceps(db.session, CepEndereco, ler_arquivo_ceps(arquivo))
+    print(f"{total} CEPs carregados.")
 
-        p.save()
 
-        output.seek(0)
-        filename = f"contrato_{contrato.nome.replace(' ', '_').replace('.', '').replace('/', '')}.pdf"
-        return send_file(output, as_attachment=True, download_name=filename, mimetype='application/pdf')
+# --- FÁBRICA DO APP ---
 
-    except Exception as e:
-        # Aumentei o nível de detalhes para debugging em caso de erro.
-        flash(f'Erro ao gerar o PDF: {e}', 'danger')
-        print(f'Erro ao gerar o PDF: {e}')
-        # print(f"Erro detalhado ao carregar logo: {os.path.join(os.getcwd(), 'static', 'logo.png')}") 
-        return redirect(url_for('index'))
-    
-    # --- FUNÇÕES DE UTILIDADE (Continuação) ---
-# ... (sua função format_currency_br está aqui)
+def create_app(config=None):
+    """Cria o app Flask: configuração padrão + `config`, extensões, rotas e comandos.
 
-# --- REGISTRO DO FILTRO JINJA ---
-with app.app_context():
-    # Registra a função Python 'format_currency_br' para que seja acessível
-    # nos templates HTML como o filtro 'currency_br'
+    Nada é feito no banco aqui (o esquema é criado com 'flask criar-banco' ou
+    'flask db upgrade') e os serviços pesados só são montados no primeiro uso.
+    """
+    app = Flask(__name__)
+    configurar(app)
+    if config:
+        app.config.update(config)
+
+    db.init_app(app)
+    login_manager.init_app(app)
+    migrate.init_app(app, db)
+
+    app.register_blueprint(principal)
+    # Filtro 'currency_br' nos templates
     app.jinja_env.filters['currency_br'] = format_currency_br
+    return app
+
 
-# --- ROTAS DE AUTENTICAÇÃO --- 
-# ... (restante do código)
+# App usado pelo gunicorn (app:app), pelo comando flask e pelos testes
+app = create_app()
 
 
 if __name__ == '__main__':
     # Para rodar localmente, o 'requests' é usado no /api/cnpj/<cnpj>
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
@@ -0,0 +1,167 @@
+# benchmarks/bench_api_cnpj_async.py
+# Teste de carga de /api/cnpj: rota Flask síncrona x app ASGI (api_async).
+#
+# Um servidor local faz o papel da ReceitaWS, respondendo cada CNPJ depois de
+# `--atraso` ms. Cada requisição usa um CNPJ diferente (sem acerto de cache),
+# então todo o tempo é espera pelo provedor.
+#
+# "sync":  Flask em um servidor WSGI com `--threads` threads (como um worker gthread do gunicorn).
+# "async": api_async.app no uvicorn, um worker (um event loop).
+#
+# Uso: python benchmarks/bench_api_cnpj_async.py [-n 400] [-c 100] [--atraso 200] [--threads 8]
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from werkzeug.serving import ThreadedWSGIServer  # noqa: E402
+
+import api_async  # noqa: E402
+import app as aplicacao  # noqa: E402
+from cache import CacheMemoria  # noqa: E402
+from consulta_cnpj import (ConsultaCNPJ, Provedor, criar_busca_cnpj, criar_busca_cnpj_async,  # noqa: E402
+                           normalizar_receitaws)
+from http_cliente import ClienteHTTP, ClienteHTTPAsync  # noqa: E402
+
+
+def gerar_cnpjs(quantidade, inicio=10000000):
+    """CNPJs válidos (dígitos verificadores corretos) e distintos."""
+    def digito(numeros, pesos):
+        resto = sum(int(n) * p for n, p in zip(numeros, pesos)) % 11
+        return '0' if resto < 2 else str(11 - resto)
+    cnpjs = []
+    for i in range(inicio, inicio + quantidade):
+        base = f"{i:08d}0001"
+        base += digito(base, [5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
+        base += digito(base, [6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
+        cnpjs.append(base)
+    return cnpjs
+
+
+class _ServidorProvedor(ThreadingHTTPServer):
+    request_queue_size = 1024  # o padrão (5) derruba conexões simultâneas e distorce a medição
+    daemon_threads = True
+
+
+class _ReceitaWSLenta(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    atraso = 0.2
+
+    def do_GET(self):
+        time.sleep(self.atraso)
+        corpo = json.dumps({'status': 'OK', 'nome': 'CONDOMINIO ' + self.path.rsplit('/', 1)[-1]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass
+
+
+class _ServidorWSGIThreads(ThreadedWSGIServer):
+    """Servidor WSGI com um número fixo de threads (o de desenvolvimento cria uma por requisição)."""
+
+    request_queue_size = 1024
+
+    def __init__(self, *args, threads=8, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = ThreadPoolExecutor(threads)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self.process_request_thread, request, client_address)
+
+
+def _em_thread(alvo):
+    thread = threading.Thread(target=alvo, daemon=True)
+    thread.start()
+    return thread
+
+
+async def carga(url_base, cnpjs, concorrencia):
+    """Dispara as consultas com `concorrencia` em paralelo; (segundos, latências, erros)."""
+    limites = httpx.Limits(max_connections=concorrencia, max_keepalive_connections=concorrencia)
+    latencias, erros = [], 0
+    fila = iter(cnpjs)
+
+    async def cliente_carga(cliente):
+        nonlocal erros
+        for cnpj in fila:
+            inicio = time.perf_counter()
+            resposta = await cliente.get(f"{url_base}/api/cnpj/{cnpj}")
+            latencias.append(time.perf_counter() - inicio)
+            erros += resposta.status_code != 200
+
+    async with httpx.AsyncClient(limits=limites, timeout=120) as cliente:
+        inicio = time.perf_counter()
+        await asyncio.gather(*(cliente_carga(cliente) for _ in range(concorrencia)))
+        return time.perf_counter() - inicio, latencias, erros
+
+
+def relatorio(nome, total, segundos, latencias, erros):
+    latencias.sort()
+    print(f"{nome:6s} {total / segundos:8.1f} req/s  p50 {statistics.median(latencias) * 1000:7.0f} ms  "
+          f"p95 {latencias[int(0.95 * len(latencias)) - 1] * 1000:7.0f} ms  erros {erros}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', type=int, default=400, help='consultas por cenário')
+    parser.add_argument('-c', type=int, default=100, help='consultas simultâneas')
+    parser.add_argument('--atraso', type=int, default=200, help='atraso do provedor falso (ms)')
+    parser.add_argument('--threads', type=int, default=8, help='threads do servidor síncrono')
+    args = parser.parse_args()
+
+    _ReceitaWSLenta.atraso = args.atraso / 1000
+    provedor = _ServidorProvedor(('127.0.0.1', 0), _ReceitaWSLenta)
+    _em_thread(provedor.serve_forever)
+    url_provedor = f"http://127.0.0.1:{provedor.server_port}/v1/cnpj/{{cnpj}}"
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    aplicacao.app.config['LOGIN_DISABLED'] = True
+    cliente = ClienteHTTP('bench', tentativas=1, timeout_leitura=60, tamanho_pool=args.c, limite_falhas=10 ** 6)
+
+    # Síncrono: a rota Flask de sempre, com o provedor falso e cache em memória
+    aplicacao.consulta_cnpj = ConsultaCNPJ(
+        CacheMemoria(max_itens=10 ** 6), criar_busca_cnpj([Provedor('bench', url_provedor, cliente, normalizar_receitaws)]))
+    servidor_sync = _ServidorWSGIThreads('127.0.0.1', 0, aplicacao.app, threads=args.threads)
+    _em_thread(servidor_sync.serve_forever)
+    segundos, latencias, erros = asyncio.run(
+        carga(f"http://127.0.0.1:{servidor_sync.server_port}", gerar_cnpjs(args.n), args.c))
+    print(f"{args.n} consultas, {args.c} simultâneas, provedor com {args.atraso} ms de atraso")
+    relatorio('sync', args.n, segundos, latencias, erros)
+    servidor_sync.shutdown()
+
+    # Assíncrono: api_async no uvicorn, um worker
+    api_async.consulta_cnpj = ConsultaCNPJ(
+        CacheMemoria(max_itens=10 ** 6), None,
+        buscar_async=criar_busca_cnpj_async([Provedor('bench', url_provedor, ClienteHTTPAsync(cliente),
+                                                      normalizar_receitaws)]))
+    servidor_async = uvicorn.Server(uvicorn.Config(api_async.app, host='127.0.0.1', port=0, log_level='warning'))
+    _em_thread(servidor_async.run)
+    while not servidor_async.started:
+        time.sleep(0.05)
+    porta = servidor_async.servers[0].sockets[0].getsockname()[1]
+    segundos, latencias, erros = asyncio.run(
+        carga(f"http://127.0.0.1:{porta}", gerar_cnpjs(args.n, inicio=20000000), args.c))
+    relatorio('async', args.n, segundos, latencias, erros)
+    servidor_async.should_exit = True
+
+    provedor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+# benchmarks/bench_login.py
+# Logins por segundo por núcleo para cada método/custo de hash de senha.
+#
+# Mede o custo da verificação (check_password_hash) em uma thread, que é o que
+# limita o login, e depois a mesma carga pelo VerificadorSenhas com `--workers`
+# threads (o hashlib libera o GIL, então com mais núcleos a vazão escala).
+#
+# Uso: python benchmarks/bench_login.py [-n 20] [--workers 2]
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import check_password_hash  # noqa: E402
+
+from senhas import VerificadorSenhas, gerar_hash  # noqa: E402
+
+METODOS = ('scrypt', 'scrypt:16384:8:1', 'pbkdf2:sha256:1000000', 'pbkdf2:sha256:600000')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', type=int, default=20, help='verificações por método')
+    parser.add_argument('--workers', type=int, default=2, help='threads do VerificadorSenhas')
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} núcleo(s); {args.n} verificações por método")
+    for metodo in METODOS:
+        hash_senha = gerar_hash('senha-do-sindico', metodo)
+
+        inicio = time.perf_counter()
+        for _ in range(args.n):
+            check_password_hash(hash_senha, 'senha-do-sindico')
+        por_nucleo = args.n / (time.perf_counter() - inicio)
+
+        verificador = VerificadorSenhas(workers=args.workers, max_fila=args.n)
+        with ThreadPoolExecutor(args.n) as requisicoes:
+            inicio = time.perf_counter()
+            list(requisicoes.map(lambda _: verificador.verificar(hash_senha, 'senha-do-sindico'), range(args.n)))
+            no_pool = args.n / (time.perf_counter() - inicio)
+        verificador.encerrar()
+
+        print(f"{metodo:24s} {por_nucleo:7.1f} logins/s por núcleo   "
+              f"{no_pool:7.1f} logins/s com {args.workers} workers")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+# benchmarks/bench_renderizacao_pdf.py
+# Tempo por renderização do contrato em PDF, antes e depois dos recursos compartilhados.
+#
+# "antes": descarta estilos e logo antes de cada PDF (o que acontecia a cada chamada)
+#           e codifica as imagens em ASCII85, como antes.
+# "depois": estilos e logo montados uma vez (pdf_recursos) e reaproveitados.
+#
+# Uso: python benchmarks/bench_renderizacao_pdf.py [-n 200]
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_generator import gerar_contrato_pdf  # noqa: E402
+from reportlab import rl_config  # noqa: E402
+
+from pdf_recursos import limpar_recursos  # noqa: E402
+
+DADOS = {
+    'nome': 'CONDOMINIO BENCHMARK', 'cnpj': '11.222.333/0001-81', 'telefone': '1199999999',
+    'email': 'sindico@teste.com', 'valor_contrato': 1500, 'inicio_contrato': date(2025, 1, 1),
+    'termino_contrato': date(2026, 1, 1), 'abrangencia_contrato': 'Total', 'tipo_indice': 'IPCA',
+    'endereco': 'Rua das Flores, 10', 'cep': '01000-000', 'estado': 'SP', 'clausulas_adicionais': '',
+}
+
+
+def medir(n, limpar_antes):
+    rl_config.useA85 = 1 if limpar_antes else 0
+    tempos = []
+    for _ in range(n):
+        if limpar_antes:
+            limpar_recursos()
+        inicio = time.perf_counter()
+        gerar_contrato_pdf(DADOS, datetime(2025, 3, 1))
+        tempos.append(time.perf_counter() - inicio)
+    return tempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', type=int, default=200, help='renderizações por cenário')
+    args = parser.parse_args()
+
+    medir(5, False)  # aquecimento (imports, caches do ReportLab)
+    for nome, limpar_antes in (('antes (recria estilos e logo)', True), ('depois (recursos compartilhados)', False)):
+        tempos = medir(args.n, limpar_antes)
+        print(f"{nome:36s} mediana {statistics.median(tempos) * 1000:7.2f} ms  "
+              f"média {statistics.mean(tempos) * 1000:7.2f} ms  ({args.n} PDFs)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+# busca.py
+# Índice de busca textual (full-text) para a listagem de contratos.
+#
+# - SQLite: tabela virtual FTS5 espelhando contrat_cond, mantida por triggers
+#   (INSERT/UPDATE/DELETE), com ranking por bm25().
+# - PostgreSQL: índice GIN sobre um tsvector (expressão), com ranking por ts_rank().
+# - Outros bancos (ou SQLite sem FTS5): volta para o ILIKE original.
+# - Termos que parecem CNPJ (8+ dígitos) vão direto ao índice B-tree de cnpj_digits.
+
+import re
+
+from sqlalchemy import event, text, func, literal_column, Integer, Float
+
+TABELA_FTS = 'contrat_cond_fts'
+INDICE_GIN = 'ix_contrat_cond_busca_gin'
+
+# Expressão usada tanto no índice GIN quanto na consulta (precisam ser idênticas
+# para que o PostgreSQL use o índice).
+TSVECTOR_PG = (
+    "to_tsvector('simple', coalesce(nome, '') || ' ' || coalesce(endereco, '') || ' ' || "
+    "coalesce(cnpj, '') || ' ' || regexp_replace(coalesce(cnpj, ''), '\\D', '', 'g'))"
+)
+
+# CNPJ apenas com dígitos (a tokenização do FTS quebra '12.345.678/0001-90' em pedaços).
+_CNPJ_DIGITOS_SQLITE = "replace(replace(replace(replace({0}.cnpj, '.', ''), '/', ''), '-', ''), ' ', '')"
+
+_DDL_SQLITE = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA_FTS} USING fts5(
+        nome, endereco, cnpj, cnpj_digitos,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS contrat_cond_fts_ai AFTER INSERT ON contrat_cond BEGIN
+        INSERT INTO {TABELA_FTS}(rowid, nome, endereco, cnpj, cnpj_digitos)
+        VALUES (new.id, new.nome, new.endereco, new.cnpj, {_CNPJ_DIGITOS_SQLITE.format('new')});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS contrat_cond_fts_ad AFTER DELETE ON contrat_cond BEGIN
+        DELETE FROM {TABELA_FTS} WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS contrat_cond_fts_au AFTER UPDATE OF nome, endereco, cnpj ON contrat_cond BEGIN
+        DELETE FROM {TABELA_FTS} WHERE rowid = old.id;
+        INSERT INTO {TABELA_FTS}(rowid, nome, endereco, cnpj, cnpj_digitos)
+        VALUES (new.id, new.nome, new.endereco, new.cnpj, {_CNPJ_DIGITOS_SQLITE.format('new')});
+    END""",
+]
+
+
+def _dialeto(bind):
+    return bind.dialect.name
+
+
+def criar_indice_busca(bind):
+    """Cria (se necessário) a estrutura de busca textual e a popula com os dados existentes.
+
+    É idempotente: pode ser chamada na inicialização do app e em migrações.
+    Retorna True se o índice textual está disponível para o banco.
+    """
+    dialeto = _dialeto(bind)
+
+    if dialeto == 'sqlite':
+        existe = bind.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :nome"
+        ), {'nome': TABELA_FTS}).first()
+        try:
+            for ddl in _DDL_SQLITE:
+                bind.execute(text(ddl))
+        except Exception:
+            # SQLite compilado sem FTS5: a busca usa o ILIKE de fallback
+            return False
+        if not existe:
+            # Primeira criação: copia os contratos que já estavam na tabela
+            bind.execute(text(
+                f"INSERT INTO {TABELA_FTS}(rowid, nome, endereco, cnpj, cnpj_digitos) "
+                f"SELECT id, nome, endereco, cnpj, {_CNPJ_DIGITOS_SQLITE.format('contrat_cond')} "
+                f"FROM contrat_cond"
+            ))
+        return True
+
+    if dialeto == 'postgresql':
+        # O índice de expressão é mantido pelo próprio PostgreSQL a cada escrita
+        bind.execute(text(
+            f"CREATE INDEX IF NOT EXISTS {INDICE_GIN} ON contrat_cond USING GIN (({TSVECTOR_PG}))"
+        ))
+        return True
+
+    return False
+
+
+def remover_indice_busca(bind):
+    """Remove a estrutura de busca textual (usada no drop_all e no downgrade)."""
+    dialeto = _dialeto(bind)
+    if dialeto == 'sqlite':
+        for trigger in ('contrat_cond_fts_ai', 'contrat_cond_fts_ad', 'contrat_cond_fts_au'):
+            bind.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+        bind.execute(text(f"DROP TABLE IF EXISTS {TABELA_FTS}"))
+    elif dialeto == 'postgresql':
+        bind.execute(text(f"DROP INDEX IF EXISTS {INDICE_GIN}"))
+
+
+def registrar_indice_busca(tabela):
+    """Acopla a criação/remoção do índice textual ao create_all()/drop_all() da tabela."""
+    event.listen(tabela, 'after_create', lambda target, connection, **kw: criar_indice_busca(connection))
+    event.listen(tabela, 'before_drop', lambda target, connection, **kw: remover_indice_busca(connection))
+
+
+def indice_busca_disponivel(bind):
+    """Verifica se o índice textual existe no banco atual."""
+    dialeto = _dialeto(bind)
+    if dialeto == 'sqlite':
+        return bind.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :nome"
+        ), {'nome': TABELA_FTS}).first() is not None
+    return dialeto == 'postgresql'
+
+
+# Termo composto só por dígitos e pontuação de máscara, com ao menos a raiz do CNPJ (8 dígitos)
+_PADRAO_TERMO_CNPJ = re.compile(r'^[\d./\-\s]+$')
+_MIN_DIGITOS_CNPJ = 8
+
+
+def filtro_prefixo_cnpj(modelo, termo):
+    """Retorna o filtro por prefixo em cnpj_digits quando o termo parece um CNPJ, senão None.
+
+    Usa um intervalo (>= prefixo e < prefixo + ':') em vez de LIKE para que o
+    índice B-tree seja usado em qualquer banco (':' vem logo depois de '9').
+    """
+    if not termo or not _PADRAO_TERMO_CNPJ.match(termo):
+        return None
+    digitos = re.sub(r'\D', '', termo)
+    if len(digitos) < _MIN_DIGITOS_CNPJ:
+        return None
+    if len(digitos) >= 14:
+        return modelo.cnpj_digits == digitos[:14]
+    return (modelo.cnpj_digits >= digitos) & (modelo.cnpj_digits < digitos + ':')
+
+
+def tokenizar_termo(termo):
+    """Quebra o termo em palavras alfanuméricas (mesma lógica do tokenizador do índice)."""
+    return [t for t in re.split(r'[^\w]+|_', termo or '') if t]
+
+
+def montar_consulta_fts(termo, dialeto):
+    """Monta a expressão de busca com correspondência por prefixo em todas as palavras."""
+    tokens = tokenizar_termo(termo)
+    if not tokens:
+        return None
+    if dialeto == 'postgresql':
+        # Os tokens só têm caracteres de palavra, então não carregam operadores do tsquery
+        return ' & '.join(f"{t}:*" for t in tokens)
+    # FTS5: cada token entre aspas (escapa operadores) seguido de * para prefixo
+    return ' '.join('"{}"*'.format(t.replace('"', '""')) for t in tokens)
+
+
+def aplicar_busca(query, modelo, termo, bind):
+    """Filtra `query` pelo termo usando o índice textual e ordena por relevância.
+
+    Termos com cara de CNPJ são resolvidos pelo índice de cnpj_digits. Quando o
+    índice textual não está disponível, usa o ILIKE original (varredura completa).
+    """
+    filtro_cnpj = filtro_prefixo_cnpj(modelo, termo)
+    if filtro_cnpj is not None:
+        return query.filter(filtro_cnpj).order_by(modelo.cnpj_digits.asc())
+
+    dialeto = _dialeto(bind)
+    consulta = montar_consulta_fts(termo, dialeto)
+
+    if consulta and dialeto == 'sqlite' and indice_busca_disponivel(bind):
+        resultados = text(
+            f"SELECT rowid AS id, bm25({TABELA_FTS}) AS rank FROM {TABELA_FTS} "
+            f"WHERE {TABELA_FTS} MATCH :consulta"
+        ).bindparams(consulta=consulta).columns(id=Integer, rank=Float).subquery('busca_fts')
+        return (query.join(resultados, modelo.id == resultados.c.id)
+                     .order_by(resultados.c.rank.asc(), modelo.data_criacao.desc()))
+
+    if consulta and dialeto == 'postgresql':
+        vetor = literal_column(TSVECTOR_PG)
+        tsquery = func.to_tsquery('simple', consulta)
+        return (query.filter(vetor.op('@@')(tsquery))
+                     .order_by(func.ts_rank(vetor, tsquery).desc(), modelo.data_criacao.desc()))
+
+    # --- Fallback: ILIKE em Nome, Endereço e CNPJ (comportamento anterior) ---
+    search_pattern = f"%{termo}%"
+    filtro = (
+        (modelo.nome.ilike(search_pattern)) |
+        (modelo.endereco.ilike(search_pattern)) |
+        (modelo.cnpj.ilike(search_pattern))
+    )
+    cnpj_digitos = re.sub(r'\D', '', termo)
+    if cnpj_digitos:
+        filtro = filtro | modelo.cnpj.ilike(f"%{cnpj_digitos}%")
+    return query.filter(filtro).order_by(modelo.data_criacao.desc())
@@ -0,0 +1,257 @@
+# cache.py
+# Backends de cache com TTL usados pelo app.
+#
+# - CacheMemoria: dicionário LRU em processo (padrão), limitado por número de itens.
+# - CacheSQLite: arquivo SQLite local compartilhado entre os workers do gunicorn da
+#   mesma máquina (substituto local de um Redis/Memcached), também limitado em itens.
+#
+# Os dois expõem a mesma interface: get / set / delete / limpar para itens com TTL
+# e incr / contador para contadores (guardados à parte, nunca despejados pelo LRU).
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+
+class CacheMemoria:
+    """Cache LRU em memória, com TTL por item e tamanho máximo."""
+
+    def __init__(self, max_itens=128, ttl_padrao=300):
+        self.max_itens = max_itens
+        self.ttl_padrao = ttl_padrao
+        self._itens = OrderedDict()  # chave -> (expira_em, valor)
+        self._contadores = {}
+        self._trava = threading.Lock()
+
+    def get(self, chave, padrao=None):
+        with self._trava:
+            item = self._itens.get(chave)
+            if item is None:
+                return padrao
+            expira_em, valor = item
+            if expira_em is not None and expira_em <= time.monotonic():
+                del self._itens[chave]
+                return padrao
+            self._itens.move_to_end(chave)
+            return valor
+
+    def set(self, chave, valor, ttl=None):
+        ttl = self.ttl_padrao if ttl is None else ttl
+        expira_em = time.monotonic() + ttl if ttl else None
+        with self._trava:
+            self._itens[chave] = (expira_em, valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)  # remove o menos usado recentemente
+
+    def delete(self, chave):
+        with self._trava:
+            self._itens.pop(chave, None)
+
+    def incr(self, chave, delta=1):
+        """Incrementa um contador e retorna o novo valor."""
+        with self._trava:
+            self._contadores[chave] = self._contadores.get(chave, 0) + delta
+            return self._contadores[chave]
+
+    def contador(self, chave):
+        return self._contadores.get(chave, 0)
+
+    def limpar(self):
+        with self._trava:
+            self._itens.clear()
+
+    def __len__(self):
+        return len(self._itens)
+
+
+class CacheSQLite:
+    """Cache compartilhado entre processos em um arquivo SQLite local.
+
+    LRU aproximado: cada leitura atualiza `acessado_em`; ao passar de `max_itens`
+    os menos acessados são removidos. Valores são serializados com pickle.
+    """
+
+    def __init__(self, caminho, max_itens=1024, ttl_padrao=300):
+        self.caminho = caminho
+        self.max_itens = max_itens
+        self.ttl_padrao = ttl_padrao
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        with self._conexao() as conexao:
+            conexao.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " chave TEXT PRIMARY KEY, valor BLOB, expira_em REAL, acessado_em REAL)"
+            )
+            conexao.execute("CREATE INDEX IF NOT EXISTS ix_cache_acessado_em ON cache (acessado_em)")
+            conexao.execute("CREATE TABLE IF NOT EXISTS contadores (chave TEXT PRIMARY KEY, valor INTEGER NOT NULL)")
+
+    def _conexao(self):
+        # Uma conexão por thread; WAL permite leitores concorrentes entre processos
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is None:
+            conexao = sqlite3.connect(self.caminho, timeout=5, isolation_level=None)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexao = conexao
+        return conexao
+
+    def get(self, chave, padrao=None):
+        conexao = self._conexao()
+        agora = time.time()
+        linha = conexao.execute(
+            "SELECT valor, expira_em FROM cache WHERE chave = ?", (chave,)
+        ).fetchone()
+        if linha is None:
+            return padrao
+        valor, expira_em = linha
+        if expira_em is not None and expira_em <= agora:
+            conexao.execute("DELETE FROM cache WHERE chave = ?", (chave,))
+            return padrao
+        conexao.execute("UPDATE cache SET acessado_em = ? WHERE chave = ?", (agora, chave))
+        return pickle.loads(valor)
+
+    def set(self, chave, valor, ttl=None):
+        ttl = self.ttl_padrao if ttl is None else ttl
+        agora = time.time()
+        expira_em = agora + ttl if ttl else None
+        conexao = self._conexao()
+        conexao.execute(
+            "INSERT OR REPLACE INTO cache (chave, valor, expira_em, acessado_em) VALUES (?, ?, ?, ?)",
+            (chave, pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL), expira_em, agora)
+        )
+        self._despejar(conexao)
+
+    def _despejar(self, conexao):
+        excedente = conexao.execute("SELECT count(*) FROM cache").fetchone()[0] - self.max_itens
+        if excedente > 0:
+            conexao.execute(
+                "DELETE FROM cache WHERE chave IN ("
+                " SELECT chave FROM cache ORDER BY acessado_em ASC LIMIT ?)", (excedente,)
+            )
+
+    def delete(self, chave):
+        self._conexao().execute("DELETE FROM cache WHERE chave = ?", (chave,))
+
+    def incr(self, chave, delta=1):
+        """Incrementa um contador de forma atômica entre processos e retorna o novo valor."""
+        conexao = self._conexao()
+        conexao.execute(
+            "INSERT INTO contadores (chave, valor) VALUES (?, ?) "
+            "ON CONFLICT (chave) DO UPDATE SET valor = valor + excluded.valor", (chave, delta)
+        )
+        return self.contador(chave)
+
+    def contador(self, chave):
+        linha = self._conexao().execute("SELECT valor FROM contadores WHERE chave = ?", (chave,)).fetchone()
+        return linha[0] if linha else 0
+
+    def limpar(self):
+        self._conexao().execute("DELETE FROM cache")
+
+    def __len__(self):
+        return self._conexao().execute("SELECT count(*) FROM cache").fetchone()[0]
+
+
+def criar_cache(backend='memoria', caminho=None, max_itens=128, ttl_padrao=300):
+    """Cria o backend de cache a partir da configuração ('memoria' ou 'sqlite')."""
+    if backend == 'memoria':
+        return CacheMemoria(max_itens=max_itens, ttl_padrao=ttl_padrao)
+    if backend == 'sqlite':
+        if not caminho:
+            raise ValueError("O backend 'sqlite' precisa de um caminho de arquivo.")
+        return CacheSQLite(caminho, max_itens=max_itens, ttl_padrao=ttl_padrao)
+    raise ValueError(f"Backend de cache desconhecido: {backend!r}")
+
+
+class CacheDashboard:
+    """Cache dos dados do dashboard por filtro (data_inicio, data_fim).
+
+    A invalidação é por "geração": toda escrita em contratos incrementa o contador
+    compartilhado e as chaves antigas deixam de ser lidas (expiram pelo TTL/LRU).
+    Com o backend SQLite, um worker que grava invalida o cache de todos os outros.
+    """
+
+    CHAVE_GERACAO = 'dashboard:geracao'
+
+    def __init__(self, backend, ttl=300):
+        self.backend = backend
+        self.ttl = ttl
+
+    def _chave(self, data_inicio, data_fim):
+        geracao = self.backend.contador(self.CHAVE_GERACAO)
+        # A data de hoje entra na chave porque os alertas de vencimento dependem dela
+        return f"dashboard:{geracao}:{date.today().isoformat()}:{data_inicio or ''}:{data_fim or ''}"
+
+    def obter(self, data_inicio, data_fim, calcular):
+        """Retorna os dados em cache ou chama `calcular()` e guarda o resultado."""
+        chave = self._chave(data_inicio, data_fim)
+        dados = self.backend.get(chave)
+        if dados is None:
+            dados = calcular()
+            self.backend.set(chave, dados, ttl=self.ttl)
+        return dados
+
+    def invalidar(self):
+        self.backend.incr(self.CHAVE_GERACAO)
+
+
+class CacheUsuarios:
+    """Usuários do user_loader do Flask-Login por id, para não ir ao banco a cada requisição.
+
+    Guarda só os valores das colunas e devolve uma instância "detached" montada a
+    partir deles (não presa a uma sessão de outra requisição). A invalidação é por
+    geração, como no CacheDashboard: qualquer escrita em usuários (senha, cadastro,
+    exclusão) descarta todas as entradas; o TTL curto cobre os outros workers
+    quando o backend é por processo.
+    """
+
+    CHAVE_GERACAO = 'usuarios:geracao'
+
+    def __init__(self, backend, modelo, ttl=60):
+        self.backend = backend
+        self.modelo = modelo
+        self.ttl = ttl
+        self.colunas = [atributo.key for atributo in inspect(modelo).column_attrs]
+
+    def obter(self, user_id, carregar):
+        """Usuário do cache, ou `carregar(user_id)` (guardado se existir)."""
+        chave = f"usuarios:{self.backend.contador(self.CHAVE_GERACAO)}:{user_id}"
+        dados = self.backend.get(chave)
+        if dados is not None:
+            usuario = self.modelo(**dados)
+            make_transient_to_detached(usuario)
+            return usuario
+        usuario = carregar(user_id)
+        if usuario is not None:
+            self.backend.set(chave, {coluna: getattr(usuario, coluna) for coluna in self.colunas}, ttl=self.ttl)
+        return usuario
+
+    def invalidar(self):
+        self.backend.incr(self.CHAVE_GERACAO)
+
+
+def registrar_invalidacao(session, modelo, callback):
+    """Chama `callback()` após cada commit que gravou (inseriu/alterou/excluiu) instâncias de `modelo`."""
+    chave = f'alterou_{modelo.__name__}'
+
+    @event.listens_for(session, 'before_flush')
+    def _marcar(sessao, flush_context, instances):
+        if any(isinstance(obj, modelo) for obj in (*sessao.new, *sessao.dirty, *sessao.deleted)):
+            sessao.info[chave] = True
+
+    @event.listens_for(session, 'after_commit')
+    def _invalidar(sessao):
+        if sessao.info.pop(chave, False):
+            callback()
+
+    @event.listens_for(session, 'after_rollback')
+    def _descartar(sessao):
+        sessao.info.pop(chave, None)
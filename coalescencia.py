@@ -0,0 +1,175 @@
+# coalescencia.py
+# Coalescência de requisições (single-flight) para consultas externas.
+#
+# Quando vários usuários consultam o mesmo CNPJ/CEP ao mesmo tempo, só uma
+# chamada vai ao provedor; as outras esperam e recebem o mesmo resultado.
+# - Entre threads do mesmo worker: SingleFlight (uma chamada em andamento por chave).
+# - Entre workers (processos) da mesma máquina: TravaArquivo (fcntl.flock em
+#   arquivos de trava). Quem consegue a trava consulta o provedor e grava no cache
+#   compartilhado; quem esperava a trava relê o cache (`reverificar`) antes de
+#   consultar, e encontra o resultado pronto.
+# Sem fcntl (Windows) a TravaArquivo não trava nada e fica só a coalescência entre threads.
+# - Entre corrotinas de um event loop (api_async): SingleFlightAsync.
+
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+class _Chamada:
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado = None
+        self.erro = None
+
+
+class SingleFlight:
+    """Uma execução por chave entre as threads do processo; as demais compartilham o resultado."""
+
+    def __init__(self):
+        self._em_andamento = {}
+        self._trava = threading.Lock()
+        self.contadores = {'executadas': 0, 'compartilhadas': 0}
+
+    def executar(self, chave, funcao):
+        with self._trava:
+            chamada = self._em_andamento.get(chave)
+            lider = chamada is None
+            if lider:
+                chamada = self._em_andamento[chave] = _Chamada()
+                self.contadores['executadas'] += 1
+            else:
+                self.contadores['compartilhadas'] += 1
+
+        if not lider:
+            chamada.evento.wait()
+            if chamada.erro is not None:
+                raise chamada.erro
+            return chamada.resultado
+
+        try:
+            chamada.resultado = funcao()
+        except BaseException as e:
+            chamada.erro = e
+            raise
+        finally:
+            with self._trava:
+                del self._em_andamento[chave]
+            chamada.evento.set()
+        return chamada.resultado
+
+
+class SingleFlightAsync:
+    """SingleFlight para corrotinas no mesmo event loop (api_async)."""
+
+    def __init__(self):
+        self._em_andamento = {}
+        self.contadores = {'executadas': 0, 'compartilhadas': 0}
+
+    async def executar(self, chave, fabrica):
+        """`fabrica()` cria a corrotina; só a primeira chamada por chave a executa."""
+        futuro = self._em_andamento.get(chave)
+        if futuro is not None:
+            self.contadores['compartilhadas'] += 1
+            # shield: o cancelamento de um cliente não cancela a consulta dos outros
+            return await asyncio.shield(futuro)
+        self.contadores['executadas'] += 1
+        futuro = asyncio.ensure_future(fabrica())
+        self._em_andamento[chave] = futuro
+        futuro.add_done_callback(lambda _: self._em_andamento.pop(chave, None))
+        return await asyncio.shield(futuro)
+
+
+class TravaLocal:
+    """Sem trava entre processos (um worker só, ou cache não compartilhado)."""
+
+    @contextmanager
+    def travar(self, chave):
+        yield True
+
+
+class TravaArquivo:
+    """Trava exclusiva entre processos com fcntl.flock.
+
+    As chaves são distribuídas em `faixas` arquivos de trava (hash da chave), para
+    não criar um arquivo por CNPJ. Se a trava não sair em `timeout` segundos, segue
+    sem ela (no pior caso, uma chamada duplicada ao provedor).
+    """
+
+    def __init__(self, diretorio, timeout=10, faixas=256):
+        self.diretorio = diretorio
+        self.timeout = timeout
+        self.faixas = faixas
+        os.makedirs(diretorio, exist_ok=True)
+
+    def _caminho(self, chave):
+        faixa = int(hashlib.sha1(chave.encode('utf-8')).hexdigest(), 16) % self.faixas
+        return os.path.join(self.diretorio, f"trava_{faixa:03d}.lock")
+
+    @contextmanager
+    def travar(self, chave):
+        if fcntl is None:
+            yield False
+            return
+        with open(self._caminho(chave), 'a') as arquivo:
+            prazo = time.monotonic() + self.timeout
+            obtida = False
+            while not obtida:
+                try:
+                    fcntl.flock(arquivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    obtida = True
+                except BlockingIOError:
+                    if time.monotonic() >= prazo:
+                        break
+                    time.sleep(0.01)
+            try:
+                yield obtida
+            finally:
+                if obtida:
+                    fcntl.flock(arquivo, fcntl.LOCK_UN)
+
+
+def criar_trava(backend='local', diretorio=None, timeout=10):
+    """Trava entre processos a partir da configuração ('local' ou 'arquivo')."""
+    if backend == 'local':
+        return TravaLocal()
+    if backend == 'arquivo':
+        if not diretorio:
+            raise ValueError("O backend 'arquivo' precisa de um diretório.")
+        return TravaArquivo(diretorio, timeout=timeout)
+    raise ValueError(f"Backend de trava desconhecido: {backend!r}")
+
+
+class Coalescedor:
+    """SingleFlight entre threads + trava entre processos com releitura do cache compartilhado."""
+
+    def __init__(self, trava=None):
+        self.trava = trava or TravaLocal()
+        self.single_flight = SingleFlight()
+
+    def executar(self, chave, funcao, reverificar=None):
+        """Executa `funcao()` uma vez por chave em andamento.
+
+        `reverificar()` é chamada já com a trava entre processos; se devolver algo
+        diferente de None (ex.: outro worker acabou de gravar no cache), esse é o
+        resultado e `funcao()` não é chamada.
+        """
+        def lider():
+            with self.trava.travar(chave):
+                if reverificar is not None:
+                    pronto = reverificar()
+                    if pronto is not None:
+                        return pronto
+                return funcao()
+        return self.single_flight.executar(chave, lider)
+
+    def metricas(self):
+        return dict(self.single_flight.contadores)
@@ -0,0 +1,178 @@
+# consulta_cep.py
+# Consulta de CEP no servidor (/api/cep/<cep>) com base local de CEPs.
+#
+# Antes cada tela chamava a ViaCEP direto do navegador a cada edição do CEP.
+# Agora o endereço sai da tabela cep_endereco (consulta pela chave primária),
+# que pode ser pré-carregada de um arquivo CSV com a base de CEPs
+# (flask carregar-ceps arquivo.csv). Só em falta a ViaCEP é consultada, pelo
+# cliente HTTP compartilhado, e o resultado é gravado na tabela. CEP que a ViaCEP
+# não conhece fica num cache negativo curto. A resposta tem o formato da ViaCEP
+# (logradouro, bairro, localidade, uf), o que os scripts das telas já usavam.
+
+import csv
+import re
+from collections import namedtuple
+from datetime import datetime
+
+import requests
+from sqlalchemy import insert
+
+from coalescencia import Coalescedor, SingleFlightAsync
+
+CAMPOS_CEP = ('logradouro', 'bairro', 'localidade', 'uf')
+
+# dados: JSON no formato da ViaCEP (ou None se o CEP não existe); origem: 'local', 'viacep' ou 'cache_negativo'
+ResultadoCEP = namedtuple('ResultadoCEP', ['dados', 'origem'])
+
+
+def normalizar_cep(cep):
+    """Só os 8 dígitos do CEP, ou None se não tiver 8 dígitos."""
+    digitos = re.sub(r'\D', '', cep or '')
+    return digitos if len(digitos) == 8 else None
+
+
+def formatar_cep(digitos):
+    return f"{digitos[:5]}-{digitos[5:]}"
+
+
+def criar_busca_viacep(url, cliente):
+    """Busca na ViaCEP (`url` com '{cep}'): dict com os CAMPOS_CEP, None se não existir; erros de rede sobem."""
+    def buscar(cep):
+        resposta = cliente.get(url.format(cep=cep))
+        if resposta.status_code in (400, 404):
+            return None
+        resposta.raise_for_status()
+        dados = resposta.json()
+        if not isinstance(dados, dict) or dados.get('erro'):
+            return None
+        return {campo: dados.get(campo) or '' for campo in CAMPOS_CEP}
+    return buscar
+
+
+def criar_busca_viacep_async(url, cliente):
+    """Versão assíncrona de criar_busca_viacep (cliente http_cliente.ClienteHTTPAsync)."""
+    async def buscar(cep):
+        resposta = await cliente.get(url.format(cep=cep))
+        if resposta.status_code in (400, 404):
+            return None
+        if resposta.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"ViaCEP respondeu {resposta.status_code}")
+        dados = resposta.json()
+        if not isinstance(dados, dict) or dados.get('erro'):
+            return None
+        return {campo: dados.get(campo) or '' for campo in CAMPOS_CEP}
+    return buscar
+
+
+class ConsultaCEP:
+    """Tabela local primeiro; ViaCEP só em falta (e o resultado passa a ser local)."""
+
+    def __init__(self, modelo, buscar, cache_negativo=None, ttl_negativo=3600, coalescedor=None, buscar_async=None):
+        self.modelo = modelo
+        self.buscar = buscar
+        self.buscar_async = buscar_async
+        self.cache_negativo = cache_negativo
+        self.ttl_negativo = ttl_negativo
+        # Consultas simultâneas ao mesmo CEP compartilham uma chamada à ViaCEP
+        self.coalescedor = coalescedor or Coalescedor()
+        self.single_flight_async = SingleFlightAsync()
+
+    def _como_dict(self, registro):
+        return {'cep': formatar_cep(registro.cep), **{campo: getattr(registro, campo) or '' for campo in CAMPOS_CEP}}
+
+    def consultar(self, session, cep):
+        """ResultadoCEP para o CEP (8 dígitos). Erros de rede da ViaCEP (em uma falta) sobem para o chamador."""
+        resultado = self.ler_local(session, cep)
+        if resultado is not None:
+            return resultado
+        dados = self.coalescedor.executar(f'cep:{cep}', lambda: self.buscar(cep))
+        return self.guardar(session, cep, dados)
+
+    async def consultar_async(self, cep, no_banco):
+        """Como consultar(), com a ViaCEP via `buscar_async`.
+
+        `no_banco(funcao, *args)` é uma corrotina que executa `funcao(session, *args)`
+        fora do event loop (ex.: asyncio.to_thread com um contexto do app).
+        """
+        resultado = await no_banco(self.ler_local, cep)
+        if resultado is not None:
+            return resultado
+        dados = await self.single_flight_async.executar(f'cep:{cep}', lambda: self.buscar_async(cep))
+        return await no_banco(self.guardar, cep, dados)
+
+    def ler_local(self, session, cep):
+        """ResultadoCEP da tabela ou do cache negativo; None se for preciso consultar a ViaCEP."""
+        registro = session.get(self.modelo, cep)
+        if registro is not None:
+            return ResultadoCEP(self._como_dict(registro), 'local')
+        if self.cache_negativo is not None and self.cache_negativo.get(f'cep:{cep}'):
+            return ResultadoCEP(None, 'cache_negativo')
+        return None
+
+    def guardar(self, session, cep, dados):
+        """Grava a resposta da ViaCEP (dict, ou None para CEP inexistente) e monta o ResultadoCEP."""
+        if dados is None:
+            if self.cache_negativo is not None:
+                self.cache_negativo.set(f'cep:{cep}', True, ttl=self.ttl_negativo)
+            return ResultadoCEP(None, 'viacep')
+
+        registro = self.modelo(cep=cep, atualizado_em=datetime.utcnow(), **dados)
+        session.merge(registro)
+        session.commit()
+        return ResultadoCEP(self._como_dict(registro), 'viacep')
+
+
+def ler_arquivo_ceps(caminho):
+    """Lê um CSV de CEPs (',' ou ';') com cabeçalho cep,logradouro,bairro,localidade,uf.
+
+    Aceita também 'cidade'/'municipio' no lugar de 'localidade' e 'estado' no lugar de 'uf'.
+    Gera dicionários prontos para a tabela; linhas com CEP inválido são ignoradas.
+    """
+    sinonimos = {'cidade': 'localidade', 'municipio': 'localidade', 'estado': 'uf'}
+    with open(caminho, newline='', encoding='utf-8-sig') as arquivo:
+        amostra = arquivo.read(4096)
+        arquivo.seek(0)
+        dialeto = csv.Sniffer().sniff(amostra, delimiters=',;')
+        for linha in csv.DictReader(arquivo, dialect=dialeto):
+            linha = {sinonimos.get(k.strip().lower(), k.strip().lower()): (v or '').strip()
+                     for k, v in linha.items() if k}
+            cep = normalizar_cep(linha.get('cep'))
+            if cep:
+                yield {'cep': cep, **{campo: linha.get(campo, '') for campo in CAMPOS_CEP}}
+
+
+def carregar_ceps(session, modelo, linhas, tamanho_lote=5000):
+    """Grava (insere ou substitui) os CEPs em lotes; retorna quantos foram gravados."""
+    tabela = modelo.__table__
+    conexao = session.connection()
+    dialeto = conexao.dialect.name
+    agora = datetime.utcnow()
+    total = 0
+    lote = {}  # por CEP: repetido no mesmo lote, vale a última linha
+
+    def gravar():
+        if dialeto == 'sqlite':
+            stmt = insert(tabela).prefix_with('OR REPLACE')
+        elif dialeto == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as insert_pg
+            stmt = insert_pg(tabela)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[tabela.c.cep],
+                set_={campo: stmt.excluded[campo] for campo in (*CAMPOS_CEP, 'atualizado_em')})
+        else:
+            conexao.execute(tabela.delete().where(tabela.c.cep.in_(list(lote))))
+            stmt = insert(tabela)
+        conexao.execute(stmt, list(lote.values()))
+
+    for linha in linhas:
+        lote[linha['cep']] = {**linha, 'atualizado_em': agora}
+        if len(lote) >= tamanho_lote:
+            gravar()
+            total += len(lote)
+            lote = {}
+    if lote:
+        gravar()
+        total += len(lote)
+    session.commit()
+    return total
+
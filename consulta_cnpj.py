@@ -0,0 +1,289 @@
+# consulta_cnpj.py
+# Consulta de CNPJ na ReceitaWS com cache persistente.
+#
+# Cada CNPJ consultado fica no cache (por padrão um arquivo SQLite local, ver
+# cache.CacheSQLite) com:
+# - TTL: dentro do prazo a resposta sai do cache, sem ir à ReceitaWS;
+# - cache negativo: CNPJ inexistente/inválido também é guardado (prazo menor),
+#   para não gastar o limite de requisições da ReceitaWS com o mesmo erro;
+# - stale-while-revalidate: passado o TTL, a resposta antiga ainda é devolvida na
+#   hora (dentro da janela de "stale") e a atualização é feita em segundo plano.
+#   Se a ReceitaWS estiver fora do ar ou limitando (429), a resposta antiga é usada.
+# A função que busca na ReceitaWS é injetável (testes usam um servidor local);
+# criar_busca_cnpj() monta uma com failover entre provedores (ReceitaWS, BrasilAPI).
+
+import asyncio
+import re
+import threading
+import time
+from collections import namedtuple
+
+import requests
+
+from coalescencia import Coalescedor, SingleFlightAsync
+from http_cliente import ClienteHTTP
+
+
+class ErroConsultaCNPJ(Exception):
+    """Falha ao consultar a ReceitaWS sem resposta em cache para usar no lugar."""
+
+    def __init__(self, mensagem, status_http=502):
+        super().__init__(mensagem)
+        self.status_http = status_http
+
+
+# dados: JSON devolvido ao cliente; status_http: status da resposta;
+# origem: 'cache', 'stale' (antiga, revalidando) ou 'receitaws'
+ResultadoCNPJ = namedtuple('ResultadoCNPJ', ['dados', 'status_http', 'origem'])
+
+
+def cnpj_valido(cnpj):
+    """Confere os 14 dígitos e os dígitos verificadores do CNPJ (só dígitos)."""
+    if not re.fullmatch(r'\d{14}', cnpj or '') or len(set(cnpj)) == 1:
+        return False
+    for tamanho in (12, 13):
+        pesos = list(range(tamanho - 7, 1, -1)) + list(range(9, 1, -1))
+        soma = sum(int(d) * p for d, p in zip(cnpj[:tamanho], pesos))
+        digito = 0 if soma % 11 < 2 else 11 - soma % 11
+        if int(cnpj[tamanho]) != digito:
+            return False
+    return True
+
+
+def normalizar_receitaws(status, dados):
+    """A ReceitaWS já está no formato que a API do app devolve."""
+    return status, dados
+
+
+def normalizar_brasilapi(status, dados):
+    """Converte a resposta da BrasilAPI para o formato da ReceitaWS (o que /api/cnpj sempre devolveu)."""
+    if status != 200 or not isinstance(dados, dict):
+        return status, dados
+    return 200, {
+        'status': 'OK',
+        'cnpj': dados.get('cnpj'),
+        'nome': dados.get('razao_social'),
+        'fantasia': dados.get('nome_fantasia'),
+        'logradouro': dados.get('logradouro'),
+        'numero': dados.get('numero'),
+        'complemento': dados.get('complemento'),
+        'bairro': dados.get('bairro'),
+        'municipio': dados.get('municipio'),
+        'uf': dados.get('uf'),
+        'cep': dados.get('cep'),
+        'telefone': dados.get('ddd_telefone_1'),
+        'email': dados.get('email'),
+        'situacao': dados.get('descricao_situacao_cadastral'),
+        'fonte': 'brasilapi',
+    }
+
+
+# nome: rótulo das métricas; url: com '{cnpj}'; cliente: http_cliente.ClienteHTTP; normalizar: (status, json) -> (status, json)
+Provedor = namedtuple('Provedor', ['nome', 'url', 'cliente', 'normalizar'])
+
+
+def _resposta_do_provedor(provedor, resposta):
+    """(status, json normalizado) para respostas definitivas; None quando deve tentar o próximo provedor."""
+    if resposta.status_code == 429 or resposta.status_code >= 500:
+        return None
+    try:
+        dados = resposta.json()
+    except ValueError:
+        dados = None
+    return provedor.normalizar(resposta.status_code, dados)
+
+
+def _sem_provedor(ultima_resposta, ultimo_erro):
+    if ultima_resposta is not None:
+        return ultima_resposta.status_code, None
+    raise ultimo_erro or requests.exceptions.ConnectionError("Nenhum provedor de CNPJ configurado.")
+
+
+def criar_busca_cnpj(provedores):
+    """Função de busca para a ConsultaCNPJ com failover: tenta os provedores em ordem.
+
+    Passa para o próximo quando o provedor falha (rede, timeout, disjuntor aberto,
+    429 ou 5xx). Respostas definitivas (200, 400, 404) encerram a busca.
+    """
+    def buscar(cnpj):
+        ultima_resposta = ultimo_erro = None
+        for provedor in provedores:
+            try:
+                resposta = provedor.cliente.get(provedor.url.format(cnpj=cnpj))
+            except requests.exceptions.RequestException as e:
+                ultimo_erro = e
+                continue
+            resultado = _resposta_do_provedor(provedor, resposta)
+            if resultado is not None:
+                return resultado
+            ultima_resposta = resposta
+        return _sem_provedor(ultima_resposta, ultimo_erro)
+    return buscar
+
+
+def criar_busca_cnpj_async(provedores):
+    """Versão assíncrona de criar_busca_cnpj (provedores com http_cliente.ClienteHTTPAsync)."""
+    async def buscar(cnpj):
+        ultima_resposta = ultimo_erro = None
+        for provedor in provedores:
+            try:
+                resposta = await provedor.cliente.get(provedor.url.format(cnpj=cnpj))
+            except requests.exceptions.RequestException as e:
+                ultimo_erro = e
+                continue
+            resultado = _resposta_do_provedor(provedor, resposta)
+            if resultado is not None:
+                return resultado
+            ultima_resposta = resposta
+        return _sem_provedor(ultima_resposta, ultimo_erro)
+    return buscar
+
+
+def criar_busca_receitaws(url, timeout=5):
+    """Busca só na ReceitaWS (um provedor, sem retentativa), com timeout."""
+    cliente = ClienteHTTP('receitaws', timeout_conexao=timeout, timeout_leitura=timeout, tentativas=1)
+    return criar_busca_cnpj([Provedor('receitaws', url, cliente, normalizar_receitaws)])
+
+
+class ConsultaCNPJ:
+    """Consulta com cache (TTL, negativo e stale-while-revalidate) sobre um backend de cache.py."""
+
+    PREFIXO = 'cnpj:'
+
+    def __init__(self, backend, buscar, ttl=7 * 24 * 3600, ttl_negativo=3600, janela_stale=30 * 24 * 3600,
+                 executar_em_segundo_plano=None, coalescedor=None, buscar_async=None):
+        self.backend = backend
+        self.buscar = buscar
+        self.buscar_async = buscar_async
+        self.ttl = ttl
+        self.ttl_negativo = ttl_negativo
+        self.janela_stale = janela_stale
+        self._executar = executar_em_segundo_plano or (lambda f: threading.Thread(target=f, daemon=True).start())
+        # Consultas simultâneas ao mesmo CNPJ compartilham uma chamada ao provedor
+        self.coalescedor = coalescedor or Coalescedor()
+        self.single_flight_async = SingleFlightAsync()
+        self._revalidando = set()
+        self._trava = threading.Lock()
+        self._tarefas = set()
+
+    def consultar(self, cnpj):
+        """Retorna um ResultadoCNPJ para o CNPJ (só dígitos) ou levanta ErroConsultaCNPJ."""
+        if not cnpj_valido(cnpj):
+            # Não gasta uma requisição na ReceitaWS com CNPJ que não passa no dígito verificador
+            return ResultadoCNPJ({'status': 'ERROR', 'message': 'CNPJ inválido'}, 400, 'local')
+
+        resultado, vencida = self._ler_cache(cnpj)
+        if resultado is not None and not vencida:
+            return resultado
+        if resultado is not None:
+            # Vencida, mas dentro da janela: devolve já e atualiza em segundo plano
+            self._revalidar_em_segundo_plano(cnpj)
+            return resultado._replace(origem='stale')
+
+        return self._buscar_coalescido(cnpj)
+
+    def _ler_cache(self, cnpj):
+        """(ResultadoCNPJ do cache ou None, True se já passou do TTL)."""
+        entrada = self.backend.get(self.PREFIXO + cnpj)
+        if entrada is None:
+            return None, False
+        idade = time.time() - entrada['obtido_em']
+        limite = self.ttl_negativo if entrada['negativo'] else self.ttl
+        return ResultadoCNPJ(entrada['dados'], entrada['status_http'], 'cache'), idade >= limite
+
+    def _cache_fresco(self, cnpj):
+        resultado, vencida = self._ler_cache(cnpj)
+        return None if vencida else resultado
+
+    def _buscar_coalescido(self, cnpj):
+        # Quem esperou outro worker consultar encontra a resposta no cache compartilhado
+        return self.coalescedor.executar(self.PREFIXO + cnpj, lambda: self._buscar_e_guardar(cnpj),
+                                         reverificar=lambda: self._cache_fresco(cnpj))
+
+    def _buscar_e_guardar(self, cnpj):
+        try:
+            status, dados = self.buscar(cnpj)
+        except requests.exceptions.RequestException as e:
+            raise ErroConsultaCNPJ(f"Erro ao consultar a ReceitaWS: {e}", 502) from e
+        return self._registrar_resposta(cnpj, status, dados)
+
+    def _registrar_resposta(self, cnpj, status, dados):
+        """Guarda a resposta do provedor no cache (positiva ou negativa) e monta o ResultadoCNPJ."""
+        if status == 200 and isinstance(dados, dict) and dados.get('status') != 'ERROR':
+            self._guardar(cnpj, dados, 200, negativo=False)
+            return ResultadoCNPJ(dados, 200, 'receitaws')
+        if status == 200 and isinstance(dados, dict):
+            # A ReceitaWS responde 200 com status ERROR para CNPJ inexistente/rejeitado
+            self._guardar(cnpj, dados, 200, negativo=True)
+            return ResultadoCNPJ(dados, 200, 'receitaws')
+        if status in (400, 404):
+            dados = {'status': 'ERROR', 'message': f'Erro HTTP ao buscar CNPJ: {status}'}
+            self._guardar(cnpj, dados, 400, negativo=True)
+            return ResultadoCNPJ(dados, 400, 'receitaws')
+        # 429 (limite de requisições), 5xx etc.: não guarda; o chamador decide se usa a resposta antiga
+        raise ErroConsultaCNPJ(f"Erro HTTP ao buscar CNPJ: {status}", 503 if status == 429 else 502)
+
+    def _guardar(self, cnpj, dados, status_http, negativo):
+        entrada = {'dados': dados, 'status_http': status_http, 'negativo': negativo, 'obtido_em': time.time()}
+        # O item só some do backend depois da janela de stale (negativos não têm janela)
+        ttl_backend = self.ttl_negativo if negativo else self.ttl + self.janela_stale
+        self.backend.set(self.PREFIXO + cnpj, entrada, ttl=ttl_backend)
+
+    def _revalidar_em_segundo_plano(self, cnpj):
+        with self._trava:
+            if cnpj in self._revalidando:
+                return
+            self._revalidando.add(cnpj)
+
+        def revalidar():
+            try:
+                self._buscar_coalescido(cnpj)
+            except ErroConsultaCNPJ:
+                pass  # continua servindo a resposta antiga até a próxima tentativa
+            finally:
+                with self._trava:
+                    self._revalidando.discard(cnpj)
+
+        self._executar(revalidar)
+
+    # --- Versão assíncrona (api_async): mesmo cache, chamada ao provedor sem bloquear o worker ---
+
+    async def consultar_async(self, cnpj):
+        """Como consultar(), mas a ida ao provedor usa `buscar_async` (event loop)."""
+        if not cnpj_valido(cnpj):
+            return ResultadoCNPJ({'status': 'ERROR', 'message': 'CNPJ inválido'}, 400, 'local')
+
+        # Leitura do cache é local e abaixo de 1 ms: pode rodar direto no event loop
+        resultado, vencida = self._ler_cache(cnpj)
+        if resultado is not None and not vencida:
+            return resultado
+        if resultado is not None:
+            self._revalidar_async(cnpj)
+            return resultado._replace(origem='stale')
+        return await self._buscar_coalescido_async(cnpj)
+
+    async def _buscar_coalescido_async(self, cnpj):
+        async def buscar():
+            pronto = self._cache_fresco(cnpj)
+            if pronto is not None:
+                return pronto
+            try:
+                status, dados = await self.buscar_async(cnpj)
+            except requests.exceptions.RequestException as e:
+                raise ErroConsultaCNPJ(f"Erro ao consultar a ReceitaWS: {e}", 502) from e
+            return self._registrar_resposta(cnpj, status, dados)
+        return await self.single_flight_async.executar(self.PREFIXO + cnpj, buscar)
+
+    def _revalidar_async(self, cnpj):
+        async def revalidar():
+            try:
+                await self._buscar_coalescido_async(cnpj)
+            except ErroConsultaCNPJ:
+                pass
+        # Guarda a referência da tarefa até ela terminar (o event loop só guarda referência fraca)
+        tarefa = asyncio.get_running_loop().create_task(revalidar())
+        self._tarefas.add(tarefa)
+        tarefa.add_done_callback(self._tarefas.discard)
+
+    def invalidar(self, cnpj):
+        self.backend.delete(self.PREFIXO + cnpj)
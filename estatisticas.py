@@ -0,0 +1,161 @@
+# estatisticas.py
+# Camada de agregação do /dashboard.
+#
+# Antes: query.all() para somar valor_contrato em Python + 4 GROUP BY separados
+# + alertas + top 5 (sete idas ao banco, cada uma varrendo a tabela).
+# Agora: um único GROUP BY por (tipo_indice, abrangencia, estado, mês) com COUNT e
+# SUM feitos no banco; os totais de cada gráfico saem desse resultado (poucas
+# linhas) em Python. Alertas e top 5 continuam como consultas curtas e indexadas.
+
+from collections import namedtuple
+from datetime import date, timedelta
+from decimal import Decimal
+
+from sqlalchemy import func, extract
+
+
+def expressao_mes(coluna, dialeto):
+    """Expressão SQL 'AAAA-MM' para a coluna de data, conforme o banco."""
+    if dialeto == 'sqlite':
+        return func.strftime('%Y-%m', coluna)
+    if dialeto == 'postgresql':
+        return func.to_char(coluna, 'YYYY-MM')
+    # Genérico: ano * 100 + mês (convertido para texto depois)
+    return extract('year', coluna) * 100 + extract('month', coluna)
+
+
+def _rotulo_mes(chave):
+    """'2025-03' (ou 202503) -> '03/2025', o formato dos rótulos do gráfico mensal."""
+    if chave is None:
+        return None
+    chave = str(chave)
+    if '-' in chave:
+        ano, mes = chave.split('-', 1)
+    else:
+        ano, mes = chave[:4], chave[4:]
+    return f"{int(mes):02d}/{ano}"
+
+
+def _ordenar(contagens):
+    # Mesma ordem do GROUP BY do SQLite: NULL primeiro, depois ordem crescente
+    return sorted(contagens.items(), key=lambda item: (item[0] is not None, item[0] or ''))
+
+
+def _rotulos_e_valores(contagens, rotulo_vazio):
+    ordenado = _ordenar(contagens)
+    labels = [chave if chave else rotulo_vazio for chave, _ in ordenado]
+    valores = [quantidade for _, quantidade in ordenado]
+    return labels, valores
+
+
+def filtrar_periodo(query, modelo, data_inicio=None, data_fim=None):
+    """Aplica o filtro de data_criacao do dashboard (mesma semântica de antes)."""
+    if data_inicio:
+        query = query.filter(modelo.data_criacao >= data_inicio)
+    if data_fim:
+        query = query.filter(modelo.data_criacao <= data_fim)
+    return query
+
+
+# Dimensões dos gráficos, na mesma ordem das colunas do GROUP BY
+DIMENSOES = ('tipo_indice', 'abrangencia', 'estado', 'mes')
+
+
+def agregar_contratos(session, modelo, data_inicio=None, data_fim=None):
+    """Executa o GROUP BY único e devolve, por dimensão, quantidade e soma de valores."""
+    dialeto = session.get_bind().dialect.name
+    mes = expressao_mes(modelo.data_criacao, dialeto).label('mes')
+
+    query = session.query(
+        modelo.tipo_indice,
+        modelo.abrangencia_contrato,
+        modelo.estado,
+        mes,
+        func.count(modelo.id),
+        func.sum(modelo.valor_contrato),
+    )
+    query = filtrar_periodo(query, modelo, data_inicio, data_fim)
+    grupos = query.group_by(modelo.tipo_indice, modelo.abrangencia_contrato, modelo.estado, mes).all()
+
+    # Para cada dimensão: chave -> [quantidade, soma de valor_contrato]
+    agregado = {dimensao: {} for dimensao in DIMENSOES}
+    for tipo_indice, abrangencia, estado, chave_mes, quantidade, soma in grupos:
+        soma = Decimal(str(soma)) if soma else Decimal('0')
+        for dimensao, chave in zip(DIMENSOES, (tipo_indice, abrangencia, estado, chave_mes)):
+            if chave is not None and not isinstance(chave, str):
+                chave = str(int(chave))  # expressão genérica de mês (AAAAMM numérico)
+            acumulado = agregado[dimensao].setdefault(chave, [0, Decimal('0')])
+            acumulado[0] += quantidade
+            acumulado[1] += soma
+    return agregado
+
+
+def total_financeiro(agregado):
+    """Soma de valor_contrato (qualquer dimensão cobre todos os contratos)."""
+    return sum((valor for _, valor in agregado['estado'].values()), Decimal('0'))
+
+
+def _contagens(agregado, dimensao):
+    # Chave vazia ('') e NULL caem no mesmo rótulo "não informado"
+    contagens = {}
+    for chave, (quantidade, _) in agregado[dimensao].items():
+        chave = chave or None
+        contagens[chave] = contagens.get(chave, 0) + quantidade
+    return contagens
+
+
+def montar_contexto_dashboard(agregado, alertas_vencimento, top_5_recentes):
+    """Converte as contagens agregadas nas variáveis que o dashboard.html espera."""
+    labels_reajuste, valores_reajuste = _rotulos_e_valores(_contagens(agregado, 'tipo_indice'), "Não Informado")
+    labels_prod, valores_prod = _rotulos_e_valores(_contagens(agregado, 'abrangencia'), "Outros")
+    labels_regiao, valores_regiao = _rotulos_e_valores(_contagens(agregado, 'estado'), "N/A")
+
+    # Evolução mensal em ordem cronológica (chaves 'AAAA-MM'), rótulos 'MM/AAAA'
+    meses = sorted(_contagens(agregado, 'mes').items(), key=lambda item: str(item[0] or ''))
+    labels_mensal = [_rotulo_mes(chave) for chave, _ in meses]
+    valores_mensal = [quantidade for _, quantidade in meses]
+
+    return dict(
+        labels_prod=labels_prod, valores_prod=valores_prod,
+        labels_regiao=labels_regiao, valores_regiao=valores_regiao,
+        labels_mensal=labels_mensal, valores_mensal=valores_mensal,
+        total_financeiro=total_financeiro(agregado),
+        labels_reajuste=labels_reajuste, valores_reajuste=valores_reajuste,
+        alertas_vencimento=alertas_vencimento,
+        top_5_recentes=top_5_recentes,
+    )
+
+
+# Só os campos que o dashboard exibe. Tupla simples (serializável) para poder ir ao cache.
+ContratoResumido = namedtuple('ContratoResumido', [
+    'id', 'nome', 'abrangencia_contrato', 'inicio_contrato', 'termino_contrato', 'valor_contrato'
+])
+
+
+def _resumir(modelo, query):
+    colunas = [getattr(modelo, campo) for campo in ContratoResumido._fields]
+    return [ContratoResumido(*linha) for linha in query.with_entities(*colunas).all()]
+
+
+def buscar_alertas_vencimento(modelo, dias=30, hoje=None):
+    """Contratos com término entre hoje e hoje + `dias` (consulta por faixa em termino_contrato)."""
+    hoje = hoje or date.today()
+    return _resumir(modelo, modelo.query.filter(
+        modelo.termino_contrato >= hoje,
+        modelo.termino_contrato <= hoje + timedelta(days=dias)
+    ).order_by(modelo.termino_contrato.asc()))
+
+
+def buscar_top_recentes(modelo, limite=5):
+    """Os contratos mais recentes (usa o índice (data_criacao, id))."""
+    return _resumir(modelo, modelo.query.order_by(modelo.data_criacao.desc(), modelo.id.desc()).limit(limite))
+
+
+def calcular_dashboard(session, modelo, data_inicio=None, data_fim=None):
+    """Calcula todas as variáveis do dashboard: 1 GROUP BY + alertas + top 5."""
+    agregado = agregar_contratos(session, modelo, data_inicio, data_fim)
+    return montar_contexto_dashboard(
+        agregado,
+        alertas_vencimento=buscar_alertas_vencimento(modelo),
+        top_5_recentes=buscar_top_recentes(modelo),
+    )
@@ -0,0 +1,158 @@
+# exportacao_pdf.py
+# Exportação em lote dos PDFs de contrato como um ZIP transmitido (streaming).
+#
+# O ZIP é montado enquanto os PDFs ficam prontos: cada arquivo é escrito no
+# zipfile e os bytes produzidos vão direto para a resposta HTTP, sem manter o
+# ZIP (nem todos os PDFs) em memória. A renderização é distribuída em um pool
+# de processos (ReportLab é CPU puro e não libera o GIL), com uma janela limitada
+# de tarefas em andamento para a memória não crescer com o tamanho do lote.
+# PDFs que já estão no cache em disco (pdf_cache) não são renderizados de novo.
+
+import os
+import re
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from pdf_generator import VERSAO_LAYOUT_CONTRATO, gerar_contrato_pdf, linha_data_contrato
+from pdf_cache import chave_cache_pdf
+
+
+class _SaidaZip:
+    """Arquivo só de escrita (sem seek) que acumula os bytes até serem retirados.
+
+    Sem `tell()`/`seek()` o zipfile grava no modo de streaming (data descriptors
+    depois de cada arquivo), que é o que permite enviar o ZIP aos pedaços.
+    """
+
+    def __init__(self):
+        self._pedacos = []
+
+    def write(self, dados):
+        self._pedacos.append(bytes(dados))
+        return len(dados)
+
+    def flush(self):
+        pass
+
+    def retirar(self):
+        dados = b''.join(self._pedacos)
+        self._pedacos.clear()
+        return dados
+
+
+def nome_arquivo_pdf(contrato_id, nome):
+    """Nome do PDF dentro do ZIP: id + razão social (único mesmo com nomes repetidos)."""
+    nome = re.sub(r'[^\w-]+', '_', nome or '').strip('_') or 'contrato'
+    return f"{contrato_id}_{nome}.pdf"
+
+
+def _renderizar(dados, data_emissao):
+    # Executado nos processos do pool: só depende de pdf_generator
+    return gerar_contrato_pdf(dados, data_emissao)
+
+
+_pool = None
+_pool_workers = None
+_pool_trava = threading.Lock()
+
+
+def obter_pool(workers):
+    """Pool de processos compartilhado entre as requisições (criado na primeira exportação).
+
+    Usa 'spawn': os filhos não herdam as threads nem as conexões abertas do servidor.
+    """
+    global _pool, _pool_workers
+    with _pool_trava:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn'))
+            _pool_workers = workers
+        return _pool
+
+
+def encerrar_pool():
+    global _pool, _pool_workers
+    with _pool_trava:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+        _pool_workers = None
+
+
+def renderizar_pdfs(lista_dados, data_emissao, cache_pdf=None, workers=None):
+    """Gera (dados, bytes do PDF) na ordem de `lista_dados`.
+
+    `workers=0` renderiza no próprio processo (testes / servidores sem fork);
+    `None` usa todos os núcleos. No máximo 2 * workers PDFs ficam em andamento.
+    """
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    linha_data = linha_data_contrato(data_emissao)
+
+    def do_cache(dados):
+        if cache_pdf is None:
+            return None, None
+        chave = chave_cache_pdf(dados, VERSAO_LAYOUT_CONTRATO, linha_data)
+        caminho = cache_pdf.obter(chave)
+        if caminho is None:
+            return chave, None
+        with open(caminho, 'rb') as arquivo:
+            return chave, arquivo.read()
+
+    def guardar(chave, conteudo):
+        if cache_pdf is not None and chave is not None:
+            cache_pdf.guardar(chave, conteudo)
+
+    if workers <= 0:
+        for dados in lista_dados:
+            chave, conteudo = do_cache(dados)
+            if conteudo is None:
+                conteudo = _renderizar(dados, data_emissao)
+                guardar(chave, conteudo)
+            yield dados, conteudo
+        return
+
+    pool = obter_pool(workers)
+    janela = deque()  # (dados, chave, Future ou bytes já em cache), na ordem de saída
+    pendentes = iter(lista_dados)
+    try:
+        while True:
+            while len(janela) < 2 * workers:
+                dados = next(pendentes, None)
+                if dados is None:
+                    break
+                chave, conteudo = do_cache(dados)
+                if conteudo is None:
+                    conteudo = pool.submit(_renderizar, dados, data_emissao)
+                janela.append((dados, chave, conteudo))
+            if not janela:
+                return
+            dados, chave, conteudo = janela.popleft()
+            if not isinstance(conteudo, bytes):
+                conteudo = conteudo.result()
+                guardar(chave, conteudo)
+            yield dados, conteudo
+    finally:
+        # Cliente desconectou ou erro: não deixa tarefas órfãs ocupando o pool
+        for _, _, conteudo in janela:
+            if not isinstance(conteudo, bytes):
+                conteudo.cancel()
+
+
+def gerar_zip_pdfs(itens, data_emissao, cache_pdf=None, workers=None):
+    """Gerador dos bytes do ZIP, arquivo a arquivo, para usar como corpo da resposta.
+
+    `itens` é uma lista de (nome do arquivo no ZIP, dados do contrato).
+    """
+    nomes = [nome for nome, _ in itens]
+    saida = _SaidaZip()
+    with zipfile.ZipFile(saida, 'w', compression=zipfile.ZIP_DEFLATED) as arquivo_zip:
+        renderizados = renderizar_pdfs([dados for _, dados in itens], data_emissao, cache_pdf, workers)
+        for nome, (_, conteudo) in zip(nomes, renderizados):
+            arquivo_zip.writestr(nome, conteudo)
+            yield saida.retirar()
+    # O diretório central é escrito no close()
+    yield saida.retirar()
@@ -7,7 +7,7 @@ login_manager = LoginManager()
 migrate = Migrate() # 🌟 Inicialização do objeto Migrate adicionada 🌟
 
 # Define a view de login (a rota que o Flask-Login deve redirecionar)
-login_manager.login_view = 'login'
+login_manager.login_view = 'principal.login'
 
 # Define a mensagem que o usuário verá ao ser redirecionado
 login_manager.login_message = 'Por favor, faça login para acessar esta página.'
@@ -0,0 +1,257 @@
+# http_cliente.py
+# Cliente HTTP compartilhado para chamadas a serviços externos (ReceitaWS, BrasilAPI...).
+#
+# - Uma requests.Session por provedor: conexões keep-alive reaproveitadas (pool).
+# - Timeouts de conexão e de leitura em toda requisição: um provedor lento não
+#   prende o worker do gunicorn indefinidamente.
+# - Retentativa com backoff exponencial e jitter (erros de rede, 429, 502, 503, 504),
+#   respeitando o Retry-After quando o provedor informa.
+# - Disjuntor (circuit breaker): depois de N falhas seguidas o provedor fica
+#   "aberto" por alguns segundos e as chamadas falham na hora (CircuitoAberto),
+#   até uma chamada de teste passar.
+# - Métricas por provedor: requisições, erros, retentativas e latência.
+# - ClienteHTTPAsync: a mesma política (timeouts, retentativas, disjuntor e
+#   métricas do cliente síncrono do provedor) sobre httpx.AsyncClient, para as
+#   rotas assíncronas (api_async).
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+except ImportError:  # só as rotas assíncronas (api_async) precisam
+    httpx = None
+
+STATUS_RETENTAVEIS = (429, 502, 503, 504)
+
+
+class CircuitoAberto(requests.exceptions.RequestException):
+    """O disjuntor do provedor está aberto: a chamada nem é feita."""
+
+
+class Disjuntor:
+    """Circuit breaker simples: fechado -> aberto (após `limite_falhas`) -> meio-aberto (1 chamada de teste)."""
+
+    def __init__(self, limite_falhas=5, tempo_aberto=30):
+        self.limite_falhas = limite_falhas
+        self.tempo_aberto = tempo_aberto
+        self.falhas_seguidas = 0
+        self.aberto_em = None
+        self._testando = False
+        self._trava = threading.Lock()
+
+    @property
+    def estado(self):
+        if self.aberto_em is None:
+            return 'fechado'
+        if time.monotonic() - self.aberto_em >= self.tempo_aberto:
+            return 'meio_aberto'
+        return 'aberto'
+
+    def permitir(self):
+        """True se a chamada pode ser feita (no meio-aberto, só uma por vez)."""
+        with self._trava:
+            estado = self.estado
+            if estado == 'fechado':
+                return True
+            if estado == 'meio_aberto' and not self._testando:
+                self._testando = True
+                return True
+            return False
+
+    def registrar_sucesso(self):
+        with self._trava:
+            self.falhas_seguidas = 0
+            self.aberto_em = None
+            self._testando = False
+
+    def registrar_falha(self):
+        with self._trava:
+            self.falhas_seguidas += 1
+            if self._testando or self.falhas_seguidas >= self.limite_falhas:
+                self.aberto_em = time.monotonic()
+            self._testando = False
+
+
+class ClienteHTTP:
+    """GET com pool de conexões, timeouts, retentativa com jitter, disjuntor e métricas."""
+
+    def __init__(self, nome, timeout_conexao=3.05, timeout_leitura=5, tentativas=2,
+                 backoff_base=0.2, backoff_max=2.0, limite_falhas=5, tempo_aberto=30, tamanho_pool=10):
+        self.nome = nome
+        self.timeout = (timeout_conexao, timeout_leitura)
+        self.tentativas = max(1, tentativas)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.disjuntor = Disjuntor(limite_falhas, tempo_aberto)
+        self.sessao = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=tamanho_pool)
+        self.sessao.mount('http://', adaptador)
+        self.sessao.mount('https://', adaptador)
+        self._latencias = deque(maxlen=500)
+        self._contadores = {'requisicoes': 0, 'erros': 0, 'retentativas': 0, 'recusadas_disjuntor': 0}
+        self._trava = threading.Lock()
+
+    def _espera(self, tentativa, retry_after=None):
+        """Backoff exponencial com jitter total; Retry-After (em segundos) vale se for maior, até o máximo."""
+        espera = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** tentativa)))
+        if retry_after:
+            try:
+                espera = max(espera, min(float(retry_after), self.backoff_max))
+            except ValueError:
+                pass
+        return espera
+
+    def _registrar(self, latencia, erro):
+        with self._trava:
+            self._contadores['requisicoes'] += 1
+            if erro:
+                self._contadores['erros'] += 1
+            self._latencias.append(latencia)
+
+    def get(self, url, **kwargs):
+        """GET com as proteções acima. Levanta CircuitoAberto ou a última exceção de rede."""
+        if not self.disjuntor.permitir():
+            with self._trava:
+                self._contadores['recusadas_disjuntor'] += 1
+            raise CircuitoAberto(f"Provedor {self.nome} indisponível (disjuntor aberto).")
+
+        resposta = None
+        erro = None
+        retry_after = None
+        for tentativa in range(self.tentativas):
+            if tentativa:
+                with self._trava:
+                    self._contadores['retentativas'] += 1
+                time.sleep(self._espera(tentativa, retry_after))
+            inicio = time.perf_counter()
+            try:
+                resposta = self.sessao.get(url, timeout=self.timeout, **kwargs)
+                erro = None
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self._registrar(time.perf_counter() - inicio, erro=True)
+                resposta, erro = None, e
+                continue
+            falhou = resposta.status_code in STATUS_RETENTAVEIS or resposta.status_code >= 500
+            self._registrar(time.perf_counter() - inicio, erro=falhou)
+            if not falhou:
+                break
+            retry_after = resposta.headers.get('Retry-After')
+            if tentativa < self.tentativas - 1:
+                resposta.close()
+
+        if erro is not None or resposta.status_code in STATUS_RETENTAVEIS or resposta.status_code >= 500:
+            self.disjuntor.registrar_falha()
+        else:
+            self.disjuntor.registrar_sucesso()
+        if erro is not None:
+            raise erro
+        return resposta
+
+    def metricas(self):
+        with self._trava:
+            latencias = sorted(self._latencias)
+            contadores = dict(self._contadores)
+
+        def percentil(p):
+            return round(latencias[min(len(latencias) - 1, int(p * len(latencias)))] * 1000, 1) if latencias else None
+
+        return {
+            **contadores,
+            'disjuntor': self.disjuntor.estado,
+            'latencia_ms': {'p50': percentil(0.50), 'p95': percentil(0.95),
+                            'max': round(latencias[-1] * 1000, 1) if latencias else None},
+        }
+
+
+class ClienteHTTPAsync:
+    """GET assíncrono (httpx) com a configuração, o disjuntor e as métricas de um ClienteHTTP.
+
+    Erros de rede do httpx viram as exceções equivalentes do requests, para que o
+    código de failover trate os dois clientes do mesmo jeito.
+    """
+
+    def __init__(self, cliente, tamanho_pool=20):
+        if httpx is None:
+            raise RuntimeError("O cliente assíncrono precisa do pacote httpx (pip install httpx).")
+        self.cliente = cliente
+        self.nome = cliente.nome
+        conexao, leitura = cliente.timeout
+        self.sessao = httpx.AsyncClient(
+            timeout=httpx.Timeout(leitura, connect=conexao),
+            limits=httpx.Limits(max_connections=tamanho_pool, max_keepalive_connections=tamanho_pool))
+        # A fila de espera do pool do httpcore fica cara (quadrática) com muitas requisições
+        # aguardando conexão; o excedente espera aqui, fora dela.
+        self._vagas = asyncio.Semaphore(tamanho_pool)
+
+    async def get(self, url, **kwargs):
+        cliente = self.cliente
+        if not cliente.disjuntor.permitir():
+            with cliente._trava:
+                cliente._contadores['recusadas_disjuntor'] += 1
+            raise CircuitoAberto(f"Provedor {self.nome} indisponível (disjuntor aberto).")
+
+        resposta = None
+        erro = None
+        retry_after = None
+        for tentativa in range(cliente.tentativas):
+            if tentativa:
+                with cliente._trava:
+                    cliente._contadores['retentativas'] += 1
+                await asyncio.sleep(cliente._espera(tentativa, retry_after))
+            inicio = time.perf_counter()
+            try:
+                async with self._vagas:
+                    resposta = await self.sessao.get(url, **kwargs)
+                erro = None
+            except httpx.TimeoutException as e:
+                cliente._registrar(time.perf_counter() - inicio, erro=True)
+                resposta, erro = None, requests.exceptions.Timeout(str(e) or 'timeout')
+                continue
+            except httpx.TransportError as e:
+                cliente._registrar(time.perf_counter() - inicio, erro=True)
+                resposta, erro = None, requests.exceptions.ConnectionError(str(e) or 'erro de conexão')
+                continue
+            falhou = resposta.status_code in STATUS_RETENTAVEIS or resposta.status_code >= 500
+            cliente._registrar(time.perf_counter() - inicio, erro=falhou)
+            if not falhou:
+                break
+            retry_after = resposta.headers.get('Retry-After')
+
+        if erro is not None or resposta.status_code in STATUS_RETENTAVEIS or resposta.status_code >= 500:
+            cliente.disjuntor.registrar_falha()
+        else:
+            cliente.disjuntor.registrar_sucesso()
+        if erro is not None:
+            raise erro
+        return resposta
+
+    async def fechar(self):
+        await self.sessao.aclose()
+
+
+# Um cliente (e um pool de conexões) por provedor, compartilhado no processo
+_clientes = {}
+_clientes_trava = threading.Lock()
+
+
+def obter_cliente(nome, **configuracao):
+    """Cliente do provedor `nome`, criado na primeira chamada com `configuracao`."""
+    with _clientes_trava:
+        cliente = _clientes.get(nome)
+        if cliente is None:
+            cliente = _clientes[nome] = ClienteHTTP(nome, **configuracao)
+        return cliente
+
+
+def metricas_clientes():
+    """Métricas de todos os provedores já usados neste processo."""
+    with _clientes_trava:
+        clientes = list(_clientes.values())
+    return {cliente.nome: cliente.metricas() for cliente in clientes}
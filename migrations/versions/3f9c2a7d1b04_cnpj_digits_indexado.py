@@ -0,0 +1,52 @@
+"""Coluna cnpj_digits (CNPJ sem máscara) indexada em contrat_cond
+
+Revision ID: 3f9c2a7d1b04
+Revises: 1e2628bfe48b
+Create Date: 2026-10-18 09:12:31.204518
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9c2a7d1b04'
+down_revision = '1e2628bfe48b'
+branch_labels = None
+depends_on = None
+
+TAMANHO_LOTE = 1000
+
+
+def upgrade():
+    op.add_column('contrat_cond', sa.Column('cnpj_digits', sa.String(length=14), nullable=True))
+
+    # Backfill: calcula os dígitos dos CNPJs já cadastrados, em lotes
+    conexao = op.get_bind()
+    contrat_cond = sa.table('contrat_cond', sa.column('id', sa.Integer), sa.column('cnpj', sa.String),
+                            sa.column('cnpj_digits', sa.String))
+    atualizar = (contrat_cond.update()
+                 .where(contrat_cond.c.id == sa.bindparam('b_id'))
+                 .values(cnpj_digits=sa.bindparam('b_digits')))
+    ultimo_id = 0
+    while True:
+        lote = conexao.execute(
+            sa.select(contrat_cond.c.id, contrat_cond.c.cnpj)
+            .where(contrat_cond.c.id > ultimo_id)
+            .order_by(contrat_cond.c.id)
+            .limit(TAMANHO_LOTE)
+        ).fetchall()
+        if not lote:
+            break
+        conexao.execute(atualizar, [{'b_id': id_, 'b_digits': re.sub(r'\D', '', cnpj or '')} for id_, cnpj in lote])
+        ultimo_id = lote[-1][0]
+
+    op.create_index('ix_contrat_cond_cnpj_digits', 'contrat_cond', ['cnpj_digits'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_contrat_cond_cnpj_digits', table_name='contrat_cond')
+    with op.batch_alter_table('contrat_cond') as batch_op:
+        batch_op.drop_column('cnpj_digits')
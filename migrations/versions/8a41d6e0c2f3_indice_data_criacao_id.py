@@ -0,0 +1,24 @@
+"""Índice composto (data_criacao, id) para a paginação por cursor
+
+Revision ID: 8a41d6e0c2f3
+Revises: 3f9c2a7d1b04
+Create Date: 2026-10-18 10:03:47.918265
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a41d6e0c2f3'
+down_revision = '3f9c2a7d1b04'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_contrat_cond_data_criacao_id', 'contrat_cond', ['data_criacao', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_contrat_cond_data_criacao_id', table_name='contrat_cond')
@@ -0,0 +1,52 @@
+"""Tabela resumo_contratos (rollup do dashboard)
+
+Revision ID: c57e19b8a2d6
+Revises: 8a41d6e0c2f3
+Create Date: 2026-10-18 11:26:05.337140
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c57e19b8a2d6'
+down_revision = '8a41d6e0c2f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # O db.create_all() da inicialização do app pode já ter criado a tabela (vazia ou populada)
+    if sa.inspect(op.get_bind()).has_table('resumo_contratos'):
+        return
+
+    op.create_table('resumo_contratos',
+    sa.Column('dimensao', sa.String(length=20), nullable=False),
+    sa.Column('chave', sa.String(length=200), nullable=False),
+    sa.Column('quantidade', sa.Integer(), nullable=False),
+    sa.Column('valor_total', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.PrimaryKeyConstraint('dimensao', 'chave')
+    )
+
+    # Backfill a partir dos contratos existentes
+    if op.get_bind().dialect.name == 'postgresql':
+        mes = "coalesce(to_char(data_criacao, 'YYYY-MM'), '')"
+    else:
+        mes = "coalesce(strftime('%Y-%m', data_criacao), '')"
+    dimensoes = {
+        'tipo_indice': "coalesce(tipo_indice, '')",
+        'abrangencia': "coalesce(abrangencia_contrato, '')",
+        'estado': "coalesce(estado, '')",
+        'mes': mes,
+    }
+    for dimensao, expressao in dimensoes.items():
+        op.execute(
+            "INSERT INTO resumo_contratos (dimensao, chave, quantidade, valor_total) "
+            f"SELECT '{dimensao}', {expressao}, count(*), coalesce(sum(valor_contrato), 0) "
+            f"FROM contrat_cond GROUP BY {expressao}"
+        )
+
+
+def downgrade():
+    op.drop_table('resumo_contratos')
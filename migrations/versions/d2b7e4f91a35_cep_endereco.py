@@ -0,0 +1,36 @@
+"""Tabela cep_endereco (base local de CEPs)
+
+Revision ID: d2b7e4f91a35
+Revises: c57e19b8a2d6
+Create Date: 2026-10-18 13:20:41.518220
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2b7e4f91a35'
+down_revision = 'c57e19b8a2d6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # O db.create_all() da inicialização do app pode já ter criado a tabela
+    if sa.inspect(op.get_bind()).has_table('cep_endereco'):
+        return
+
+    op.create_table('cep_endereco',
+    sa.Column('cep', sa.String(length=8), nullable=False),
+    sa.Column('logradouro', sa.String(length=200), nullable=True),
+    sa.Column('bairro', sa.String(length=100), nullable=True),
+    sa.Column('localidade', sa.String(length=100), nullable=True),
+    sa.Column('uf', sa.String(length=2), nullable=True),
+    sa.Column('atualizado_em', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('cep')
+    )
+
+
+def downgrade():
+    op.drop_table('cep_endereco')
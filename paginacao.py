@@ -0,0 +1,120 @@
+# paginacao.py
+# Paginação por cursor (keyset) para a listagem de contratos.
+#
+# Em vez de OFFSET + COUNT(*) a cada página, a próxima página é buscada a partir
+# da chave (data_criacao, id) do último item exibido, usando o índice composto
+# ix_contrat_cond_data_criacao_id. O custo por página fica constante, não
+# importa quão "funda" ela seja.
+
+import base64
+from datetime import datetime
+
+from sqlalchemy import text, tuple_
+
+
+class CursorInvalido(ValueError):
+    """Token de paginação malformado (editado à mão ou truncado)."""
+
+
+def codificar_cursor(data_criacao, id_):
+    """Gera o token opaco (base64 url-safe) a partir da chave do item."""
+    bruto = f"{data_criacao.isoformat()}|{id_}".encode('utf-8')
+    return base64.urlsafe_b64encode(bruto).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(token):
+    """Converte o token de volta para a chave (data_criacao, id)."""
+    try:
+        preenchimento = '=' * (-len(token) % 4)
+        bruto = base64.urlsafe_b64decode(token + preenchimento).decode('utf-8')
+        data_str, id_str = bruto.rsplit('|', 1)
+        return datetime.fromisoformat(data_str), int(id_str)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise CursorInvalido(f"Cursor de paginação inválido: {token!r}") from e
+
+
+def contagem_aproximada(bind, tabela):
+    """Estimativa barata do total de linhas da tabela (sem COUNT(*)).
+
+    PostgreSQL: reltuples do catálogo. SQLite: estatística do ANALYZE, se houver,
+    senão o maior rowid (limite superior, ignora exclusões).
+    """
+    dialeto = bind.dialect.name
+    if dialeto == 'postgresql':
+        total = bind.execute(text(
+            "SELECT reltuples::bigint FROM pg_class WHERE relname = :tabela"
+        ), {'tabela': tabela}).scalar()
+        return max(int(total or 0), 0)
+    if dialeto == 'sqlite':
+        tem_stat = bind.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+        )).first()
+        if tem_stat:
+            stat = bind.execute(text(
+                "SELECT stat FROM sqlite_stat1 WHERE tbl = :tabela AND idx IS NULL"
+            ), {'tabela': tabela}).scalar()
+            if stat:
+                return int(stat.split()[0])
+        return int(bind.execute(text(f"SELECT coalesce(max(rowid), 0) FROM {tabela}")).scalar())
+    return None
+
+
+class PaginaCursor:
+    """Uma página da listagem por cursor.
+
+    Expõe `items`, `has_prev` e `has_next` como o objeto de `paginate()`, para
+    que o template funcione nos dois modos, além dos tokens `prev_cursor` e
+    `next_cursor` e do `total_aproximado` (None quando não calculado).
+    """
+
+    def __init__(self, items, per_page, has_prev, has_next, total_aproximado=None):
+        self.items = items
+        self.per_page = per_page
+        self.has_prev = has_prev
+        self.has_next = has_next
+        self.total_aproximado = total_aproximado
+
+    @property
+    def prev_cursor(self):
+        if not (self.has_prev and self.items):
+            return None
+        primeiro = self.items[0]
+        return codificar_cursor(primeiro.data_criacao, primeiro.id)
+
+    @property
+    def next_cursor(self):
+        if not (self.has_next and self.items):
+            return None
+        ultimo = self.items[-1]
+        return codificar_cursor(ultimo.data_criacao, ultimo.id)
+
+
+def paginar_por_cursor(query, modelo, per_page, apos=None, antes=None, total_aproximado=None):
+    """Pagina `query` pela chave (data_criacao DESC, id DESC).
+
+    `apos`: token do último item da página atual (vai para a próxima página).
+    `antes`: token do primeiro item da página atual (volta para a anterior).
+    Sem token, retorna a primeira página (mais recentes).
+    """
+    chave = tuple_(modelo.data_criacao, modelo.id)
+    query = query.order_by(None)
+
+    if antes:
+        # Página anterior: percorre em ordem crescente a partir do cursor e inverte
+        data_criacao, id_ = decodificar_cursor(antes)
+        linhas = (query.filter(chave > tuple_(data_criacao, id_))
+                       .order_by(modelo.data_criacao.asc(), modelo.id.asc())
+                       .limit(per_page + 1).all())
+        has_prev = len(linhas) > per_page
+        items = list(reversed(linhas[:per_page]))
+        return PaginaCursor(items, per_page, has_prev=has_prev, has_next=True,
+                            total_aproximado=total_aproximado)
+
+    if apos:
+        data_criacao, id_ = decodificar_cursor(apos)
+        query = query.filter(chave < tuple_(data_criacao, id_))
+
+    linhas = (query.order_by(modelo.data_criacao.desc(), modelo.id.desc())
+                   .limit(per_page + 1).all())
+    return PaginaCursor(linhas[:per_page], per_page, has_prev=bool(apos),
+                        has_next=len(linhas) > per_page, total_aproximado=total_aproximado)
@@ -0,0 +1,95 @@
+# pdf_cache.py
+# Cache em disco dos PDFs de contrato já renderizados.
+#
+# A chave é um hash (SHA-256) dos campos do contrato + versão do layout + linha
+# de data impressa no documento. Se nada disso mudou, o PDF é o mesmo byte a byte
+# e pode ser servido direto do disco, sem passar pelo ReportLab. A chave também
+# serve de ETag. O diretório é limitado em bytes; os arquivos acessados há mais
+# tempo são removidos primeiro.
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+
+def _serializar(valor):
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    return valor
+
+
+def chave_cache_pdf(dados, versao_layout, linha_data):
+    """Hash estável dos dados que determinam o conteúdo do PDF."""
+    conteudo = {
+        'dados': {campo: _serializar(valor) for campo, valor in dados.items()},
+        'versao_layout': versao_layout,
+        'linha_data': linha_data,
+    }
+    bruto = json.dumps(conteudo, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(bruto.encode('utf-8')).hexdigest()
+
+
+class CachePDF:
+    """PDFs em arquivos `<chave>.pdf` dentro de `diretorio`, limitados a `max_bytes` no total."""
+
+    def __init__(self, diretorio, max_bytes=200 * 1024 * 1024):
+        self.diretorio = diretorio
+        self.max_bytes = max_bytes
+        self._trava = threading.Lock()
+        os.makedirs(diretorio, exist_ok=True)
+
+    def caminho(self, chave):
+        return os.path.join(self.diretorio, f"{chave}.pdf")
+
+    def obter(self, chave):
+        """Caminho do PDF em cache (ou None). Atualiza o horário de acesso para o LRU."""
+        caminho = self.caminho(chave)
+        try:
+            estado = os.stat(caminho)
+        except FileNotFoundError:
+            return None
+        # Mantém o mtime (usado no Last-Modified) e marca o acesso no atime
+        os.utime(caminho, (time.time(), estado.st_mtime))
+        return caminho
+
+    def guardar(self, chave, conteudo):
+        """Grava o PDF de forma atômica (arquivo temporário + rename) e aplica o limite de tamanho."""
+        caminho = self.caminho(chave)
+        descritor, temporario = tempfile.mkstemp(dir=self.diretorio, suffix='.tmp')
+        try:
+            with os.fdopen(descritor, 'wb') as arquivo:
+                arquivo.write(conteudo)
+            os.replace(temporario, caminho)
+        except BaseException:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            raise
+        self._despejar()
+        return caminho
+
+    def _despejar(self):
+        with self._trava:
+            arquivos = []
+            total = 0
+            for entrada in os.scandir(self.diretorio):
+                if entrada.is_file() and entrada.name.endswith('.pdf'):
+                    estado = entrada.stat()
+                    arquivos.append((estado.st_atime, estado.st_size, entrada.path))
+                    total += estado.st_size
+            if total <= self.max_bytes:
+                return
+            for _, tamanho, caminho in sorted(arquivos):
+                try:
+                    os.remove(caminho)
+                except FileNotFoundError:
+                    pass
+                total -= tamanho
+                if total <= self.max_bytes:
+                    break
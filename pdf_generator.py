@@ -4,9 +4,12 @@ from io import BytesIO
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from reportlab.platypus import Paragraph
-from reportlab.lib.units import inch
+from reportlab.lib.units import inch, cm
 from reportlab.lib import colors
+from types import SimpleNamespace
+from pdf_recursos import CAMINHO_LOGO, estilos_contrato, estilos_reportlab, logo
 import datetime
 import os 
 # Funções format_currency_br e format_date_br devem estar aqui, logo acima de gerar_pdf_reportlab
@@ -65,11 +68,8 @@ def gerar_pdf_reportlab(data):
     
     # ------------------ 0. DEFINIÇÃO DE ESTILOS E SETUP ------------------
     
-    styles = getSampleStyleSheet()
-    styles.add(ParagraphStyle(name='TitleStyle', fontSize=14, fontName='Helvetica-Bold', alignment=1))
-    styles.add(ParagraphStyle(name='MyBodyTextBold', fontSize=10, fontName='Helvetica-Bold'))
-    styles.add(ParagraphStyle(name='MyBodyText', fontSize=10, fontName='Helvetica'))
-    styles.add(ParagraphStyle(name='Rodape', fontSize=8, fontName='Helvetica', alignment=1))
+    # Estilos montados uma vez por processo (pdf_recursos)
+    styles = estilos_reportlab()
     
     # ------------------ 1. CABEÇALHO (Logo e Info da Empresa) ------------------
     
@@ -77,9 +77,9 @@ def gerar_pdf_reportlab(data):
     text_y_separator = height - 90 
     logo_y = height - 85 
     
-    logo_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'logo.png')
-    if os.path.exists(logo_path):
-        p.drawImage(logo_path, 
+    logo_imagem = logo()  # já decodificado (pdf_recursos)
+    if logo_imagem is not None:
+        p.drawImage(logo_imagem, 
                     x=margin,              
                     y=logo_y,         
                     width=60,              
@@ -203,4 +203,285 @@ def gerar_pdf_reportlab(data):
     p.save()
     
     buffer.seek(0)
-    return buffer
\ No newline at end of file
+    return buffer
+
+
+# --- CONTRATO EM PDF (layout usado pela rota /download_contrato_pdf) ---
+
+# Incrementar sempre que o layout abaixo mudar: invalida os PDFs já guardados em cache.
+VERSAO_LAYOUT_CONTRATO = 1
+
+# Campos do contrato usados no layout (o app monta um dicionário com eles)
+CAMPOS_CONTRATO_PDF = (
+    'nome', 'cnpj', 'telefone', 'email', 'valor_contrato', 'inicio_contrato', 'termino_contrato',
+    'abrangencia_contrato', 'tipo_indice', 'endereco', 'cep', 'estado', 'clausulas_adicionais',
+)
+
+# Definição do Rodapé
+RODAPE_TEXTO = "Rua: GIOVANNI DI BALDUCCIO, 402 - VILA MORAES, SAO PAULO - São Paulo - SP - CEP: 04170-000 | Tel: 11999441135"
+
+
+def linha_data_contrato(data_emissao):
+    """Linha de local e data impressa no contrato: 'São Paulo, 5 de março de 2026'."""
+    meses = {1: 'janeiro', 2: 'fevereiro', 3: 'março', 4: 'abril', 5: 'maio', 6: 'junho', 7: 'julho', 8: 'agosto', 9: 'setembro', 10: 'outubro', 11: 'novembro', 12: 'dezembro'}
+    return f"São Paulo, {data_emissao.day} de {meses.get(data_emissao.month, '')} de {data_emissao.year}"
+
+
+def gerar_contrato_pdf(dados, data_emissao=None):
+    """Gera o PDF do contrato e retorna os bytes.
+
+    `dados` é um dicionário com os CAMPOS_CONTRATO_PDF; `data_emissao` é a data
+    impressa na linha "São Paulo, ..." (padrão: agora).
+    """
+    contrato = SimpleNamespace(**dados)
+    data_emissao = data_emissao or datetime.datetime.now()
+
+    output = BytesIO()
+    
+    # === CONFIGURAÇÃO DE REPORTLAB ===
+    margem_superior = 2 * cm
+    margem_inferior = 2 * cm
+    margem_esquerda = 2 * cm
+    margem_direita = 2 * cm
+    page_width, page_height = letter
+
+    p = canvas.Canvas(output, pagesize=letter)
+
+    # Estilos montados uma vez por processo e reaproveitados (pdf_recursos)
+    estilos = estilos_contrato()
+    normal_style = estilos.normal
+    bold_style = estilos.negrito
+    header_style = estilos.cabecalho
+    title_style = estilos.titulo
+    right_aligned_style = estilos.direita
+    clausula_style = estilos.clausula
+    signature_label_style = estilos.assinatura
+    footer_style = estilos.rodape
+    
+    current_y = page_height - margem_superior
+    content_width = page_width - margem_esquerda - margem_direita
+    
+    # --- CABEÇALHO (Logo e Info da Empresa) ---
+    logo_imagem = logo()  # ImageReader já decodificado, ou None
+    logo_width = 3 * cm
+    logo_height = 1.5 * cm
+
+    # 1. Tenta desenhar o logo
+    try:
+        if logo_imagem is None:
+            raise FileNotFoundError(CAMINHO_LOGO)
+        p.drawImage(logo_imagem, margem_esquerda, current_y - logo_height, width=logo_width, height=logo_height)
+    except Exception as e:
+        # Fallback (Desenha o texto M.A. Automação no lugar)
+        fallback_para = Paragraph("M.A. Automação", bold_style)
+        fallback_para.wrapOn(p, logo_width, page_height)
+        fallback_para.drawOn(p, margem_esquerda, current_y - fallback_para.height)
+
+    # 2. Informações da empresa ao lado do logo
+    info_x = margem_esquerda + logo_width + 0.5 * cm
+    info_width = content_width - logo_width - 0.5 * cm
+
+    empresa_para = Paragraph("M.A. Automação", header_style)
+    cnpj_para = Paragraph("CNPJ: 27.857.310/0001-83", header_style)
+
+    # Desenha "M.A. Automação"
+    empresa_para.wrapOn(p, info_width, page_height)
+    empresa_para.drawOn(p, info_x, current_y - empresa_para.height)
+    
+    # Desenha CNPJ
+    cnpj_para.wrapOn(p, info_width, page_height)
+    cnpj_para.drawOn(p, info_x, current_y - empresa_para.height - cnpj_para.height)
+    
+    # Ajusta a altura atual após o cabeçalho (usa o elemento mais alto: o logo)
+    current_y -= logo_height + 0.5 * cm
+    
+    # Linha separadora do cabeçalho
+    p.line(margem_esquerda, current_y, page_width - margem_direita, current_y)
+    current_y -= 0.5 * cm
+
+    # --- TÍTULO DO CONTRATO ---
+    title_para = Paragraph("CONTRATO DE PRESTAÇÃO DE SERVIÇOS", title_style)
+    title_para.wrapOn(p, content_width, page_height)
+    title_x = margem_esquerda + (content_width - title_para.width) / 2
+    title_para.drawOn(p, title_x, current_y - title_para.height)
+    current_y -= title_para.height
+    
+    # Espaçamento entre o título e a data
+    current_y -= 0.5 * cm 
+
+    # --- LOCAL E DATA ---
+    data_formatada = linha_data_contrato(data_emissao)
+    local_data_para = Paragraph(data_formatada, right_aligned_style)
+    
+    local_data_para.wrapOn(p, content_width, page_height)
+    local_data_x = page_width - margem_direita - local_data_para.width # Alinha à direita
+    local_data_para.drawOn(p, local_data_x, current_y - local_data_para.height) 
+    current_y -= local_data_para.height 
+    
+    # MUDANÇA 1: Aumenta o espaçamento após a data (entre a data e o bloco de detalhes)
+    current_y -= 1.0 * cm 
+
+    # --- DADOS DO CONTRATO (2 COLUNAS) ---
+    
+    # Definindo colunas e suas larguras
+    col_labels_width = 3.5 * cm
+    col_values_width = 6 * cm
+    
+    col1_x = margem_esquerda
+    col2_x = margem_esquerda + col_labels_width + col_values_width
+    
+    # Definindo os dados em pares de [Chave, Valor]
+    contrato_details_pairs = [
+        # Coluna 1
+        [('Nome:', contrato.nome), ('CNPJ:', contrato.cnpj), ('Telefone:', contrato.telefone), ('Email:', contrato.email), ('Valor do Contrato:', format_currency_br(contrato.valor_contrato)), ('Início do Contrato:', contrato.inicio_contrato.strftime('%d de %B de %Y') if contrato.inicio_contrato else 'Não definido')],
+        # Coluna 2
+        [('Término do Contrato:', contrato.termino_contrato.strftime('%d de %B de %Y') if contrato.termino_contrato else 'Não definido'), ('Abrangência do Contrato:', contrato.abrangencia_contrato), ('Tipo de Índice de Reajuste:', contrato.tipo_indice), ('Endereço Completo:', f"{contrato.endereco}, {contrato.cep}, {contrato.estado}")]
+    ]
+
+    # Ajuste vertical para o layout de duas colunas
+    start_y = current_y
+
+    # Processa Coluna 1 (primeiro elemento de cada par)
+    col1_y = start_y
+    for label, value in contrato_details_pairs[0]:
+        label_para = Paragraph(f"<b>{label}</b>", normal_style)
+        value_para = Paragraph(str(value), normal_style)
+        
+        # Desenha Label (esquerda)
+        label_para.wrapOn(p, col_labels_width, page_height)
+        label_para.drawOn(p, col1_x, col1_y - label_para.height)
+        
+        # Desenha Valor (direita da Coluna 1)
+        value_para.wrapOn(p, col_values_width, page_height)
+        value_para.drawOn(p, col1_x + col_labels_width, col1_y - value_para.height)
+        
+        # Atualiza Y
+        col1_y -= max(label_para.height, value_para.height) + 0.2 * cm
+        
+    # Processa Coluna 2 (segundo elemento de cada par)
+    col2_y = start_y
+    for label, value in contrato_details_pairs[1]:
+        label_para = Paragraph(f"<b>{label}</b>", normal_style)
+        value_para = Paragraph(str(value), normal_style)
+        
+        # Desenha Label (esquerda)
+        label_para.wrapOn(p, col_labels_width, page_height)
+        label_para.drawOn(p, col2_x, col2_y - label_para.height)
+        
+        # Desenha Valor (direita da Coluna 2)
+        value_para.wrapOn(p, col_values_width, page_height)
+        value_para.drawOn(p, col2_x + col_labels_width, col2_y - value_para.height)
+        
+        # Atualiza Y
+        col2_y -= max(label_para.height, value_para.height) + 0.2 * cm
+
+    # O novo Y atual deve ser o menor entre col1_y e col2_y
+    current_y = min(col1_y, col2_y) - 0.5 * cm 
+
+    # --- CLÁUSULA PRIMEIRA ---
+    # Título da Cláusula
+    clausula_title_para = Paragraph("<u>CLÁUSULA PRIMEIRA - DO OBJETO</u>", bold_style)
+    clausula_title_para.wrapOn(p, content_width, page_height)
+    clausula_title_para.drawOn(p, margem_esquerda, current_y - clausula_title_para.height)
+    current_y -= clausula_title_para.height + 0.2 * cm
+
+    # Texto da Cláusula (Adaptado para contrato)
+    clausula_objeto_text = f"""
+    Pelo presente instrumento, as partes acima qualificadas, de comum acordo, 
+    ajustam a prestação dos serviços de {contrato.abrangencia_contrato or ' [ÁREA DE SERVIÇO] '}, 
+    mediante as especificações e condições estabelecidas neste documento, com início em 
+    {contrato.inicio_contrato.strftime('%d/%m/%Y') if contrato.inicio_contrato else ' [DATA INICIAL] '} 
+    e término em 
+    {contrato.termino_contrato.strftime('%d/%m/%Y') if contrato.termino_contrato else ' [DATA FINAL] '}, 
+    com o valor total de {format_currency_br(contrato.valor_contrato)}.
+    """
+    clausula_para = Paragraph(clausula_objeto_text, clausula_style)
+    clausula_para.wrapOn(p, content_width, page_height)
+    clausula_para.drawOn(p, margem_esquerda, current_y - clausula_para.height)
+    current_y -= clausula_para.height + 0.5 * cm
+    
+    # Cláusulas Adicionais (Se houverem)
+    if contrato.clausulas_adicionais:
+        clausula_adicional_title = Paragraph("<u>CLÁUSULAS ADICIONAIS</u>", bold_style)
+        clausula_adicional_title.wrapOn(p, content_width, page_height)
+        clausula_adicional_title.drawOn(p, margem_esquerda, current_y - clausula_adicional_title.height)
+        current_y -= clausula_adicional_title.height + 0.2 * cm
+        
+        clausulas_adicionais_para = Paragraph(contrato.clausulas_adicionais, clausula_style)
+        clausulas_adicionais_para.wrapOn(p, content_width, page_height)
+        clausulas_adicionais_para.drawOn(p, margem_esquerda, current_y - clausulas_adicionais_para.height)
+        current_y -= clausulas_adicionais_para.height + 0.5 * cm
+        
+        # Se houverem cláusulas adicionais, adiciona um espaço maior antes do aceite
+        space_after_clausulas = 2.0 * cm 
+    else:
+        # Caso contrário, um espaço menor
+        space_after_clausulas = 1.5 * cm
+
+    # --- TEXTO DE ACEITE (Li e concordo...) ---
+    
+    # Define o ponto mínimo onde a frase de aceite deve começar (3 cm acima da linha de assinatura, deixando 1cm para a frase e 0.5cm de margem)
+    y_line_position_signature = margem_inferior + 3 * cm
+    y_assinaturas_min = y_line_position_signature + 1.5 * cm # 1.5 cm acima da linha de assinatura
+
+    # MUDANÇA 2: Calcula a posição Y da frase de aceite
+    # Posição calculada com base no fim da última cláusula + espaçamento
+    y_calculated_for_aceite = current_y - space_after_clausulas 
+    
+    # Usa a posição calculada, mas garante que não seja menor que o mínimo
+    final_y_aceite = max(y_calculated_for_aceite, y_assinaturas_min)
+         
+    # Texto e Estilo
+    aceite_text = "Li e concordo com os termos do contrato."
+    aceite_style = estilos.aceite
+
+    aceite_para = Paragraph(aceite_text, aceite_style)
+    aceite_para.wrapOn(p, content_width, page_height)
+
+    # Desenha o texto de aceite no Y ajustado
+    aceite_x = margem_esquerda + (content_width - aceite_para.width) / 2
+    aceite_para.drawOn(p, aceite_x, final_y_aceite - aceite_para.height)
+    
+    # Atualiza current_y para a próxima seção
+    current_y = final_y_aceite - aceite_para.height - 0.5 * cm
+
+    # --- ASSINATURAS (Posicionamento Fixo) ---
+    
+    signature_line_length = 6 * cm 
+    
+    # Assinatura Empresa (Esquerda)
+    x_empresa_center = margem_esquerda + (content_width / 4)
+    x_empresa_line_start = x_empresa_center - (signature_line_length / 2)
+    
+    p.line(x_empresa_line_start, y_line_position_signature, x_empresa_line_start + signature_line_length, y_line_position_signature)
+    
+    empresa_label_para = Paragraph("Assinatura Empresa (M.A. Automação)", signature_label_style)
+    empresa_label_para.wrapOn(p, signature_line_length, page_height)
+    empresa_label_y = y_line_position_signature - empresa_label_para.height - 0.2 * cm
+    empresa_label_para.drawOn(p, x_empresa_line_start, empresa_label_y)
+
+    # Assinatura Contratante (Direita)
+    x_contratante_center = margem_esquerda + (content_width * 3 / 4)
+    x_contratante_line_start = x_contratante_center - (signature_line_length / 2)
+    
+    p.line(x_contratante_line_start, y_line_position_signature, x_contratante_line_start + signature_line_length, y_line_position_signature)
+    
+    contratante_nome_para = Paragraph(contrato.nome.upper(), signature_label_style)
+    contratante_nome_para.wrapOn(p, signature_line_length, page_height)
+    contratante_nome_y = y_line_position_signature - contratante_nome_para.height - 0.2 * cm
+    contratante_nome_para.drawOn(p, x_contratante_line_start, contratante_nome_y)
+
+    contratante_label_para = Paragraph("Assinatura Contratante", signature_label_style)
+    contratante_label_para.wrapOn(p, signature_line_length, page_height)
+    contratante_label_y = contratante_nome_y - contratante_label_para.height - 0.2 * cm 
+    contratante_label_para.drawOn(p, x_contratante_line_start, contratante_label_y)
+
+    # --- RODAPÉ (Fixo) ---
+    footer_para = Paragraph(RODAPE_TEXTO, footer_style)
+    footer_para.wrapOn(p, content_width, page_height)
+    footer_x_center = margem_esquerda + (content_width - footer_para.width) / 2 
+    footer_para.drawOn(p, footer_x_center, margem_inferior - (0.5 * cm) ) 
+
+    p.save()
+
+    return output.getvalue()
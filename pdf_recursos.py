@@ -0,0 +1,78 @@
+# pdf_recursos.py
+# Recursos do ReportLab compartilhados entre as renderizações de PDF.
+#
+# Estilos de parágrafo e o logo não mudam de um contrato para outro, mas eram
+# recriados a cada PDF (getSampleStyleSheet + ~10 ParagraphStyle + leitura e
+# decodificação do static/logo.png). Aqui eles são montados uma vez por processo
+# (lru_cache) e reaproveitados; nos processos do pool de renderização cada
+# filho monta os seus na primeira renderização. As fontes usadas são as padrão
+# do PDF (Helvetica), que não precisam de registro.
+#
+# O maior custo por PDF era a imagem do logo: a cada documento o ReportLab
+# comprime os pixels e os codifica em ASCII85 (em Python puro quando a extensão
+# _rl_accel não está instalada), cerca de 80% do tempo de renderização. Os PDFs
+# são baixados pela web, não precisam de fluxos em texto 7 bits: desligamos o
+# ASCII85 (rl_config.useA85) e os fluxos ficam só com FlateDecode, menores.
+
+import os
+from functools import lru_cache
+from types import SimpleNamespace
+
+from reportlab import rl_config
+from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import cm
+from reportlab.lib.utils import ImageReader
+
+CAMINHO_LOGO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'logo.png')
+
+rl_config.useA85 = 0
+
+
+@lru_cache(maxsize=None)
+def estilos_contrato():
+    """Estilos do layout do contrato (pdf_generator.gerar_contrato_pdf)."""
+    normal = ParagraphStyle(name='Normal', fontName='Helvetica', fontSize=10, leading=14, alignment=TA_LEFT)
+    centralizado = ParagraphStyle(name='Centered', parent=normal, alignment=TA_CENTER)
+    return SimpleNamespace(
+        normal=normal,
+        negrito=ParagraphStyle(name='BoldStyle', parent=normal, fontName='Helvetica-Bold'),
+        centralizado=centralizado,
+        cabecalho=ParagraphStyle(name='HeaderInfo', parent=normal, fontSize=12, leading=14, spaceAfter=0.1 * cm),
+        titulo=ParagraphStyle(name='ContractTitle', fontName='Helvetica-Bold', fontSize=15, leading=18,
+                              alignment=TA_CENTER, spaceAfter=0.5 * cm),
+        direita=ParagraphStyle(name='RightAligned', parent=normal, alignment=TA_RIGHT, fontSize=10, spaceAfter=0.5 * cm),
+        clausula=ParagraphStyle(name='Clausula', parent=normal, fontSize=11, leading=16, spaceAfter=0.5 * cm),
+        assinatura=ParagraphStyle(name='SignatureLabel', parent=centralizado, fontSize=10, leading=12),
+        rodape=ParagraphStyle(name='Footer', parent=normal, fontName='Helvetica', fontSize=8, alignment=TA_CENTER),
+        aceite=ParagraphStyle(name='Aceite', parent=centralizado, fontName='Helvetica', fontSize=10, leading=12),
+    )
+
+
+@lru_cache(maxsize=None)
+def estilos_reportlab():
+    """Folha de estilos do layout simples (pdf_generator.gerar_pdf_reportlab)."""
+    styles = getSampleStyleSheet()
+    styles.add(ParagraphStyle(name='TitleStyle', fontSize=14, fontName='Helvetica-Bold', alignment=1))
+    styles.add(ParagraphStyle(name='MyBodyTextBold', fontSize=10, fontName='Helvetica-Bold'))
+    styles.add(ParagraphStyle(name='MyBodyText', fontSize=10, fontName='Helvetica'))
+    styles.add(ParagraphStyle(name='Rodape', fontSize=8, fontName='Helvetica', alignment=1))
+    return styles
+
+
+@lru_cache(maxsize=None)
+def logo():
+    """ImageReader do logo já decodificado, ou None se o arquivo não existir/não puder ser lido."""
+    try:
+        imagem = ImageReader(CAMINHO_LOGO)
+        imagem.getRGBData()  # decodifica agora; o ImageReader guarda os pixels
+        return imagem
+    except Exception:
+        return None
+
+
+def limpar_recursos():
+    """Descarta os recursos montados (ex.: depois de trocar o logo; usado no benchmark)."""
+    estilos_contrato.cache_clear()
+    estilos_reportlab.cache_clear()
+    logo.cache_clear()
@@ -0,0 +1,185 @@
+# resumos.py
+# Tabela de resumo (rollup) do dashboard com manutenção incremental.
+#
+# Cada linha de resumo_contratos guarda, para uma dimensão (tipo_indice,
+# abrangencia, estado ou mês de data_criacao) e uma chave, a quantidade de
+# contratos e a soma de valor_contrato. Os eventos da sessão aplicam deltas a
+# cada INSERT/UPDATE/DELETE de contrato feito pelo ORM (cadastro, edição e
+# exclusão), na mesma transação. O dashboard sem filtro lê só essa tabela.
+
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import event, delete, update, insert
+from sqlalchemy.orm import attributes
+
+from estatisticas import DIMENSOES, agregar_contratos
+
+# Dimensão -> função que extrai a chave a partir dos valores do contrato
+_EXTRATORES = {
+    'tipo_indice': lambda v: v['tipo_indice'],
+    'abrangencia': lambda v: v['abrangencia_contrato'],
+    'estado': lambda v: v['estado'],
+    'mes': lambda v: v['data_criacao'].strftime('%Y-%m') if v['data_criacao'] else None,
+}
+_CAMPOS = ('tipo_indice', 'abrangencia_contrato', 'estado', 'data_criacao', 'valor_contrato')
+
+_CHAVE_DELTAS = 'resumo_contratos_deltas'
+
+
+def _normalizar_chave(chave):
+    # A chave faz parte da PK: NULL vira ''
+    return '' if chave is None else str(chave)
+
+
+def _decimal(valor):
+    if valor is None:
+        return Decimal('0')
+    return valor if isinstance(valor, Decimal) else Decimal(str(valor))
+
+
+def _valores_atuais(obj):
+    return {campo: getattr(obj, campo) for campo in _CAMPOS}
+
+
+def _valores_anteriores(obj):
+    """Valores antes das alterações pendentes (o que está refletido no resumo)."""
+    valores = {}
+    for campo in _CAMPOS:
+        historico = attributes.get_history(obj, campo)
+        if historico.deleted:
+            valores[campo] = historico.deleted[0]
+        elif historico.unchanged:
+            valores[campo] = historico.unchanged[0]
+        else:
+            valores[campo] = getattr(obj, campo)
+    return valores
+
+
+def _acumular(deltas, valores, sinal):
+    valor = _decimal(valores['valor_contrato']) * sinal
+    for dimensao in DIMENSOES:
+        chave = (dimensao, _normalizar_chave(_EXTRATORES[dimensao](valores)))
+        acumulado = deltas.setdefault(chave, [0, Decimal('0')])
+        acumulado[0] += sinal
+        acumulado[1] += valor
+
+
+def calcular_deltas(session, modelo):
+    """Deltas (quantidade, valor) por (dimensão, chave) das mudanças pendentes na sessão."""
+    deltas = {}
+    for obj in session.new:
+        if isinstance(obj, modelo):
+            if obj.data_criacao is None:
+                # Mesmo default da coluna, definido antes para sabermos o mês
+                obj.data_criacao = datetime.utcnow()
+            _acumular(deltas, _valores_atuais(obj), +1)
+    for obj in session.dirty:
+        if isinstance(obj, modelo) and session.is_modified(obj):
+            _acumular(deltas, _valores_anteriores(obj), -1)
+            _acumular(deltas, _valores_atuais(obj), +1)
+    for obj in session.deleted:
+        if isinstance(obj, modelo):
+            _acumular(deltas, _valores_anteriores(obj), -1)
+    return {chave: d for chave, d in deltas.items() if d[0] or d[1]}
+
+
+def _upsert(conexao, tabela, linha):
+    """INSERT ... ON CONFLICT DO UPDATE somando os deltas (SQLite e PostgreSQL)."""
+    dialeto = conexao.dialect.name
+    if dialeto == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as insert_dialeto
+    elif dialeto == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as insert_dialeto
+    else:
+        return False
+    stmt = insert_dialeto(tabela).values(**linha)
+    conexao.execute(stmt.on_conflict_do_update(
+        index_elements=[tabela.c.dimensao, tabela.c.chave],
+        set_={'quantidade': tabela.c.quantidade + stmt.excluded.quantidade,
+              'valor_total': tabela.c.valor_total + stmt.excluded.valor_total},
+    ))
+    return True
+
+
+def aplicar_deltas(conexao, tabela, deltas):
+    """Soma os deltas nas linhas do resumo (upsert) e remove as chaves que zeraram."""
+    for (dimensao, chave), (quantidade, valor) in deltas.items():
+        linha = {'dimensao': dimensao, 'chave': chave, 'quantidade': quantidade, 'valor_total': valor}
+        if _upsert(conexao, tabela, linha):
+            continue
+        # Outros bancos: UPDATE e, se a linha não existir, INSERT
+        resultado = conexao.execute(
+            update(tabela)
+            .where(tabela.c.dimensao == dimensao, tabela.c.chave == chave)
+            .values(quantidade=tabela.c.quantidade + quantidade,
+                    valor_total=tabela.c.valor_total + valor)
+        )
+        if resultado.rowcount == 0:
+            conexao.execute(insert(tabela).values(**linha))
+    if deltas:
+        conexao.execute(delete(tabela).where(tabela.c.quantidade <= 0))
+
+
+def registrar_manutencao_resumos(session, modelo, modelo_resumo):
+    """Liga a manutenção incremental do resumo aos flushes da sessão."""
+    tabela = modelo_resumo.__table__
+
+    @event.listens_for(session, 'before_flush')
+    def _calcular(sessao, flush_context, instances):
+        deltas = calcular_deltas(sessao, modelo)
+        if deltas:
+            pendentes = sessao.info.setdefault(_CHAVE_DELTAS, {})
+            for chave, (quantidade, valor) in deltas.items():
+                acumulado = pendentes.setdefault(chave, [0, Decimal('0')])
+                acumulado[0] += quantidade
+                acumulado[1] += valor
+
+    @event.listens_for(session, 'after_flush')
+    def _aplicar(sessao, flush_context):
+        deltas = sessao.info.pop(_CHAVE_DELTAS, None)
+        if deltas:
+            aplicar_deltas(sessao.connection(), tabela, deltas)
+
+    @event.listens_for(session, 'after_rollback')
+    def _descartar(sessao):
+        sessao.info.pop(_CHAVE_DELTAS, None)
+
+
+def reconstruir_resumos(session, modelo, modelo_resumo):
+    """Recalcula o resumo do zero a partir de contrat_cond (reparo de divergências)."""
+    tabela = modelo_resumo.__table__
+    agregado = agregar_contratos(session, modelo)
+    # NULL e '' viram a mesma chave ''
+    totais = {}
+    for dimensao in DIMENSOES:
+        for chave, (quantidade, valor) in agregado[dimensao].items():
+            acumulado = totais.setdefault((dimensao, _normalizar_chave(chave)), [0, Decimal('0')])
+            acumulado[0] += quantidade
+            acumulado[1] += valor
+    linhas = [
+        {'dimensao': dimensao, 'chave': chave, 'quantidade': quantidade, 'valor_total': valor}
+        for (dimensao, chave), (quantidade, valor) in totais.items()
+    ]
+    conexao = session.connection()
+    conexao.execute(delete(tabela))
+    if linhas:
+        conexao.execute(insert(tabela), linhas)
+    session.commit()
+    return len(linhas)
+
+
+def resumos_precisam_reconstrucao(session, modelo, modelo_resumo):
+    """True quando há contratos mas o resumo está vazio (ex.: tabela recém-criada)."""
+    tem_resumo = session.query(modelo_resumo.dimensao).limit(1).first() is not None
+    tem_contratos = session.query(modelo.id).limit(1).first() is not None
+    return tem_contratos and not tem_resumo
+
+
+def ler_resumos(session, modelo_resumo):
+    """Lê o resumo no mesmo formato de estatisticas.agregar_contratos()."""
+    agregado = {dimensao: {} for dimensao in DIMENSOES}
+    for linha in session.query(modelo_resumo).all():
+        if linha.dimensao in agregado:
+            agregado[linha.dimensao][linha.chave or None] = [linha.quantidade, _decimal(linha.valor_total)]
+    return agregado
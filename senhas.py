@@ -0,0 +1,71 @@
+# senhas.py
+# Hash de senhas com custo configurável e verificação fora da thread da requisição.
+#
+# O custo do hash (scrypt/pbkdf2 do Werkzeug) é alto de propósito, e no pico de
+# logins da manhã as verificações disputavam a CPU com as demais rotas.
+# - O método e o custo vêm da configuração (PASSWORD_HASH_METHOD, no formato do
+#   Werkzeug: 'scrypt', 'scrypt:32768:8:1', 'pbkdf2:sha256:600000'...). Quando o
+#   hash guardado foi gerado com outros parâmetros, o login bem-sucedido o refaz
+#   com os atuais (precisa_rehash).
+# - VerificadorSenhas limita quantas verificações rodam ao mesmo tempo (pool de
+#   threads; o hashlib libera o GIL durante o scrypt/pbkdf2) e quantas podem
+#   esperar; acima disso o login responde "tente novamente" em vez de enfileirar
+#   sem limite.
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class VerificacaoOcupada(Exception):
+    """Verificações de senha em andamento e na fila no limite: tente de novo em instantes."""
+
+
+@lru_cache(maxsize=None)
+def parametros_metodo(metodo):
+    """Parâmetros completos do método, como ficam no hash ('scrypt' -> 'scrypt:32768:8:1')."""
+    return generate_password_hash('', metodo).split('$', 1)[0]
+
+
+def gerar_hash(senha, metodo='scrypt'):
+    return generate_password_hash(senha, metodo)
+
+
+def precisa_rehash(hash_senha, metodo):
+    """True se o hash guardado não usa o método/custo configurado."""
+    return hash_senha.split('$', 1)[0] != parametros_metodo(metodo)
+
+
+class VerificadorSenhas:
+    """check_password_hash com concorrência limitada.
+
+    `workers` verificações rodam ao mesmo tempo e até `max_fila` esperam; com
+    workers=0 a verificação roda na própria thread (comportamento antigo).
+    """
+
+    def __init__(self, workers=2, max_fila=16, espera=5):
+        self.workers = workers
+        self.espera = espera
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix='senhas') if workers > 0 else None
+        self._vagas = threading.BoundedSemaphore(workers + max_fila) if workers > 0 else None
+        self.contadores = {'verificadas': 0, 'recusadas': 0}
+
+    def verificar(self, hash_senha, senha):
+        """True se a senha confere. Levanta VerificacaoOcupada se não houver vaga em `espera` segundos."""
+        if self._pool is None:
+            self.contadores['verificadas'] += 1
+            return check_password_hash(hash_senha, senha)
+        if not self._vagas.acquire(timeout=self.espera):
+            self.contadores['recusadas'] += 1
+            raise VerificacaoOcupada("Muitos logins ao mesmo tempo.")
+        try:
+            self.contadores['verificadas'] += 1
+            return self._pool.submit(check_password_hash, hash_senha, senha).result()
+        finally:
+            self._vagas.release()
+
+    def encerrar(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
@@ -0,0 +1,217 @@
+# servico_pdf.py
+# Serviço de renderização de PDFs fora dos workers de requisição.
+#
+# O layout do ReportLab é CPU puro: rodando dentro do worker do gunicorn, uma
+# rajada de downloads deixa as páginas comuns esperando. Aqui a renderização vai
+# para um pool de processos limitado, com fila de tamanho máximo (backpressure:
+# acima do limite o pedido é recusado na hora com FilaCheia), tempo máximo por
+# trabalho (o processo filho interrompe a renderização) e métricas de fila e de
+# tempo de renderização. A rota pode esperar o PDF até um prazo ou devolver o id
+# do trabalho para consulta posterior. Pedidos iguais (mesma chave do cache de
+# PDF) enquanto um trabalho está em andamento reaproveitam o mesmo trabalho.
+
+import os
+import signal
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+
+from pdf_generator import gerar_contrato_pdf
+
+
+class FilaCheia(Exception):
+    """A fila de renderização atingiu o limite; o cliente deve tentar mais tarde."""
+
+
+def _estourar_tempo(signum, frame):
+    raise TimeoutError("Tempo máximo de renderização do PDF excedido.")
+
+
+def _renderizar(dados, data_emissao, timeout):
+    """Executado no processo filho: renderiza com limite de tempo e mede a duração."""
+    usa_alarme = timeout and hasattr(signal, 'setitimer')
+    if usa_alarme:
+        signal.signal(signal.SIGALRM, _estourar_tempo)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    inicio = time.perf_counter()
+    try:
+        conteudo = gerar_contrato_pdf(dados, data_emissao)
+    finally:
+        if usa_alarme:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    return conteudo, time.perf_counter() - inicio
+
+
+class TrabalhoPDF:
+    """Um pedido de renderização. `future` termina com o caminho do PDF já gravado no cache."""
+
+    def __init__(self, chave):
+        self.id = uuid.uuid4().hex
+        self.chave = chave
+        self.future = Future()
+        self.enviado_em = time.time()
+        self.concluido_em = None
+        self.caminho = None   # arquivo no cache de PDF, quando concluído
+        self.erro = None
+
+    @property
+    def status(self):
+        if not self.future.done():
+            return 'pendente'
+        if self.erro is not None:
+            return 'expirado' if isinstance(self.erro, TimeoutError) else 'erro'
+        return 'concluido'
+
+    def aguardar(self, espera):
+        """Espera até `espera` segundos; retorna o caminho do PDF ou None se ainda não ficou pronto."""
+        # wait() em vez de result(timeout=...): TimeoutError também é o erro de um trabalho expirado
+        if not wait([self.future], timeout=espera).done:
+            return None
+        return self.future.result()
+
+    def como_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'enviado_em': self.enviado_em,
+            'concluido_em': self.concluido_em,
+            'erro': str(self.erro) if self.erro is not None else None,
+        }
+
+
+class ServicoRenderizacaoPDF:
+    """Pool de processos limitado para renderizar PDFs de contrato.
+
+    - `workers`: processos de renderização (None = todos os núcleos; 0 = no próprio processo).
+    - `max_fila`: trabalhos aceitos além dos que estão renderizando; acima disso, FilaCheia.
+    - `timeout`: segundos de renderização por trabalho (interrompido no processo filho).
+    - `retencao`: por quanto tempo um trabalho concluído continua consultável pelo id.
+    """
+
+    def __init__(self, cache_pdf, workers=None, max_fila=32, timeout=30, retencao=600):
+        self.cache_pdf = cache_pdf
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.max_fila = max_fila
+        self.timeout = timeout
+        self.retencao = retencao
+        self._vagas = threading.BoundedSemaphore(max(self.workers, 1) + max_fila)
+        self._trava = threading.Lock()
+        self._pool = None
+        self._trabalhos = {}      # id -> TrabalhoPDF
+        self._por_chave = {}      # chave do cache -> TrabalhoPDF em andamento
+        self._tempos = deque(maxlen=500)  # durações de renderização recentes
+        self._contadores = {'enviados': 0, 'concluidos': 0, 'erros': 0, 'expirados': 0,
+                            'recusados': 0, 'reaproveitados': 0}
+        self._tempo_total = 0.0
+
+    def _obter_pool(self):
+        if self._pool is None:
+            # 'spawn': os filhos não herdam threads nem conexões abertas do servidor
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context('spawn'))
+        return self._pool
+
+    def _executar(self, dados, data_emissao):
+        if self.workers <= 0:
+            future = Future()
+            try:
+                future.set_result(_renderizar(dados, data_emissao, None))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        try:
+            return self._obter_pool().submit(_renderizar, dados, data_emissao, self.timeout)
+        except BrokenProcessPool:
+            # Um filho morreu (ex.: falta de memória): recria o pool uma vez
+            self._pool = None
+            return self._obter_pool().submit(_renderizar, dados, data_emissao, self.timeout)
+
+    def submeter(self, chave, dados, data_emissao):
+        """Agenda a renderização e retorna o TrabalhoPDF (ou o que já está em andamento para a chave)."""
+        with self._trava:
+            self._limpar_antigos()
+            existente = self._por_chave.get(chave)
+            if existente is not None:
+                self._contadores['reaproveitados'] += 1
+                return existente
+            if not self._vagas.acquire(blocking=False):
+                self._contadores['recusados'] += 1
+                raise FilaCheia("Fila de renderização de PDF cheia. Tente novamente em instantes.")
+            trabalho = TrabalhoPDF(chave)
+            self._trabalhos[trabalho.id] = trabalho
+            self._por_chave[chave] = trabalho
+            self._contadores['enviados'] += 1
+
+        try:
+            execucao = self._executar(dados, data_emissao)
+        except Exception as e:
+            execucao = Future()
+            execucao.set_exception(e)
+        execucao.add_done_callback(lambda future: self._concluir(trabalho, future))
+        return trabalho
+
+    def _concluir(self, trabalho, future):
+        try:
+            conteudo, duracao = future.result()
+            trabalho.caminho = self.cache_pdf.guardar(trabalho.chave, conteudo)
+        except Exception as e:
+            trabalho.erro = e
+            duracao = None
+        with self._trava:
+            trabalho.concluido_em = time.time()
+            self._por_chave.pop(trabalho.chave, None)
+            if trabalho.erro is None:
+                self._contadores['concluidos'] += 1
+                self._tempos.append(duracao)
+                self._tempo_total += duracao
+            elif isinstance(trabalho.erro, TimeoutError):
+                self._contadores['expirados'] += 1
+            else:
+                self._contadores['erros'] += 1
+        self._vagas.release()
+        # Só agora quem espera pelo trabalho é liberado: o PDF já está no cache
+        if trabalho.erro is None:
+            trabalho.future.set_result(trabalho.caminho)
+        else:
+            trabalho.future.set_exception(trabalho.erro)
+
+    def _limpar_antigos(self):
+        limite = time.time() - self.retencao
+        for id_trabalho in [i for i, t in self._trabalhos.items() if t.concluido_em and t.concluido_em < limite]:
+            del self._trabalhos[id_trabalho]
+
+    def obter(self, id_trabalho):
+        with self._trava:
+            return self._trabalhos.get(id_trabalho)
+
+    def metricas(self):
+        """Profundidade da fila, contadores e tempos de renderização (segundos)."""
+        with self._trava:
+            tempos = sorted(self._tempos)
+            pendentes = sum(1 for t in self._trabalhos.values() if not t.future.done())
+
+            def percentil(p):
+                return round(tempos[min(len(tempos) - 1, int(p * len(tempos)))], 4) if tempos else None
+
+            concluidos = self._contadores['concluidos']
+            return {
+                'workers': self.workers,
+                'max_fila': self.max_fila,
+                'pendentes': pendentes,
+                'na_fila': max(0, pendentes - max(self.workers, 1)),
+                **self._contadores,
+                'tempo_renderizacao': {
+                    'medio': round(self._tempo_total / concluidos, 4) if concluidos else None,
+                    'p50': percentil(0.50),
+                    'p95': percentil(0.95),
+                    'max': round(tempos[-1], 4) if tempos else None,
+                },
+            }
+
+    def encerrar(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
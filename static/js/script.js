@@ -310,7 +310,7 @@ document.addEventListener('DOMContentLoaded', () => {
         setLoading('cep', true);
         
         try {
-            const response = await fetch(`https://viacep.com.br/ws/${cleanCep}/json/`);
+            const response = await fetch(`/api/cep/${cleanCep}`);
             const data = await response.json();
 
             if (!data.erro) {
@@ -321,7 +321,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 showError('cep', 'CEP não encontrado.');
             }
         } catch (error) {
-            showError('cep', 'Erro ao conectar com ViaCEP.');
+            showError('cep', 'Erro ao consultar o CEP.');
         } finally {
             setLoading('cep', false);
         }
@@ -437,7 +437,7 @@ document.addEventListener('DOMContentLoaded', () => {
         e.target.value = maskCEP(e.target.value);
         clearTimeout(cepTimeout);
         if (e.target.value.replace(/\D/g, '').length === 8) {
-            cepTimeout = setTimeout(() => fetchViaCEP(e.target.value), 1000);
+            cepTimeout = setTimeout(() => fetchViaCEP(e.target.value), 300); // consulta local (/api/cep): espera curta
         } else {
             clearError('cep');
         }
@@ -1,7 +1,12 @@
+import os
+import re
+import tempfile
 import unittest
+from unittest import mock
 from app import app as flask_app, db, User # Importe seu modelo User se existir
 from app import ContratCond as Contrato 
-from datetime import date
+from datetime import date, datetime, timedelta
+from decimal import Decimal
 from flask_login import login_user
 
 class ContractAppTestCase(unittest.TestCase):
@@ -102,5 +107,461 @@ class ContractAppTestCase(unittest.TestCase):
             contrato = db.session.get(Contrato, contrato_id)
             self.assertIsNone(contrato, "O contrato ainda existe. O @login_required pode estar bloqueando o teste.")
 
+    def _cache_pdf_temporario(self, diretorio):
+        """Troca o cache de PDF e o serviço de renderização por versões em `diretorio`, sem pool de processos."""
+        import contextlib
+        import app as app_module
+        from pdf_cache import CachePDF
+        from servico_pdf import ServicoRenderizacaoPDF
+
+        cache = CachePDF(diretorio)
+        pilha = contextlib.ExitStack()
+        pilha.enter_context(mock.patch.object(app_module, 'cache_pdf', cache))
+        pilha.enter_context(mock.patch.object(app_module, 'servico_pdf', ServicoRenderizacaoPDF(cache, workers=0)))
+        return pilha
+
+    def _criar_contrato(self, nome, cnpj, endereco="Endereço Teste", **extras):
+        """Cria um contrato mínimo direto no banco e retorna o ID."""
+        dados = dict(
+            nome=nome,
+            cnpj=cnpj,
+            endereco=endereco,
+            cep="00000-000",
+            estado="SP",
+            telefone="1199999999",
+            email="contrato@teste.com",
+            abrangencia_contrato="Total",
+            valor_contrato=100.0,
+            inicio_contrato=date(2025,1,1)
+        )
+        dados.update(extras)
+        with self.app.app_context():
+            c = Contrato(**dados)
+            db.session.add(c)
+            db.session.commit()
+            return c.id
+
+    def test_05_busca_textual_prefixo_e_cnpj(self):
+        """Testa a busca pelo índice textual: prefixo, CNPJ sem máscara e sincronização."""
+        self._criar_contrato("CONDOMINIO ALVORADA", "11.222.333/0001-81", endereco="Rua das Flores, 10")
+        contrato_id = self._criar_contrato("EDIFICIO BOSQUE", "44.555.666/0001-72", endereco="Avenida Paulista, 900")
+
+        response = self.client.get('/?termo=alvor')
+        self.assertIn(b"CONDOMINIO ALVORADA", response.data)
+        self.assertNotIn(b"EDIFICIO BOSQUE", response.data)
+
+        response = self.client.get('/?termo=44555666')
+        self.assertIn(b"EDIFICIO BOSQUE", response.data)
+        self.assertNotIn(b"CONDOMINIO ALVORADA", response.data)
+
+        # Atualização e exclusão precisam refletir no índice
+        with self.app.app_context():
+            db.session.get(Contrato, contrato_id).nome = "EDIFICIO RENOMEADO"
+            db.session.commit()
+        self.assertIn(b"EDIFICIO RENOMEADO", self.client.get('/?termo=renomead').data)
+        self.assertNotIn(b"EDIFICIO", self.client.get('/?termo=bosque').data)
+
+        self.client.post(f'/delete/{contrato_id}', follow_redirects=True)
+        self.assertNotIn(b"EDIFICIO RENOMEADO", self.client.get('/?termo=renomead').data)
+
+    def test_06_cnpj_digits_unicidade_e_busca(self):
+        """Testa a coluna cnpj_digits: preenchimento, unicidade no formulário e busca por prefixo."""
+        contrato_id = self._criar_contrato("CONDOMINIO DIGITOS", "11.222.333/0001-81")
+        with self.app.app_context():
+            self.assertEqual(db.session.get(Contrato, contrato_id).cnpj_digits, "11222333000181")
+
+        dados = {
+            'cnpj': '11.222.333/0001-81',
+            'nome': 'CONDOMINIO DUPLICADO',
+            'endereco': 'Rua de Teste, 123',
+            'cep': '01000-000',
+            'estado': 'SP',
+            'telefone': '(11) 99999-9999',
+            'email': 'teste@teste.com',
+            'valor_contrato': '5000,00',
+            'inicio_contrato': '2025-01-01',
+            'abrangencia_contrato': 'Total',
+            'tipo_indice': 'IGP-M'
+        }
+        self.client.post('/', data=dados, follow_redirects=True)
+        with self.app.app_context():
+            self.assertIsNone(Contrato.query.filter_by(nome='CONDOMINIO DUPLICADO').first())
+
+        self.assertIn(b"CONDOMINIO DIGITOS", self.client.get('/?termo=11222333').data)
+        self.assertIn(b"CONDOMINIO DIGITOS", self.client.get('/?termo=11.222.333/0001-81').data)
+        self.assertNotIn(b"CONDOMINIO DIGITOS", self.client.get('/?termo=11222334').data)
+
+    def test_07_paginacao_por_cursor(self):
+        """Testa a navegação por cursor (próxima/anterior) e o modo por número de página."""
+        for i in range(25):
+            self._criar_contrato(f"PAGINA_{i:02d}", f"{i:02d}.000.000/0001-00",
+                                 data_criacao=datetime(2025, 1, 1) + timedelta(hours=i))
+
+        primeira = self.client.get('/').data.decode('utf-8')
+        self.assertIn("PAGINA_24", primeira)
+        self.assertNotIn("PAGINA_14", primeira)
+        proximo = re.search(r'apos=([\w-]+)', primeira).group(1)
+
+        segunda = self.client.get(f'/?apos={proximo}').data.decode('utf-8')
+        self.assertIn("PAGINA_14", segunda)
+        self.assertIn("PAGINA_05", segunda)
+        self.assertNotIn("PAGINA_15", segunda)
+        anterior = re.search(r'antes=([\w-]+)', segunda).group(1)
+
+        de_volta = self.client.get(f'/?antes={anterior}').data.decode('utf-8')
+        self.assertIn("PAGINA_24", de_volta)
+        self.assertIn("PAGINA_15", de_volta)
+        self.assertNotIn("PAGINA_14", de_volta)
+
+        # Modo por número de página continua disponível
+        pagina_3 = self.client.get('/?page=3').data.decode('utf-8')
+        self.assertIn("PAGINA_04", pagina_3)
+        self.assertNotIn("PAGINA_05", pagina_3)
+
+        # Cursor adulterado volta para a primeira página
+        response = self.client.get('/?apos=lixo', follow_redirects=True)
+        self.assertIn(b"PAGINA_24", response.data)
+
+    def test_08_dashboard_agregado(self):
+        """Testa os números do dashboard calculados pelo GROUP BY único."""
+        self._criar_contrato("DASH_A", "01.000.000/0001-00", estado="SP", tipo_indice="IPCA",
+                             valor_contrato=1000, data_criacao=datetime(2025, 1, 10),
+                             termino_contrato=date.today() + timedelta(days=10))
+        self._criar_contrato("DASH_B", "02.000.000/0001-00", estado="RJ", tipo_indice="IPCA",
+                             valor_contrato=250.5, data_criacao=datetime(2025, 2, 10))
+        self._criar_contrato("DASH_C", "03.000.000/0001-00", estado="SP", tipo_indice=None,
+                             valor_contrato=100, data_criacao=datetime(2025, 2, 20))
+
+        with self.app.test_request_context():
+            from estatisticas import calcular_dashboard
+            contexto = calcular_dashboard(db.session, Contrato)
+            self.assertEqual(contexto['total_financeiro'], Decimal('1350.50'))
+            self.assertEqual(dict(zip(contexto['labels_regiao'], contexto['valores_regiao'])), {'RJ': 1, 'SP': 2})
+            self.assertEqual(dict(zip(contexto['labels_reajuste'], contexto['valores_reajuste'])),
+                             {'Não Informado': 1, 'IPCA': 2})
+            self.assertEqual(contexto['labels_mensal'], ['01/2025', '02/2025'])
+            self.assertEqual(contexto['valores_mensal'], [1, 2])
+            self.assertEqual([c.nome for c in contexto['alertas_vencimento']], ['DASH_A'])
+            self.assertEqual(contexto['top_5_recentes'][0].nome, 'DASH_C')
+
+            filtrado = calcular_dashboard(db.session, Contrato, data_inicio='2025-02-01')
+            self.assertEqual(filtrado['total_financeiro'], Decimal('350.50'))
+
+        response = self.client.get('/dashboard')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"1.350,50", response.data)
+
+    def test_09_resumo_incremental_do_dashboard(self):
+        """Testa a manutenção incremental do resumo no cadastro, edição e exclusão."""
+        from resumos import ler_resumos, reconstruir_resumos
+        from estatisticas import agregar_contratos
+        from app import ResumoContratos
+
+        dados = {
+            'cnpj': '12.345.678/0001-90',
+            'nome': 'CONDOMINIO RESUMO',
+            'endereco': 'Rua de Teste, 123',
+            'cep': '01000-000',
+            'estado': 'SP',
+            'telefone': '(11) 99999-9999',
+            'email': 'teste@teste.com',
+            'valor_contrato': '1.000,00',
+            'inicio_contrato': '2025-01-01',
+            'abrangencia_contrato': 'Total',
+            'tipo_indice': 'IPCA'
+        }
+        self.client.post('/', data=dados, follow_redirects=True)
+        self._criar_contrato("OUTRO RESUMO", "98.765.432/0001-10", estado="RJ", valor_contrato=50)
+        with self.app.app_context():
+            contrato_id = Contrato.query.filter_by(nome='CONDOMINIO RESUMO').first().id
+
+        dados.update(estado='MG', valor_contrato='2.500,00', tipo_indice='INPC')
+        self.client.post(f'/contrato/{contrato_id}/editar', data=dados, follow_redirects=True)
+
+        with self.app.app_context():
+            resumo = ler_resumos(db.session, ResumoContratos)
+            self.assertEqual(resumo['estado'], {'MG': [1, Decimal('2500.00')], 'RJ': [1, Decimal('50.00')]})
+            self.assertNotIn('IPCA', resumo['tipo_indice'])
+
+        self.client.post(f'/delete/{contrato_id}', follow_redirects=True)
+        with self.app.app_context():
+            resumo = ler_resumos(db.session, ResumoContratos)
+            self.assertEqual(resumo['estado'], {'RJ': [1, Decimal('50.00')]})
+            self.assertEqual(sum(q for q, _ in resumo['mes'].values()), 1)
+
+            # A reconstrução completa chega ao mesmo resultado
+            reconstruir_resumos(db.session, Contrato, ResumoContratos)
+            self.assertEqual(ler_resumos(db.session, ResumoContratos), resumo)
+            self.assertEqual(agregar_contratos(db.session, Contrato)['estado'], resumo['estado'])
+
+        self.assertIn(b"50,00", self.client.get('/dashboard').data)
+
+    def test_10_cache_do_dashboard_invalida_em_escritas(self):
+        """Testa que o dashboard em cache é invalidado quando um contrato é gravado."""
+        self._criar_contrato("CACHE_A", "05.000.000/0001-00", valor_contrato=111)
+        self.assertIn(b"111,00", self.client.get('/dashboard').data)
+
+        self._criar_contrato("CACHE_B", "06.000.000/0001-00", valor_contrato=222)
+        self.assertIn(b"333,00", self.client.get('/dashboard').data)
+
+    def test_11_pdf_em_cache_com_etag(self):
+        """Testa que o segundo download do PDF vem do cache e responde 304 com o ETag."""
+        import servico_pdf
+
+        contrato_id = self._criar_contrato("CONDOMINIO PDF", "07.000.000/0001-00",
+                                           termino_contrato=date(2026, 1, 1), tipo_indice="IPCA")
+        with tempfile.TemporaryDirectory() as diretorio, self._cache_pdf_temporario(diretorio), \
+                mock.patch.object(servico_pdf, 'gerar_contrato_pdf', wraps=servico_pdf.gerar_contrato_pdf) as gerar:
+            primeira = self.client.get(f'/download_contrato_pdf/{contrato_id}')
+            self.assertEqual(primeira.status_code, 200)
+            self.assertTrue(primeira.data.startswith(b'%PDF'))
+            etag = primeira.headers['ETag']
+            self.assertIsNotNone(primeira.headers.get('Last-Modified'))
+
+            segunda = self.client.get(f'/download_contrato_pdf/{contrato_id}')
+            self.assertEqual(segunda.data, primeira.data)
+
+            condicional = self.client.get(f'/download_contrato_pdf/{contrato_id}', headers={'If-None-Match': etag})
+            self.assertEqual(condicional.status_code, 304)
+            self.assertEqual(gerar.call_count, 1)
+
+            # Alterar o contrato muda a chave e gera um novo PDF
+            with self.app.app_context():
+                db.session.get(Contrato, contrato_id).valor_contrato = 999
+                db.session.commit()
+            terceira = self.client.get(f'/download_contrato_pdf/{contrato_id}', headers={'If-None-Match': etag})
+            self.assertEqual(terceira.status_code, 200)
+            self.assertEqual(gerar.call_count, 2)
+            primeira.close(); segunda.close(); terceira.close()
+
+    def test_12_exportacao_zip_de_pdfs(self):
+        """Testa a exportação em lote: ZIP com um PDF por contrato filtrado."""
+        import io
+        import zipfile
+
+        self._criar_contrato("CONDOMINIO ALFA", "11.222.333/0001-81",
+                             termino_contrato=date(2026, 1, 1), tipo_indice="IPCA")
+        self._criar_contrato("CONDOMINIO BETA", "44.555.666/0001-72",
+                             termino_contrato=date(2026, 1, 1), tipo_indice="IGPM")
+        self.app.config['PDF_EXPORT_WORKERS'] = 0
+        with tempfile.TemporaryDirectory() as diretorio, self._cache_pdf_temporario(diretorio):
+            response = self.client.get('/exportar_contratos_pdf?termo=alfa')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.mimetype, 'application/zip')
+            self.assertTrue(response.is_streamed)
+            with zipfile.ZipFile(io.BytesIO(response.data)) as arquivo_zip:
+                nomes = arquivo_zip.namelist()
+                self.assertEqual(len(nomes), 1)
+                self.assertIn("CONDOMINIO_ALFA", nomes[0])
+                self.assertTrue(arquivo_zip.read(nomes[0]).startswith(b'%PDF'))
+
+            response = self.client.get('/exportar_contratos_pdf')
+            with zipfile.ZipFile(io.BytesIO(response.data)) as arquivo_zip:
+                self.assertEqual(len(arquivo_zip.namelist()), 2)
+
+            # Sem resultados: volta para a listagem com aviso
+            response = self.client.get('/exportar_contratos_pdf?termo=inexistente')
+            self.assertEqual(response.status_code, 302)
+
+    def test_13_servico_pdf_assincrono_e_metricas(self):
+        """Testa o download assíncrono (202 + id do trabalho), a consulta do trabalho e as métricas."""
+        import app as app_module
+
+        contrato_id = self._criar_contrato("CONDOMINIO FILA", "08.000.000/0001-00",
+                                           termino_contrato=date(2026, 1, 1), tipo_indice="IPCA")
+        with tempfile.TemporaryDirectory() as diretorio, self._cache_pdf_temporario(diretorio):
+            # Pool "cheio": o pedido é recusado com 503 e Retry-After
+            with mock.patch.object(app_module.servico_pdf, '_vagas', mock.Mock(acquire=mock.Mock(return_value=False))):
+                response = self.client.get(f'/download_contrato_pdf/{contrato_id}?assincrono=1')
+                self.assertEqual(response.status_code, 503)
+                self.assertIn('Retry-After', response.headers)
+
+            response = self.client.get(f'/download_contrato_pdf/{contrato_id}?assincrono=1')
+            # Sem pool (workers=0) o trabalho termina na hora e o PDF é servido direto
+            self.assertEqual(response.status_code, 200)
+
+            with self.app.app_context():
+                dados = app_module.dados_contrato_pdf(db.session.get(Contrato, contrato_id))
+            trabalho = app_module.servico_pdf.submeter('outra-chave', dados, datetime.now())
+            response = self.client.get(f'/pdf/trabalhos/{trabalho.id}')
+            self.assertEqual(response.get_json()['status'], 'concluido')
+            arquivo = self.client.get(response.get_json()['arquivo_url'])
+            self.assertTrue(arquivo.data.startswith(b'%PDF'))
+            arquivo.close()
+            self.assertEqual(self.client.get('/pdf/trabalhos/inexistente').status_code, 404)
+
+            metricas = self.client.get('/pdf/metricas').get_json()
+            self.assertEqual(metricas['recusados'], 1)
+            self.assertEqual(metricas['concluidos'], 2)
+            self.assertEqual(metricas['pendentes'], 0)
+            self.assertIsNotNone(metricas['tempo_renderizacao']['p95'])
+
+    def test_14_api_cnpj_com_cache(self):
+        """Testa que /api/cnpj consulta a ReceitaWS uma vez e depois responde do cache (X-Cache: HIT)."""
+        import app as app_module
+        from cache import CacheMemoria
+        from consulta_cnpj import ConsultaCNPJ
+
+        chamadas = []
+
+        def buscar(cnpj):
+            chamadas.append(cnpj)
+            return 200, {'status': 'OK', 'nome': 'CONDOMINIO RECEITA'}
+
+        with mock.patch.object(app_module, 'consulta_cnpj', ConsultaCNPJ(CacheMemoria(), buscar)):
+            response = self.client.get('/api/cnpj/11.222.333-0001-81')
+            self.assertEqual(response.get_json()['nome'], 'CONDOMINIO RECEITA')
+            self.assertEqual(response.headers['X-Cache'], 'MISS')
+
+            response = self.client.get('/api/cnpj/11222333000181')
+            self.assertEqual(response.headers['X-Cache'], 'HIT')
+            self.assertEqual(chamadas, ['11222333000181'])
+
+            # Dígito verificador inválido: 400 sem chamar a ReceitaWS
+            self.assertEqual(self.client.get('/api/cnpj/11222333000182').status_code, 400)
+            self.assertEqual(len(chamadas), 1)
+
+    def test_15_api_cep_com_base_local(self):
+        """Testa /api/cep: CEP pré-carregado sai da base local; falta consulta a ViaCEP uma vez e grava."""
+        import app as app_module
+        from cache import CacheMemoria
+        from consulta_cep import ConsultaCEP
+
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as arquivo:
+            arquivo.write("cep;logradouro;bairro;cidade;estado\n01310-100;Avenida Paulista;Bela Vista;São Paulo;SP\n")
+        try:
+            resultado = self.app.test_cli_runner().invoke(args=['carregar-ceps', arquivo.name])
+        finally:
+            os.remove(arquivo.name)
+        self.assertIn("1 CEPs carregados", resultado.output)
+
+        chamadas = []
+
+        def buscar(cep):
+            chamadas.append(cep)
+            if cep == '04170000':
+                return {'logradouro': 'Rua Giovanni di Balduccio', 'bairro': 'Vila Moraes', 'localidade': 'São Paulo', 'uf': 'SP'}
+            return None
+
+        consulta = ConsultaCEP(app_module.CepEndereco, buscar, cache_negativo=CacheMemoria())
+        with mock.patch.object(app_module, 'consulta_cep', consulta):
+            response = self.client.get('/api/cep/01310100')
+            self.assertEqual(response.get_json()['logradouro'], 'Avenida Paulista')
+            self.assertEqual(response.headers['X-Cache'], 'HIT')
+            self.assertEqual(chamadas, [])
+
+            self.assertEqual(self.client.get('/api/cep/04170-000').get_json()['bairro'], 'Vila Moraes')
+            self.assertEqual(self.client.get('/api/cep/04170000').headers['X-Cache'], 'HIT')
+
+            self.assertEqual(self.client.get('/api/cep/99999999').status_code, 404)
+            self.assertEqual(self.client.get('/api/cep/99999999').status_code, 404)
+            self.assertEqual(self.client.get('/api/cep/123').status_code, 400)
+            self.assertEqual(chamadas, ['04170000', '99999999'])
+
+    def test_16_api_async_multiplexa_consultas(self):
+        """Testa o app ASGI: 20 consultas simultâneas ao mesmo CNPJ viram uma ida ao provedor; sem login vai para o Flask."""
+        import asyncio
+        import httpx
+        import api_async
+        from cache import CacheMemoria
+        from consulta_cnpj import ConsultaCNPJ
+
+        chamadas = []
+
+        async def buscar_async(cnpj):
+            chamadas.append(cnpj)
+            await asyncio.sleep(0.05)
+            return 200, {'status': 'OK', 'nome': 'CONDOMINIO ASYNC'}
+
+        consulta = ConsultaCNPJ(CacheMemoria(), None, buscar_async=buscar_async)
+
+        async def cenario():
+            transporte = httpx.ASGITransport(app=api_async.app)
+            async with httpx.AsyncClient(transport=transporte, base_url='http://teste') as cliente:
+                respostas = await asyncio.gather(*(cliente.get('/api/cnpj/11222333000181') for _ in range(20)))
+                depois = await cliente.get('/api/cnpj/11.222.333-0001-81')
+                self.app.config['LOGIN_DISABLED'] = False
+                try:
+                    sem_login = await cliente.get('/api/cnpj/11222333000181')
+                finally:
+                    self.app.config['LOGIN_DISABLED'] = True
+            return respostas, depois, sem_login
+
+        with mock.patch.object(api_async, 'consulta_cnpj', consulta):
+            respostas, depois, sem_login = asyncio.run(cenario())
+
+        self.assertTrue(all(r.status_code == 200 and r.json()['nome'] == 'CONDOMINIO ASYNC' for r in respostas))
+        self.assertEqual(chamadas, ['11222333000181'])
+        self.assertEqual(depois.headers['X-Cache'], 'HIT')
+        self.assertEqual(sem_login.status_code, 302)  # @login_required do Flask
+
+    def test_17_user_loader_com_cache(self):
+        """Testa que o usuário logado sai do cache nas requisições seguintes e que alterar o usuário invalida o cache."""
+        import app as app_module
+        from sqlalchemy import event
+
+        app_module.cache_usuarios.invalidar()
+        with self.app.app_context():
+            usuario = User(username='cache_user')
+            usuario.set_password('segredo1')
+            db.session.add(usuario)
+            db.session.commit()
+            id_usuario = usuario.id
+            motor = db.engine
+
+        consultas = []
+
+        def contar(conn, cursor, sql, params, context, executemany):
+            if 'FROM user' in sql:
+                consultas.append(sql)
+
+        self.app.config['LOGIN_DISABLED'] = False
+        event.listen(motor, 'before_cursor_execute', contar)
+        try:
+            self.client.post('/login', data={'username': 'cache_user', 'password': 'segredo1'})
+            consultas.clear()
+            for _ in range(3):
+                self.assertEqual(self.client.get('/api/cep/123').status_code, 400)  # rota protegida, sem consulta externa
+            self.assertEqual(len(consultas), 1)
+
+            with self.app.app_context():
+                db.session.get(User, id_usuario).username = 'renomeado'
+                db.session.commit()
+            consultas.clear()
+            self.assertEqual(self.client.get('/api/cep/123').status_code, 400)
+            self.assertEqual(self.client.get('/api/cep/123').status_code, 400)
+            self.assertEqual(len(consultas), 1)
+            with self.app.test_request_context():
+                self.assertEqual(app_module.load_user(str(id_usuario)).username, 'renomeado')
+        finally:
+            event.remove(motor, 'before_cursor_execute', contar)
+            self.app.config['LOGIN_DISABLED'] = True
+            app_module.cache_usuarios.invalidar()
+
+    def test_18_login_refaz_hash_com_metodo_configurado(self):
+        """Testa que o login com hash de outro método/custo refaz o hash com o PASSWORD_HASH_METHOD atual."""
+        from werkzeug.security import generate_password_hash
+
+        with self.app.app_context():
+            db.session.add(User(username='hash_antigo', password_hash=generate_password_hash('segredo1', 'pbkdf2:sha256:1000')))
+            db.session.commit()
+
+        metodo_anterior = self.app.config['PASSWORD_HASH_METHOD']
+        self.app.config['PASSWORD_HASH_METHOD'] = 'scrypt:1024:8:1'
+        try:
+            response = self.client.post('/login', data={'username': 'hash_antigo', 'password': 'errada'})
+            self.assertIn('Usuário ou senha incorretos'.encode(), response.data)
+            with self.app.app_context():
+                self.assertTrue(User.query.filter_by(username='hash_antigo').one().password_hash.startswith('pbkdf2:sha256:1000$'))
+
+            response = self.client.post('/login', data={'username': 'hash_antigo', 'password': 'segredo1'})
+            self.assertEqual(response.status_code, 302)
+            with self.app.app_context():
+                usuario = User.query.filter_by(username='hash_antigo').one()
+                self.assertTrue(usuario.password_hash.startswith('scrypt:1024:8:1$'))
+                self.assertTrue(usuario.check_password('segredo1'))
+        finally:
+            self.app.config['PASSWORD_HASH_METHOD'] = metodo_anterior
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,54 @@
+import time
+
+from cache import CacheMemoria, CacheSQLite, CacheDashboard
+
+
+def test_cache_memoria_lru_e_ttl():
+    """O item menos usado sai primeiro e itens expirados não são retornados"""
+    cache = CacheMemoria(max_itens=2, ttl_padrao=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')          # 'a' passa a ser o mais recente
+    cache.set('c', 3)       # despeja 'b'
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
+
+    cache.set('curto', 'x', ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get('curto') is None
+
+
+def test_cache_sqlite_compartilhado_entre_instancias(tmp_path):
+    """Duas instâncias no mesmo arquivo (como dois workers) enxergam os mesmos dados"""
+    caminho = str(tmp_path / 'cache.sqlite')
+    worker_1 = CacheSQLite(caminho, max_itens=2)
+    worker_2 = CacheSQLite(caminho, max_itens=2)
+
+    worker_1.set('chave', {'total': 10})
+    assert worker_2.get('chave') == {'total': 10}
+
+    worker_2.incr('geracao')
+    assert worker_1.contador('geracao') == 1
+
+    worker_1.set('x', 1)
+    worker_1.set('y', 2)
+    assert len(worker_2) == 2
+
+
+def test_cache_dashboard_invalida_por_geracao(tmp_path):
+    """Após invalidar, o próximo acesso recalcula (em qualquer worker)"""
+    caminho = str(tmp_path / 'cache.sqlite')
+    dashboard_1 = CacheDashboard(CacheSQLite(caminho))
+    dashboard_2 = CacheDashboard(CacheSQLite(caminho))
+    chamadas = []
+
+    def calcular():
+        chamadas.append(1)
+        return {'total': len(chamadas)}
+
+    assert dashboard_1.obter(None, None, calcular) == {'total': 1}
+    assert dashboard_2.obter(None, None, calcular) == {'total': 1}  # hit compartilhado
+    dashboard_2.invalidar()
+    assert dashboard_1.obter(None, None, calcular) == {'total': 2}
+    assert dashboard_1.obter('2025-01-01', None, calcular) == {'total': 3}  # outro filtro, outra chave
@@ -0,0 +1,94 @@
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+from cache import CacheSQLite
+from coalescencia import Coalescedor, SingleFlight, TravaArquivo, fcntl
+from consulta_cnpj import ConsultaCNPJ
+
+CNPJ = '11222333000181'
+
+
+def test_single_flight_entre_threads():
+    """Dez threads pedindo a mesma chave: uma execução, o mesmo resultado para todas"""
+    single_flight = SingleFlight()
+    execucoes = []
+    resultados = []
+    barreira = threading.Barrier(10)
+
+    def lenta():
+        execucoes.append(1)
+        time.sleep(0.2)
+        return {'nome': 'CONDOMINIO'}
+
+    def consultar():
+        barreira.wait()
+        resultados.append(single_flight.executar('cnpj:1', lenta))
+
+    threads = [threading.Thread(target=consultar) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(execucoes) == 1
+    assert len(resultados) == 10 and all(r is resultados[0] for r in resultados)
+    assert single_flight.contadores == {'executadas': 1, 'compartilhadas': 9}
+
+
+def test_erro_compartilhado_e_chave_liberada():
+    """O erro da execução chega a quem esperava; depois a chave pode ser executada de novo"""
+    single_flight = SingleFlight()
+    inicio = threading.Event()
+    erros = []
+
+    def falha():
+        inicio.set()
+        time.sleep(0.1)
+        raise ValueError('provedor fora')
+
+    def esperar():
+        inicio.wait()
+        try:
+            single_flight.executar('k', falha)
+        except ValueError as e:
+            erros.append(e)
+
+    seguidora = threading.Thread(target=esperar)
+    seguidora.start()
+    with pytest.raises(ValueError):
+        single_flight.executar('k', falha)
+    seguidora.join()
+    assert len(erros) == 1
+    assert single_flight.executar('k', lambda: 'ok') == 'ok'
+
+
+def _consultar_em_outro_processo(caminho_cache, diretorio_travas, caminho_chamadas, barreira):
+    def buscar(cnpj):
+        with open(caminho_chamadas, 'a') as arquivo:
+            arquivo.write(cnpj + '\n')
+        time.sleep(0.3)
+        return 200, {'status': 'OK', 'nome': 'CONDOMINIO'}
+
+    consulta = ConsultaCNPJ(CacheSQLite(caminho_cache), buscar,
+                            coalescedor=Coalescedor(TravaArquivo(diretorio_travas)))
+    barreira.wait()
+    assert consulta.consultar(CNPJ).dados['nome'] == 'CONDOMINIO'
+
+
+@pytest.mark.skipif(fcntl is None, reason="trava entre processos depende de fcntl")
+def test_coalescencia_entre_processos(tmp_path):
+    """Quatro workers consultando o mesmo CNPJ ao mesmo tempo: uma chamada ao provedor"""
+    contexto = multiprocessing.get_context('fork')
+    barreira = contexto.Barrier(4)
+    chamadas = tmp_path / 'chamadas.txt'
+    argumentos = (str(tmp_path / 'cache.sqlite'), str(tmp_path / 'travas'), str(chamadas), barreira)
+    CacheSQLite(argumentos[0])  # cria o arquivo/tabelas antes dos processos
+    processos = [contexto.Process(target=_consultar_em_outro_processo, args=argumentos) for _ in range(4)]
+    for processo in processos:
+        processo.start()
+    for processo in processos:
+        processo.join(30)
+    assert all(processo.exitcode == 0 for processo in processos)
+    assert chamadas.read_text().split() == [CNPJ]
@@ -0,0 +1,112 @@
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from cache import CacheSQLite
+from consulta_cnpj import ConsultaCNPJ, ErroConsultaCNPJ, cnpj_valido, criar_busca_receitaws
+
+CNPJ_OK = '11222333000181'
+CNPJ_INEXISTENTE = '00000000000191'
+
+
+class _ReceitaWSFalsa(BaseHTTPRequestHandler):
+    """Servidor local no lugar da ReceitaWS: respostas por CNPJ e contagem de chamadas."""
+
+    respostas = {}
+    chamadas = []
+
+    def do_GET(self):
+        cnpj = self.path.rsplit('/', 1)[-1]
+        self.chamadas.append(cnpj)
+        status, corpo = self.respostas.get(cnpj, (200, {'status': 'ERROR', 'message': 'CNPJ rejeitado'}))
+        dados = json.dumps(corpo).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def receitaws():
+    _ReceitaWSFalsa.respostas = {CNPJ_OK: (200, {'status': 'OK', 'nome': 'CONDOMINIO TESTE'})}
+    _ReceitaWSFalsa.chamadas = []
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), _ReceitaWSFalsa)
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{servidor.server_port}/v1/cnpj/{{cnpj}}", _ReceitaWSFalsa
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def _consulta(tmp_path, url, **kwargs):
+    backend = CacheSQLite(str(tmp_path / 'cnpj.sqlite'), max_itens=100)
+    # Revalidação síncrona para o teste enxergar o resultado
+    return ConsultaCNPJ(backend, criar_busca_receitaws(url, timeout=2),
+                        executar_em_segundo_plano=lambda f: f(), **kwargs)
+
+
+def test_cache_persistente_e_acerto_abaixo_de_1ms(tmp_path, receitaws):
+    """A segunda consulta (mesmo em outra instância, mesmo arquivo) sai do cache em menos de 1 ms"""
+    url, servidor = receitaws
+    consulta = _consulta(tmp_path, url)
+    assert consulta.consultar(CNPJ_OK).origem == 'receitaws'
+
+    outra = _consulta(tmp_path, url)
+    tempos = []
+    for _ in range(50):
+        inicio = time.perf_counter()
+        resultado = outra.consultar(CNPJ_OK)
+        tempos.append(time.perf_counter() - inicio)
+    assert resultado.origem == 'cache' and resultado.dados['nome'] == 'CONDOMINIO TESTE'
+    assert statistics.median(tempos) < 0.001
+    assert servidor.chamadas == [CNPJ_OK]
+
+
+def test_cache_negativo_e_cnpj_invalido(tmp_path, receitaws):
+    """CNPJ rejeitado pela ReceitaWS fica no cache negativo; dígito verificador errado nem sai do processo"""
+    url, servidor = receitaws
+    consulta = _consulta(tmp_path, url)
+    assert consulta.consultar(CNPJ_INEXISTENTE).dados['status'] == 'ERROR'
+    assert consulta.consultar(CNPJ_INEXISTENTE).origem == 'cache'
+
+    assert not cnpj_valido('11222333000182')
+    assert consulta.consultar('11222333000182').status_http == 400
+    assert servidor.chamadas == [CNPJ_INEXISTENTE]
+
+
+def test_stale_while_revalidate(tmp_path, receitaws):
+    """Vencido o TTL a resposta antiga volta na hora e é atualizada; com a ReceitaWS fora, segue a antiga"""
+    url, servidor = receitaws
+    consulta = _consulta(tmp_path, url, ttl=0.05, janela_stale=60)
+    consulta.consultar(CNPJ_OK)
+    time.sleep(0.06)
+
+    servidor.respostas[CNPJ_OK] = (200, {'status': 'OK', 'nome': 'NOME NOVO'})
+    resultado = consulta.consultar(CNPJ_OK)
+    assert resultado.origem == 'stale' and resultado.dados['nome'] == 'CONDOMINIO TESTE'
+    assert consulta.consultar(CNPJ_OK).dados['nome'] == 'NOME NOVO'
+
+    time.sleep(0.06)
+    servidor.respostas[CNPJ_OK] = (429, {'message': 'Too many requests'})
+    assert consulta.consultar(CNPJ_OK).dados['nome'] == 'NOME NOVO'  # 429 na revalidação: mantém a antiga
+    assert consulta.consultar(CNPJ_OK).origem == 'stale'
+
+
+def test_erro_sem_cache(tmp_path, receitaws):
+    """Sem resposta em cache, 429/5xx viram ErroConsultaCNPJ e não são guardados"""
+    url, servidor = receitaws
+    servidor.respostas[CNPJ_OK] = (429, {})
+    consulta = _consulta(tmp_path, url)
+    with pytest.raises(ErroConsultaCNPJ) as erro:
+        consulta.consultar(CNPJ_OK)
+    assert erro.value.status_http == 503
+    servidor.respostas[CNPJ_OK] = (200, {'status': 'OK', 'nome': 'X'})
+    assert consulta.consultar(CNPJ_OK).origem == 'receitaws'
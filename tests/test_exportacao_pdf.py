@@ -0,0 +1,48 @@
+import io
+import zipfile
+from datetime import date, datetime
+
+from exportacao_pdf import encerrar_pool, gerar_zip_pdfs, nome_arquivo_pdf
+from pdf_cache import CachePDF
+
+
+def _dados(nome):
+    return {
+        'nome': nome, 'cnpj': '11.222.333/0001-81', 'telefone': '1199999999', 'email': 'a@b.com',
+        'valor_contrato': 100, 'inicio_contrato': date(2025, 1, 1), 'termino_contrato': date(2026, 1, 1),
+        'abrangencia_contrato': 'Total', 'tipo_indice': 'IPCA', 'endereco': 'Rua A, 1', 'cep': '00000-000',
+        'estado': 'SP', 'clausulas_adicionais': '',
+    }
+
+
+def _itens(quantidade):
+    return [(nome_arquivo_pdf(i, f"COND {i}"), _dados(f"COND {i}")) for i in range(1, quantidade + 1)]
+
+
+def test_zip_em_pedacos_com_pool_de_processos():
+    """Com pool de processos o ZIP sai aos pedaços, na ordem dos itens, e é um ZIP válido"""
+    try:
+        pedacos = list(gerar_zip_pdfs(_itens(5), datetime(2025, 3, 1), workers=2))
+    finally:
+        encerrar_pool()
+    assert len(pedacos) == 6  # um por PDF + diretório central
+    with zipfile.ZipFile(io.BytesIO(b''.join(pedacos))) as arquivo_zip:
+        assert arquivo_zip.namelist() == [f"{i}_COND_{i}.pdf" for i in range(1, 6)]
+        assert all(arquivo_zip.read(nome).startswith(b'%PDF') for nome in arquivo_zip.namelist())
+
+
+def test_zip_reaproveita_cache_pdf(tmp_path):
+    """PDFs já renderizados vêm do cache em disco e os novos são guardados nele"""
+    cache = CachePDF(str(tmp_path))
+    itens = _itens(2)
+    primeiro = b''.join(gerar_zip_pdfs(itens, datetime(2025, 3, 1), cache_pdf=cache, workers=0))
+    assert len(list(tmp_path.glob('*.pdf'))) == 2
+
+    segundo = b''.join(gerar_zip_pdfs(itens, datetime(2025, 3, 1), cache_pdf=cache, workers=0))
+    with zipfile.ZipFile(io.BytesIO(primeiro)) as a, zipfile.ZipFile(io.BytesIO(segundo)) as b:
+        assert [a.read(n) for n in a.namelist()] == [b.read(n) for n in b.namelist()]
+
+
+def test_nome_arquivo_pdf():
+    assert nome_arquivo_pdf(7, "Cond. Ed. São/Paulo") == "7_Cond_Ed_São_Paulo.pdf"
+    assert nome_arquivo_pdf(8, None) == "8_contrato.pdf"
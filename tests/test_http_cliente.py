@@ -0,0 +1,133 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from consulta_cnpj import (Provedor, criar_busca_cnpj, criar_busca_cnpj_async, normalizar_brasilapi,
+                           normalizar_receitaws)
+from http_cliente import CircuitoAberto, ClienteHTTP, ClienteHTTPAsync
+
+
+class _Provedor(BaseHTTPRequestHandler):
+    """Servidor local com respostas programadas por caminho: lista de (status, corpo), consumida em ordem."""
+
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    roteiro = {}
+    chamadas = []
+
+    def do_GET(self):
+        self.chamadas.append(self.path)
+        respostas = self.roteiro.get(self.path.split('/')[1], [(200, {})])
+        status, corpo = respostas.pop(0) if len(respostas) > 1 else respostas[0]
+        dados = json.dumps(corpo).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def servidor():
+    _Provedor.roteiro = {}
+    _Provedor.chamadas = []
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Provedor)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_port}", _Provedor
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_retentativa_com_backoff(servidor):
+    """503 seguido de 200: uma retentativa e a resposta boa"""
+    base, provedor = servidor
+    provedor.roteiro['a'] = [(503, {}), (200, {'ok': True})]
+    cliente = ClienteHTTP('a', tentativas=3, backoff_base=0.01)
+    assert cliente.get(f"{base}/a/1").json() == {'ok': True}
+    metricas = cliente.metricas()
+    assert metricas['retentativas'] == 1 and metricas['requisicoes'] == 2 and metricas['erros'] == 1
+    assert metricas['latencia_ms']['p95'] is not None
+
+
+def test_disjuntor_abre_e_fecha(servidor):
+    """Depois de N falhas seguidas as chamadas falham na hora; passado o tempo, uma chamada de teste fecha o circuito"""
+    base, provedor = servidor
+    provedor.roteiro['b'] = [(500, {})]
+    cliente = ClienteHTTP('b', tentativas=1, limite_falhas=2, tempo_aberto=0.1)
+    cliente.get(f"{base}/b/1")
+    cliente.get(f"{base}/b/1")
+    assert cliente.disjuntor.estado == 'aberto'
+    with pytest.raises(CircuitoAberto):
+        cliente.get(f"{base}/b/1")
+    assert len(provedor.chamadas) == 2
+
+    time.sleep(0.12)
+    provedor.roteiro['b'] = [(200, {})]
+    assert cliente.get(f"{base}/b/1").status_code == 200
+    assert cliente.disjuntor.estado == 'fechado'
+
+
+def test_timeout_de_leitura():
+    """Servidor que aceita a conexão e não responde: o timeout de leitura corta a espera"""
+    import socket
+    escuta = socket.socket()
+    escuta.bind(('127.0.0.1', 0))
+    escuta.listen(1)
+    try:
+        cliente = ClienteHTTP('lento', timeout_leitura=0.2, tentativas=1)
+        inicio = time.monotonic()
+        with pytest.raises(requests.exceptions.Timeout):
+            cliente.get(f"http://127.0.0.1:{escuta.getsockname()[1]}/")
+        assert time.monotonic() - inicio < 2
+    finally:
+        escuta.close()
+
+
+def test_failover_entre_provedores(servidor):
+    """ReceitaWS limitando (429): a resposta vem da BrasilAPI, no formato da ReceitaWS"""
+    base, provedor = servidor
+    provedor.roteiro['receitaws'] = [(429, {})]
+    provedor.roteiro['brasilapi'] = [(200, {'razao_social': 'CONDOMINIO BRASIL', 'uf': 'SP'})]
+    buscar = criar_busca_cnpj([
+        Provedor('receitaws', base + '/receitaws/{cnpj}', ClienteHTTP('receitaws', tentativas=1), normalizar_receitaws),
+        Provedor('brasilapi', base + '/brasilapi/{cnpj}', ClienteHTTP('brasilapi', tentativas=1), normalizar_brasilapi),
+    ])
+    status, dados = buscar('11222333000181')
+    assert status == 200
+    assert dados['nome'] == 'CONDOMINIO BRASIL' and dados['status'] == 'OK'
+    assert [c.split('/')[1] for c in provedor.chamadas] == ['receitaws', 'brasilapi']
+
+
+def test_failover_assincrono_compartilha_disjuntor(servidor):
+    """O cliente httpx usa o disjuntor e as métricas do ClienteHTTP; erro de rede vira exceção do requests"""
+    base, provedor = servidor
+    provedor.roteiro['receitaws'] = [(503, {})]
+    provedor.roteiro['brasilapi'] = [(200, {'razao_social': 'CONDOMINIO ASYNC'})]
+    receitaws = ClienteHTTP('receitaws', tentativas=1, limite_falhas=1)
+    brasilapi = ClienteHTTP('brasilapi', tentativas=1)
+
+    async def cenario():
+        clientes = [ClienteHTTPAsync(receitaws), ClienteHTTPAsync(brasilapi)]
+        buscar = criar_busca_cnpj_async([
+            Provedor('receitaws', base + '/receitaws/{cnpj}', clientes[0], normalizar_receitaws),
+            Provedor('brasilapi', base + '/brasilapi/{cnpj}', clientes[1], normalizar_brasilapi),
+        ])
+        resultados = [await buscar('11222333000181'), await buscar('11222333000181')]
+        with pytest.raises(requests.exceptions.ConnectionError):
+            await ClienteHTTPAsync(ClienteHTTP('fora', tentativas=1)).get('http://127.0.0.1:9/')
+        for cliente in clientes:
+            await cliente.fechar()
+        return resultados
+
+    (status, dados), _ = asyncio.run(cenario())
+    assert status == 200 and dados['nome'] == 'CONDOMINIO ASYNC'
+    # Depois da falha o disjuntor da ReceitaWS abriu: a segunda busca foi direto para a BrasilAPI
+    assert [c.split('/')[1] for c in provedor.chamadas] == ['receitaws', 'brasilapi', 'brasilapi']
+    assert receitaws.metricas()['recusadas_disjuntor'] == 1
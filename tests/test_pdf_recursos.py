@@ -0,0 +1,30 @@
+from datetime import date, datetime
+
+import pdf_recursos
+from pdf_generator import gerar_contrato_pdf, gerar_pdf_reportlab
+
+
+def test_recursos_montados_uma_vez():
+    """Estilos e logo são os mesmos objetos entre chamadas; limpar_recursos() força a remontagem"""
+    estilos = pdf_recursos.estilos_contrato()
+    logo = pdf_recursos.logo()
+    assert logo is not None
+    assert pdf_recursos.estilos_contrato() is estilos
+    assert pdf_recursos.logo() is logo
+
+    pdf_recursos.limpar_recursos()
+    assert pdf_recursos.estilos_contrato() is not estilos
+
+
+def test_pdfs_com_recursos_compartilhados():
+    """Os dois layouts continuam gerando PDFs válidos com o logo"""
+    dados = {
+        'nome': 'COND', 'cnpj': '11.222.333/0001-81', 'telefone': '1199999999', 'email': 'a@b.com',
+        'valor_contrato': 100, 'inicio_contrato': date(2025, 1, 1), 'termino_contrato': None,
+        'abrangencia_contrato': 'Total', 'tipo_indice': 'IPCA', 'endereco': 'Rua A, 1', 'cep': '00000-000',
+        'estado': 'SP', 'clausulas_adicionais': 'Cláusula extra.',
+    }
+    for _ in range(2):
+        conteudo = gerar_contrato_pdf(dados, datetime(2025, 3, 1))
+        assert conteudo.startswith(b'%PDF') and b'/Image' in conteudo
+    assert gerar_pdf_reportlab(dados).getvalue().startswith(b'%PDF')
@@ -0,0 +1,44 @@
+import threading
+
+import pytest
+
+from senhas import VerificacaoOcupada, VerificadorSenhas, gerar_hash, parametros_metodo, precisa_rehash
+
+METODO_BARATO = 'scrypt:1024:8:1'
+
+
+def test_precisa_rehash_compara_parametros_completos():
+    """'scrypt' equivale a 'scrypt:32768:8:1'; outro custo ou outro algoritmo pede rehash"""
+    assert parametros_metodo('scrypt') == 'scrypt:32768:8:1'
+    hash_senha = gerar_hash('segredo', METODO_BARATO)
+    assert not precisa_rehash(hash_senha, METODO_BARATO)
+    assert precisa_rehash(hash_senha, 'scrypt')
+    assert precisa_rehash(hash_senha, 'pbkdf2:sha256:1000')
+
+
+def test_verificador_no_pool_e_limite_de_fila():
+    """Com o pool cheio e sem vaga na fila a verificação é recusada, sem esperar indefinidamente"""
+    hash_senha = gerar_hash('segredo', METODO_BARATO)
+    verificador = VerificadorSenhas(workers=1, max_fila=0, espera=0.05)
+    try:
+        assert verificador.verificar(hash_senha, 'segredo')
+        assert not verificador.verificar(hash_senha, 'errada')
+
+        liberar = threading.Event()
+        verificador._pool.submit(liberar.wait)
+        verificador._vagas.acquire()  # ocupa a única vaga, como uma verificação em andamento
+        try:
+            with pytest.raises(VerificacaoOcupada):
+                verificador.verificar(hash_senha, 'segredo')
+        finally:
+            verificador._vagas.release()
+            liberar.set()
+        assert verificador.verificar(hash_senha, 'segredo')
+        assert verificador.contadores == {'verificadas': 3, 'recusadas': 1}
+    finally:
+        verificador.encerrar()
+
+
+def test_verificador_inline():
+    verificador = VerificadorSenhas(workers=0)
+    assert verificador.verificar(gerar_hash('x', METODO_BARATO), 'x')
@@ -0,0 +1,59 @@
+from datetime import date, datetime
+
+import pytest
+
+from pdf_cache import CachePDF
+from servico_pdf import FilaCheia, ServicoRenderizacaoPDF
+
+
+def _dados(nome):
+    return {
+        'nome': nome, 'cnpj': '11.222.333/0001-81', 'telefone': '1199999999', 'email': 'a@b.com',
+        'valor_contrato': 100, 'inicio_contrato': date(2025, 1, 1), 'termino_contrato': date(2026, 1, 1),
+        'abrangencia_contrato': 'Total', 'tipo_indice': 'IPCA', 'endereco': 'Rua A, 1', 'cep': '00000-000',
+        'estado': 'SP', 'clausulas_adicionais': '',
+    }
+
+
+def test_pool_de_processos_renderiza_e_reaproveita_trabalho(tmp_path):
+    """O PDF é renderizado em outro processo, gravado no cache; pedidos iguais reaproveitam o trabalho"""
+    servico = ServicoRenderizacaoPDF(CachePDF(str(tmp_path)), workers=1, max_fila=4)
+    try:
+        trabalho = servico.submeter('chave-a', _dados('COND A'), datetime(2025, 3, 1))
+        assert servico.submeter('chave-a', _dados('COND A'), datetime(2025, 3, 1)) is trabalho
+        caminho = trabalho.aguardar(60)
+        assert open(caminho, 'rb').read().startswith(b'%PDF')
+        assert trabalho.status == 'concluido'
+        metricas = servico.metricas()
+        assert metricas['concluidos'] == 1 and metricas['reaproveitados'] == 1
+        assert metricas['tempo_renderizacao']['max'] > 0
+    finally:
+        servico.encerrar()
+
+
+def test_fila_limitada_recusa_pedidos(tmp_path):
+    """Com as vagas ocupadas (1 worker + fila 0) o próximo pedido recebe FilaCheia"""
+    servico = ServicoRenderizacaoPDF(CachePDF(str(tmp_path)), workers=1, max_fila=0)
+    try:
+        primeiro = servico.submeter('chave-1', _dados('COND 1'), datetime(2025, 3, 1))
+        with pytest.raises(FilaCheia):
+            servico.submeter('chave-2', _dados('COND 2'), datetime(2025, 3, 1))
+        primeiro.aguardar(60)
+        # Terminado o primeiro, a vaga volta
+        servico.submeter('chave-2', _dados('COND 2'), datetime(2025, 3, 1)).aguardar(60)
+        assert servico.metricas()['recusados'] == 1
+    finally:
+        servico.encerrar()
+
+
+def test_tempo_maximo_por_trabalho(tmp_path):
+    """A renderização que passa do tempo máximo é interrompida no processo filho"""
+    servico = ServicoRenderizacaoPDF(CachePDF(str(tmp_path)), workers=1, timeout=0.000001)
+    try:
+        trabalho = servico.submeter('chave-lenta', _dados('COND LENTO'), datetime(2025, 3, 1))
+        with pytest.raises(TimeoutError):
+            trabalho.aguardar(60)
+        assert trabalho.status == 'expirado'
+        assert servico.metricas()['expirados'] == 1
+    finally:
+        servico.encerrar()